@@ -0,0 +1,181 @@
+'''
+Token authentication with a two-level cache.
+
+DRF's TokenAuthentication runs SELECT token JOIN user on every request. Here
+the token is looked up in:
+  1. an in-process LRU with a short TTL: the user's row values, so a hit
+     needs no I/O at all,
+  2. the shared Django cache: only the token's user id (no password hashes
+     in Redis), then the user by primary key,
+and only then in the database. Entries are dropped when the token is deleted
+or the user is saved (deactivated, password changed, ...), see accounts/signals.py.
+Other processes' LRUs can't be reached from here, so they are bounded by LOCAL_TTL.
+The local memory cache is per process too: unless CACHES points at a shared
+backend, the second level is kept no longer than LOCAL_TTL either.
+'''
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+DEFAULTS = {
+    'LOCAL_TTL': 5,          # seconds an entry lives in the per-process LRU
+    'LOCAL_MAXSIZE': 10000,  # entries kept per process
+    'SHARED_TTL': 300,       # seconds an entry lives in the shared cache
+}
+
+# Backends that live inside each process: no other worker sees their entries
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+def shared_ttl(options):
+    """SHARED_TTL with a shared cache backend, else capped at LOCAL_TTL (nothing could invalidate it)."""
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_BACKENDS:
+        return min(options['SHARED_TTL'], options['LOCAL_TTL'])
+    return options['SHARED_TTL']
+
+
+class LocalTTLCache:
+    """Small thread-safe LRU whose entries also expire after `ttl` seconds."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, maxsize):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)  # least recently used
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalTTLCache()
+
+
+def cache_key(token_key):
+    # Never put raw tokens into the (possibly shared) cache backend
+    return 'auth:token:' + hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def invalidate(token_key):
+    key = cache_key(token_key)
+    local_cache.delete(key)
+    cache.delete(key)
+
+
+def row_of(user):
+    """The database the user was read from and its field values, for the local LRU."""
+    return user._state.db, tuple(getattr(user, field.attname) for field in user._meta.concrete_fields)
+
+
+def user_and_token(key, user_or_row):
+    # A new user object per request: views may change and save request.user
+    User = get_user_model()
+    if isinstance(user_or_row, tuple):
+        using, values = user_or_row
+        user = User.from_db(using, [field.attname for field in User._meta.concrete_fields], values)
+    else:
+        user = user_or_row
+    if not user.is_active:
+        raise AuthenticationFailed(_('User inactive or deleted.'))
+    return (user, Token(key=key, user=user))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for rest_framework.authentication.TokenAuthentication."""
+
+    def authenticate_credentials(self, key):
+        options = cache_settings()
+        cached_key = cache_key(key)
+
+        row = local_cache.get(cached_key)
+        if row is not None:
+            return user_and_token(key, row)
+
+        user_id = cache.get(cached_key)
+        user = get_user_model().objects.filter(pk=user_id).first() if user_id is not None else None
+        if user is None:
+            # Same query as TokenAuthentication, raises AuthenticationFailed if unknown
+            user, token = super().authenticate_credentials(key)
+            cache.set(cached_key, user.pk, shared_ttl(options))
+        local_cache.set(cached_key, row_of(user), options['LOCAL_TTL'], options['LOCAL_MAXSIZE'])
+        return user_and_token(key, user)
+
+    async def aauthenticate_credentials(self, key):
+        """authenticate_credentials for async views (async cache and ORM calls)."""
+        options = cache_settings()
+        cached_key = cache_key(key)
+
+        row = local_cache.get(cached_key)
+        if row is not None:
+            return user_and_token(key, row)
+
+        user_id = await cache.aget(cached_key)
+        user = await get_user_model().objects.filter(pk=user_id).afirst() if user_id is not None else None
+        if user is None:
+            try:
+                token = await self.get_model().objects.select_related('user').aget(key=key)
+            except self.get_model().DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            user = token.user
+            await cache.aset(cached_key, user.pk, shared_ttl(options))
+        local_cache.set(cached_key, row_of(user), options['LOCAL_TTL'], options['LOCAL_MAXSIZE'])
+        return user_and_token(key, user)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for a plain Django request in an async view:
+        (user, token), or None without an "Authorization: Token ..." header.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        # Same checks and messages as TokenAuthentication.authenticate
+        if len(auth) == 1:
+            raise AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed(_('Invalid token header. Token string should not contain invalid characters.'))
+        return await self.aauthenticate_credentials(key)
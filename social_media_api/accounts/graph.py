@@ -0,0 +1,66 @@
+"""
+Follow graph writes and counters.
+
+follow/unfollow touch only the follow row and the two counters - no full
+`user.save()` rewriting every column of the user row.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from social_media_api.db import insert_ignore
+
+
+User = get_user_model()
+
+# rows in User.following: from_user follows to_user
+Follow = User.following.through
+
+
+def _adjust_counts(follower_id, followee_id, delta):
+    User.objects.filter(pk=follower_id).update(following_count=F('following_count') + delta)
+    User.objects.filter(pk=followee_id).update(follower_count=F('follower_count') + delta)
+
+
+def follow(follower_id, followee_id):
+    """Make follower follow followee. Returns False if it already did."""
+    from posts import feed  # posts depends on accounts, import lazily
+
+    with transaction.atomic():
+        if not insert_ignore(Follow, from_user=follower_id, to_user=followee_id):
+            return False
+        _adjust_counts(follower_id, followee_id, 1)
+        feed.backfill(follower_id, followee_id)
+    return True
+
+
+def unfollow(follower_id, followee_id):
+    """Stop following. Returns False if follower wasn't following followee."""
+    from posts import feed
+
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(from_user_id=follower_id, to_user_id=followee_id).delete()
+        if not deleted:
+            return False
+        _adjust_counts(follower_id, followee_id, -1)
+        feed.remove_author(follower_id, followee_id)
+    return True
+
+
+def _count_of(column):
+    """Correlated subquery: follow rows whose `column` is the outer user."""
+    return Coalesce(
+        Subquery(
+            Follow.objects.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(
+                n=Count('id')
+            ).values('n')
+        ),
+        Value(0)
+    )
+
+
+def recount(queryset):
+    """Recompute both counters for the users in `queryset` with one UPDATE."""
+    return queryset.update(follower_count=_count_of('to_user'), following_count=_count_of('from_user'))
@@ -0,0 +1,251 @@
+'''
+Profile picture pipeline.
+
+Upload (request path): hash the bytes. If an ImageAsset with that sha256
+already exists the user just points at it. Otherwise the raw file is stored
+and an ImageJob is queued; nothing is decoded during the request.
+
+Worker (`manage.py process_image_jobs`): claims pending jobs and hands the
+bytes to a pool of processes. Each image is decoded once (JPEGs at a reduced
+scale when possible), rotated per EXIF, and square variants are written at
+every AVATAR_WIDTHS width as WebP and JPEG. No metadata is copied, so EXIF
+(GPS position, camera serial, ...) never reaches the public files.
+
+Storage is content-addressed: avatars/<hh>/<sha256>/<width>.<webp|jpeg>,
+so two users uploading the same picture share one set of files.
+'''
+
+import hashlib
+import io
+import logging
+from concurrent.futures import BrokenExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import ImageAsset, ImageJob
+
+
+logger = logging.getLogger(__name__)
+
+# format name → (Pillow format, save options). Nothing passes `exif=`, so it is dropped.
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def widths():
+    return sorted(getattr(settings, 'AVATAR_WIDTHS', [48, 96, 192, 512]))
+
+
+def sha256_of(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_path(sha256, width, fmt):
+    return f'avatars/{sha256[:2]}/{sha256}/{width}.{fmt}'
+
+
+def variant_urls(sha256, asset_widths=None):
+    """{"webp": {"48": url, ...}, "jpeg": {...}} for an asset, or None without one."""
+    if not sha256:
+        return None
+    return {
+        fmt: {str(width): default_storage.url(variant_path(sha256, width, fmt)) for width in asset_widths or widths()}
+        for fmt in FORMATS
+    }
+
+
+def small_url(sha256):
+    """The AVATAR_POST_WIDTH WebP variant, built from the id alone (no query)."""
+    if not sha256:
+        return None
+    return default_storage.url(variant_path(sha256, getattr(settings, 'AVATAR_POST_WIDTH', 96), 'webp'))
+
+
+# =========================
+# REQUEST PATH
+# =========================
+
+def submit_upload(user, file):
+    """
+    Returns ('ready', asset) when the same picture was processed before,
+    else ('queued', job) for the worker.
+    """
+    if file.size > getattr(settings, 'AVATAR_MAX_UPLOAD_BYTES', 10 * 1024 * 1024):
+        raise InvalidImage('Image too large.')
+    try:
+        # Reads the header only, the pixels are decoded by the worker
+        with Image.open(file) as image:
+            image_format, pixels = image.format, image.width * image.height
+    except (OSError, Image.DecompressionBombError):
+        raise InvalidImage('Not an image.')
+    if image_format not in ('JPEG', 'PNG', 'WEBP', 'GIF'):
+        raise InvalidImage('Unsupported image format.')
+    if pixels > getattr(settings, 'AVATAR_MAX_PIXELS', 40_000_000):
+        raise InvalidImage('Image dimensions too large.')
+    file.seek(0)
+
+    sha256 = sha256_of(file)
+    asset = ImageAsset.objects.filter(pk=sha256).first()
+    if asset is not None:
+        # Already processed: no file stored, the job row only records the upload
+        ImageJob.objects.create(user=user, sha256=sha256, status=ImageJob.DONE, finished_at=timezone.now())
+        get_user_model().objects.filter(pk=user.pk).update(avatar=asset)
+        return 'ready', asset
+
+    job = ImageJob(user=user, sha256=sha256)
+    job.source.save(sha256, file, save=False)
+    job.save()
+    return 'queued', job
+
+
+# =========================
+# WORKER
+# =========================
+
+def render_variants(data, variant_widths, max_pixels):
+    """
+    Pure Pillow, runs in the pool processes (no Django, no database).
+    Returns (width, height, {(fmt, width): bytes}).
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.width * image.height > max_pixels:
+        raise InvalidImage(f'Image has more than {max_pixels} pixels.')
+    # Original size as displayed: EXIF orientations 5-8 are rotated by 90 degrees
+    width, height = image.size
+    if image.getexif().get(0x0112) in (5, 6, 7, 8):
+        width, height = height, width
+
+    largest = max(variant_widths)
+    # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale if that still covers the largest variant
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)  # apply the camera rotation before the tags are gone
+    if image.mode != 'RGB':
+        # Transparent areas become white instead of black
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+
+    outputs = {}
+    # Largest first, each smaller variant resized from the previous one (cheaper than from the original)
+    source = ImageOps.fit(image, (largest, largest), method=Image.Resampling.LANCZOS)
+    for size in sorted(variant_widths, reverse=True):
+        source = source if source.width == size else source.resize((size, size), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            source.save(buffer, pil_format, **options)
+            outputs[(fmt, size)] = buffer.getvalue()
+    return width, height, outputs
+
+
+def claim_jobs(limit):
+    """
+    Mark up to `limit` jobs as processing and return them. skip_locked lets
+    several workers claim side by side; jobs stuck in processing longer than
+    AVATAR_JOB_TIMEOUT seconds (crashed worker) are claimed again.
+    """
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'AVATAR_JOB_TIMEOUT', 600))
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status=ImageJob.PENDING) | Q(status=ImageJob.PROCESSING, claimed_at__lt=stale)
+            ).order_by('id')[:limit]
+        )
+        ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=ImageJob.PROCESSING, claimed_at=timezone.now()
+        )
+    return jobs
+
+
+def finish_job(job, result):
+    width, height, outputs = result
+    for (fmt, variant_width), content in outputs.items():
+        path = variant_path(job.sha256, variant_width, fmt)
+        if not default_storage.exists(path):  # shared with an earlier identical upload
+            default_storage.save(path, io.BytesIO(content))
+
+    with transaction.atomic():
+        asset, _ = ImageAsset.objects.get_or_create(
+            pk=job.sha256,
+            defaults={'width': width, 'height': height, 'widths': sorted({w for _, w in outputs})}
+        )
+        # Unless the user has uploaded another picture since this one
+        get_user_model().objects.filter(pk=job.user_id).exclude(image_jobs__id__gt=job.pk).update(avatar=asset)
+        ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.DONE, finished_at=timezone.now())
+    job.source.delete(save=False)
+
+
+def fail_job(job, error):
+    ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.FAILED, error=str(error), finished_at=timezone.now())
+    job.source.delete(save=False)
+
+
+def process_jobs(limit, executor=None):
+    """
+    Process up to `limit` pending jobs. With an `executor` (a process pool) the
+    decoding and encoding run in parallel; files and rows are written here.
+    Returns the number of jobs handled.
+
+    A job that raises is marked failed and the others go on. If the pool
+    itself broke (a child process died), the jobs that were waiting on it stay
+    claimed, so they are retried after AVATAR_JOB_TIMEOUT like a crashed
+    worker's, and BrokenExecutor is raised: the caller needs a new pool.
+    """
+    jobs = claim_jobs(limit)
+    if not jobs:
+        return 0
+
+    variant_widths = widths()
+    max_pixels = getattr(settings, 'AVATAR_MAX_PIXELS', 40_000_000)
+
+    def read(job):
+        with job.source.open('rb') as source:
+            return source.read()
+
+    def submit(job):
+        try:
+            return executor.submit(render_variants, read(job), variant_widths, max_pixels)
+        except Exception as error:  # e.g. the upload is gone; handled with the results below
+            return error
+
+    if executor is None:
+        pending = [(job, None) for job in jobs]
+    else:
+        pending = [(job, submit(job)) for job in jobs]
+
+    broken = None
+    for job, future in pending:
+        try:
+            if isinstance(future, Exception):
+                raise future
+            result = future.result() if future else render_variants(read(job), variant_widths, max_pixels)
+            finish_job(job, result)
+        except (InvalidImage, OSError, Image.DecompressionBombError, ValueError) as error:
+            fail_job(job, error)
+        except BrokenExecutor as error:
+            broken = error
+        except Exception as error:
+            # A bug, not a bad image: log it, fail this job and keep the worker going
+            logger.exception('Image job %s failed', job.pk)
+            fail_job(job, error)
+
+    if broken is not None:
+        raise broken
+    return len(jobs)
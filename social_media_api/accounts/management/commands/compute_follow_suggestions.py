@@ -0,0 +1,26 @@
+'''
+Batch job: rebuild "who to follow" suggestions from the follow graph.
+
+    python manage.py compute_follow_suggestions --top-k 10
+'''
+
+from django.core.management.base import BaseCommand
+
+from accounts.suggestions import compute_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Compute friends-of-friends follow suggestions for every user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=10, help='Suggestions kept per user.')
+        parser.add_argument('--max-fanout', type=int, default=1000, help='Followees expanded per user.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users written per transaction.')
+
+    def handle(self, *args, **options):
+        processed = compute_suggestions(
+            top_k=options['top_k'],
+            max_fanout=options['max_fanout'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Computed suggestions for {processed} users.'))
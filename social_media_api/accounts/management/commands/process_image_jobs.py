@@ -0,0 +1,58 @@
+'''
+Background worker: turn uploaded profile pictures into resized WebP/JPEG variants.
+
+    python manage.py process_image_jobs                 # run forever, one process per CPU
+    python manage.py process_image_jobs --workers 4
+    python manage.py process_image_jobs --once          # drain and exit
+    python manage.py process_image_jobs --workers 0     # no pool, process inline
+'''
+
+import os
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from accounts import images
+
+
+class Command(BaseCommand):
+    help = 'Resize uploaded profile pictures with a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Pool processes (0 = inline).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Jobs claimed at a time (default 4 per worker).')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when there is nothing to do.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        batch_size = options['batch_size'] or max(1, workers) * 4
+
+        # The pool only decodes/encodes; django.setup() lets "spawn" children import accounts.images
+        new_pool = lambda: ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers else None
+        executor = new_pool()
+        total = 0
+        try:
+            while True:
+                try:
+                    processed = images.process_jobs(batch_size, executor)
+                except BrokenExecutor:
+                    # A pool process died (e.g. killed for memory); its jobs are retried after AVATAR_JOB_TIMEOUT
+                    self.stderr.write('Worker pool broke, starting a new one.')
+                    executor.shutdown(wait=False)
+                    executor = new_pool()
+                    continue
+                total += processed
+
+                if processed:
+                    continue  # keep going while there is a backlog
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if executor:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} image jobs.'))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Follow = User.following.through
+
+    def count_of(column):
+        return Coalesce(
+            Subquery(
+                Follow.objects.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(
+                    n=Count('id')
+                ).values('n')
+            ),
+            Value(0)
+        )
+
+    User.objects.update(follower_count=count_of('to_user'), following_count=count_of('from_user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_remove_user_followers_user_following'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+        # The follow table is auto-created by the M2M field, so it can't declare Meta.indexes.
+        # These let followers/following lists walk (user, id) without sorting.
+        migrations.RunSQL(
+            'CREATE INDEX follow_to_user_recent_idx ON accounts_user_following (to_user_id, id)',
+            'DROP INDEX follow_to_user_recent_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX follow_from_user_recent_idx ON accounts_user_following (from_user_id, id)',
+            'DROP INDEX follow_from_user_recent_idx',
+        ),
+    ]
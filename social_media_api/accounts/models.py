@@ -17,6 +17,16 @@ class User(AbstractUser):
         null=True
     )
 
+    # Processed profile picture: resized WebP/JPEG variants (accounts/images.py).
+    # The id is the sha256 of the upload, so identical uploads share the files.
+    avatar = models.ForeignKey(
+        'ImageAsset',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
     # Single ManyToMany field to represent who this user is following
     following = models.ManyToManyField(
         'self',  # Self-referential
@@ -25,13 +35,78 @@ class User(AbstractUser):
         blank=True
     )
 
+    # Stored totals so a profile never counts millions of follow rows.
+    # Maintained by accounts/graph.py (API) and accounts/signals.py (ORM .add/.remove).
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
 
     def __str__(self):
         return self.username
 
+
+# "Who to follow": top-K friends-of-friends per user, computed offline by
+# `python manage.py compute_follow_suggestions` (accounts/suggestions.py).
+class FollowSuggestion(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField()  # how many people `user` follows also follow `suggested`
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'suggested')
+        indexes = [
+            models.Index(fields=['user', '-score'], name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.suggested_id} for {self.user_id} ({self.score})"
+
+
+# One processed image, stored once however many users upload it.
+# Files live at avatars/<first 2 hex>/<sha256>/<width>.<webp|jpeg>.
+class ImageAsset(models.Model):
+    sha256 = models.CharField(max_length=64, primary_key=True)  # of the uploaded bytes
+    width = models.PositiveIntegerField()   # of the original, after EXIF rotation
+    height = models.PositiveIntegerField()
+    widths = models.JSONField(default=list)  # variant widths that were generated
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
+# An uploaded picture waiting for the image worker (`manage.py process_image_jobs`).
+class ImageJob(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (PROCESSING, 'Processing'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_jobs')
+    source = models.FileField(upload_to='uploads/', blank=True)  # the raw upload, deleted once processed
+    sha256 = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)  # when a worker picked it up
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker's queue: unfinished jobs, oldest first
+            models.Index(
+                fields=['id'],
+                name='image_job_queue_idx',
+                condition=models.Q(status__in=['pending', 'processing'])
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status} image job {self.pk} for {self.user_id}"
+
 '''
 # tell Django to point to new custom user model in settings.py
 AUTH_USER_MODEL = 'accounts.User'
 '''
-
@@ -0,0 +1,12 @@
+'''Cursor pagination for follower/following lists.'''
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+
+
+class FollowCursorPagination(CursorPagination):
+    # Follow rows have no timestamp; the auto-increment id is unique and
+    # grows with time, so DRF's cursor on it needs no offset and no COUNT.
+    ordering = '-id'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -14,6 +14,8 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
 
+from . import images
+
 
 # ensures compatibility with custom user models
 User = get_user_model()
@@ -59,4 +61,52 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.save()
 
         # Return the created user instance
-        return user
\ No newline at end of file
+        return user
+
+
+class AvatarField(serializers.Field):
+    """
+    URLs of the processed profile picture, {"webp": {"48": url, ...}, "jpeg": {...}}
+    or null. Views select_related('avatar') so this costs no query.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', '*')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, user):
+        if not user.avatar_id:
+            return None
+        return images.variant_urls(user.avatar_id, user.avatar.widths)
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Small read-only user card used in follower/following lists."""
+    avatar = AvatarField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'avatar', 'follower_count', 'following_count']
+        read_only_fields = fields
+
+
+class UserProfileSerializer(serializers.ModelSerializer):
+    """Public profile. Counts are stored columns, no COUNT queries."""
+    avatar = AvatarField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'bio', 'profile_picture', 'avatar', 'follower_count', 'following_count']
+        read_only_fields = fields
+
+
+class AvatarUploadSerializer(serializers.Serializer):
+    image = serializers.FileField()  # decoded by the image worker, not here
+
+
+
+class FollowSuggestionSerializer(serializers.Serializer):
+    """A suggested user and how many people you follow also follow them."""
+    user = UserSummarySerializer(source='suggested')
+    mutual_follows = serializers.IntegerField(source='score')
@@ -0,0 +1,63 @@
+'''Keep cached authentication and follow counters in sync with the database.'''
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate
+from . import graph
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    """A token that was changed or deleted must be looked up again."""
+    invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    """
+    When a user is saved (deactivated, password or profile changed),
+    drop the cached copies of that user behind their tokens.
+    """
+    if created:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        invalidate(key)
+
+
+@receiver(m2m_changed, sender=User.following.through)
+def sync_follow_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep follower_count/following_count right when the ORM API is used
+    (user.following.add/remove/clear, admin). The API views use accounts/graph.py,
+    which updates the counters itself.
+    """
+    if action == 'pre_clear':
+        # remember who is affected before the rows are gone
+        column = 'from_user_id' if reverse else 'to_user_id'
+        field = 'to_user_id' if reverse else 'from_user_id'
+        instance._cleared_follow_ids = set(
+            graph.Follow.objects.filter(**{field: instance.pk}).values_list(column, flat=True)
+        )
+        return
+
+    if action == 'post_add' and pk_set:
+        # pk_set only holds rows that were really inserted
+        if reverse:
+            # instance gained followers
+            User.objects.filter(pk=instance.pk).update(follower_count=F('follower_count') + len(pk_set))
+            User.objects.filter(pk__in=pk_set).update(following_count=F('following_count') + 1)
+        else:
+            User.objects.filter(pk=instance.pk).update(following_count=F('following_count') + len(pk_set))
+            User.objects.filter(pk__in=pk_set).update(follower_count=F('follower_count') + 1)
+
+    elif action in ('post_remove', 'post_clear'):
+        # pk_set may name rows that didn't exist, so recount instead of decrementing
+        affected = set(pk_set or ()) | getattr(instance, '_cleared_follow_ids', set())
+        graph.recount(User.objects.filter(pk__in=affected | {instance.pk}))
@@ -1,3 +1,273 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .authentication import CachedTokenAuthentication, cache_key, cache_settings, local_cache, row_of, shared_ttl
+from .models import FollowSuggestion, ImageAsset, ImageJob
+from . import images
+
+
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('notifications-unread-count')
+
+    # Only the first request pays for the token lookup.
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):  # auth from the LRU, unread count from the cache
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(self.url)
+        self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    # The shared cache only gets the user id; a second process loads the user by pk.
+    def test_shared_cache_holds_the_user_id(self):
+        self.client.get(self.url)
+        self.assertEqual(cache.get(cache_key(self.token.key)), self.user.pk)
+        local_cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    # A user from the LRU is bound to the database it was first read from (a replica, say).
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_local_hit_keeps_the_database_alias(self):
+        self.user._state.db = 'replica_1'
+        local_cache.set(cache_key(self.token.key), row_of(self.user), 5, 10)
+        user, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual((user.pk, user._state.db), (self.user.pk, 'replica_1'))
+
+    # A per-process "shared" cache can't be invalidated from other workers
+    def test_shared_ttl_needs_a_shared_backend(self):
+        options = cache_settings()
+        self.assertEqual(shared_ttl(options), options['LOCAL_TTL'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(shared_ttl(options), options['SHARED_TTL'])
+
+    def test_unknown_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token not-a-real-token')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FollowGraphTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass123')
+        self.bob = User.objects.create_user(username='bob', password='pass123')
+        self.carol = User.objects.create_user(username='carol', password='pass123')
+        self.client.force_authenticate(user=self.alice)
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.follower_count, user.following_count
+
+    # Follow/unfollow keep the stored counts right and are idempotent.
+    def test_follow_and_unfollow_update_counts(self):
+        for _ in range(2):
+            response = self.client.post(reverse('follow-user', args=[self.bob.id]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts(self.alice), (0, 1))
+        self.assertEqual(self.counts(self.bob), (1, 0))
+
+        for _ in range(2):
+            self.client.post(reverse('unfollow-user', args=[self.bob.id]))
+        self.assertEqual(self.counts(self.alice), (0, 0))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+    def test_cannot_follow_yourself(self):
+        response = self.client.post(reverse('follow-user', args=[self.alice.id]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Counters also follow the ORM API (admin, shell, scripts).
+    def test_orm_changes_update_counts(self):
+        self.alice.following.add(self.bob, self.carol)
+        self.carol.followers.add(self.bob)
+        self.assertEqual(self.counts(self.carol), (2, 0))
+        self.assertEqual(self.counts(self.alice), (0, 2))
+
+        self.alice.following.remove(self.carol, self.alice)  # alice isn't followed: ignored
+        self.assertEqual(self.counts(self.carol), (1, 0))
+        self.carol.followers.clear()
+        self.assertEqual(self.counts(self.carol), (0, 0))
+        self.assertEqual(self.counts(self.bob), (1, 0))  # still followed by alice
+
+    # Lists are paginated, newest follow first; the profile is a single lookup.
+    def test_follower_lists_and_profile(self):
+        self.client.post(reverse('follow-user', args=[self.carol.id]))
+        self.client.force_authenticate(user=self.bob)
+        self.client.post(reverse('follow-user', args=[self.carol.id]))
+
+        response = self.client.get(reverse('user-followers', args=[self.carol.id]))
+        self.assertEqual([u['username'] for u in response.data['results']], ['bob', 'alice'])
+
+        response = self.client.get(reverse('user-following', args=[self.alice.id]))
+        self.assertEqual([u['username'] for u in response.data['results']], ['carol'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-profile', args=[self.carol.id]))
+        self.assertEqual((response.data['follower_count'], response.data['following_count']), (2, 0))
+
+    def test_unknown_user(self):
+        response = self.client.get(reverse('user-followers', args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FollowSuggestionTests(APITestCase):
+    # alice follows bob and carol; both follow dave, only bob follows erin
+    def setUp(self):
+        self.users = {name: User.objects.create_user(username=name, password='pass123')
+                      for name in ['alice', 'bob', 'carol', 'dave', 'erin']}
+        u = self.users
+        u['alice'].following.add(u['bob'], u['carol'])
+        u['bob'].following.add(u['dave'], u['erin'], u['alice'])
+        u['carol'].following.add(u['dave'])
+        self.client.force_authenticate(user=u['alice'])
+
+    def suggestions(self):
+        response = self.client.get(reverse('follow-suggestions'))
+        return [(s['user']['username'], s['mutual_follows']) for s in response.data]
+
+    # Friends of friends ranked by mutual follows, excluding self and followed users.
+    def test_friends_of_friends(self):
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggestions(), [('dave', 2), ('erin', 1)])
+
+    def test_top_k_and_rerun(self):
+        call_command('compute_follow_suggestions', top_k=1, stdout=StringIO())
+        self.assertEqual(self.suggestions(), [('dave', 2)])
+
+        # Following dave hides him right away; the next run drops him for good
+        self.users['alice'].following.add(self.users['dave'])
+        self.assertEqual(self.suggestions(), [])
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggestions(), [('erin', 1)])
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.users['carol']).exists())
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, AVATAR_WIDTHS=[48, 96])
+class AvatarPipelineTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('avatar-upload')
+
+    def photo(self, color='red', size=(300, 200)):
+        # A JPEG with EXIF: orientation 6 (rotated 90°) and a camera model
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x0110] = 'SecretCam'
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('me.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def upload(self, file):
+        return self.client.post(self.url, {'image': file}, format='multipart')
+
+    # The request only queues; the worker writes square variants without EXIF.
+    def test_upload_is_processed_by_worker(self):
+        response = self.upload(self.photo())
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(ImageAsset.objects.exists())
+
+        call_command('process_image_jobs', workers=0, once=True, stdout=StringIO())
+
+        job = ImageJob.objects.get()
+        self.assertEqual(job.status, ImageJob.DONE)
+        asset = ImageAsset.objects.get()
+        self.assertEqual((asset.width, asset.height), (200, 300))  # EXIF rotation applied
+        for fmt in images.FORMATS:
+            with default_storage.open(images.variant_path(asset.pk, 96, fmt)) as stored:
+                variant = Image.open(stored)
+                self.assertEqual(variant.size, (96, 96))
+                self.assertNotIn(0x0110, variant.getexif())
+        self.assertFalse(default_storage.exists(job.source.name))  # raw upload removed
+
+        profile = self.client.get(reverse('user-profile', args=[self.user.id])).data
+        self.assertTrue(profile['avatar']['webp']['48'].endswith(f'{asset.pk}/48.webp'))
+
+    # A picture processed before is reused right away, no second job to run.
+    def test_identical_upload_is_shared(self):
+        self.upload(self.photo())
+        images.process_jobs(10)
+
+        other = User.objects.create_user(username='other', password='pass123')
+        self.client.force_authenticate(user=other)
+        response = self.upload(self.photo())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'ready')
+        other.refresh_from_db()
+        self.assertEqual(other.avatar_id, ImageAsset.objects.get().pk)
+
+    # A job finishing late doesn't replace a newer picture.
+    def test_newer_upload_wins(self):
+        self.upload(self.photo('red'))
+        self.upload(self.photo('blue'))
+        images.process_jobs(10)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_id, ImageJob.objects.latest('id').sha256)
+
+    # An unexpected error fails that job only; the worker goes on with the others.
+    def test_unexpected_error_fails_one_job(self):
+        other = User.objects.create_user(username='other', password='pass123')
+        self.upload(self.photo('red'))
+        self.client.force_authenticate(user=other)
+        self.upload(self.photo('blue'))
+
+        errors = [RuntimeError('boom')]
+        render = images.render_variants
+
+        def flaky(*args):
+            if errors:
+                raise errors.pop()
+            return render(*args)
+
+        with mock.patch('accounts.images.render_variants', flaky), self.assertLogs('accounts.images', level='ERROR'):
+            self.assertEqual(images.process_jobs(10), 2)
+
+        self.assertEqual(
+            list(ImageJob.objects.order_by('id').values_list('status', 'error')),
+            [(ImageJob.FAILED, 'boom'), (ImageJob.DONE, '')]
+        )
+        other.refresh_from_db()
+        self.assertIsNotNone(other.avatar_id)
+
+    def test_rejects_non_images(self):
+        response = self.upload(SimpleUploadedFile('x.jpg', b'not an image'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageJob.objects.exists())
@@ -1,6 +1,10 @@
 '''URL routing'''
 from django.urls import path
-from .views import RegisterView, LoginView, FollowUserView, UnfollowUserView
+from .views import (
+    RegisterView, LoginView, FollowUserView, UnfollowUserView,
+    UserProfileView, FollowersListView, FollowingListView, FollowSuggestionsView,
+    AvatarUploadView
+)
 
 urlpatterns = [
     # ex: /api/login
@@ -8,5 +12,16 @@ urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
 
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
-    path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user')
+    path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
+
+    # ex: /api/accounts/users/5/ , /api/accounts/users/5/followers/
+    path('users/<int:user_id>/', UserProfileView.as_view(), name='user-profile'),
+    path('users/<int:user_id>/followers/', FollowersListView.as_view(), name='user-followers'),
+    path('users/<int:user_id>/following/', FollowingListView.as_view(), name='user-following'),
+
+    # ex: /api/accounts/suggestions/ (who to follow)
+    path('suggestions/', FollowSuggestionsView.as_view(), name='follow-suggestions'),
+
+    # ex: /api/accounts/profile/avatar/ (upload a profile picture, see its processing state)
+    path('profile/avatar/', AvatarUploadView.as_view(), name='avatar-upload'),
 ]
@@ -10,7 +10,13 @@ from rest_framework import status
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
 
-from .serializers import RegisterSerializer
+from .serializers import (
+    RegisterSerializer, UserProfileSerializer, UserSummarySerializer, FollowSuggestionSerializer, AvatarUploadSerializer
+)
+from .models import FollowSuggestion, ImageJob
+from .pagination import FollowCursorPagination
+from . import graph, images
+from rest_framework.parsers import MultiPartParser, FormParser
 
 from rest_framework import generics, permissions, status
 from django.shortcuts import get_object_or_404
@@ -113,16 +119,15 @@ class FollowUserView(generics.GenericAPIView):
 
     def post(self, request, user_id):
         # Get the user to follow by ID, or return 404 if not found
-        target_user = get_object_or_404(User.objects.all(), id=user_id)
+        target_user = get_object_or_404(CustomUser.objects.only('id', 'username'), id=user_id)
         current_user = request.user  # The logged-in user making the request
 
         # Prevent following yourself
-        if target_user == current_user:
+        if target_user.pk == current_user.pk:
             return Response({"detail": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Add the target user to the current user's following list
-        current_user.following.add(target_user)
-        current_user.save()
+        # One INSERT for the follow row + counter updates, no full user save
+        graph.follow(current_user.pk, target_user.pk)
 
         return Response({"detail": f"You are now following {target_user.username}."}, status=status.HTTP_200_OK)
 
@@ -136,17 +141,119 @@ class UnfollowUserView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]  # Only logged-in users can unfollow
 
     def post(self, request, user_id):
-        target_user = get_object_or_404(User.objects.all(), id=user_id)
+        target_user = get_object_or_404(CustomUser.objects.only('id', 'username'), id=user_id)
         current_user = request.user
 
         # Prevent unfollowing yourself
-        if target_user == current_user:
+        if target_user.pk == current_user.pk:
             return Response({"detail": "You cannot unfollow yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Remove the target user from the current user's following list
-        current_user.following.remove(target_user)
-        current_user.save()
+        # One DELETE for the follow row + counter updates
+        graph.unfollow(current_user.pk, target_user.pk)
 
         return Response({"detail": f"You have unfollowed {target_user.username}."}, status=status.HTTP_200_OK)
 
 
+#----------------------------------------profiles & follow lists--------------------------------------------#
+
+class UserProfileView(generics.RetrieveAPIView):
+    """
+    Public profile with follower/following counts.
+    Counts are stored on the user row, so this is one primary-key lookup.
+    """
+    queryset = CustomUser.objects.select_related('avatar')
+    serializer_class = UserProfileSerializer
+    permission_classes = [permissions.AllowAny]
+    lookup_url_kwarg = 'user_id'
+
+
+class FollowListView(generics.ListAPIView):
+    """
+    Base for the followers/following lists: pages over follow rows, newest follow first.
+    `user_field` is the side that must match the URL user, `other_field` the side listed.
+    """
+    serializer_class = UserSummarySerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = FollowCursorPagination
+    filter_backends = []  # nothing to filter or search here
+    user_field = None
+    other_field = None
+
+    def get_queryset(self):
+        get_object_or_404(CustomUser.objects.only('id'), id=self.kwargs['user_id'])
+        return graph.Follow.objects.filter(
+            **{f'{self.user_field}_id': self.kwargs['user_id']}
+        ).select_related(f'{self.other_field}__avatar')
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        users = [getattr(row, self.other_field) for row in page]
+        return self.get_paginated_response(self.get_serializer(users, many=True).data)
+
+
+# GET /api/accounts/users/<id>/followers/
+class FollowersListView(FollowListView):
+    user_field = 'to_user'
+    other_field = 'from_user'
+
+
+# GET /api/accounts/users/<id>/following/
+class FollowingListView(FollowListView):
+    user_field = 'from_user'
+    other_field = 'to_user'
+
+
+#----------------------------------------who to follow--------------------------------------------#
+
+class FollowSuggestionsView(generics.ListAPIView):
+    """
+    Read-only "who to follow" list for the logged-in user.
+    Computed offline by `manage.py compute_follow_suggestions`; this only reads the stored top-K.
+    """
+    serializer_class = FollowSuggestionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # top-K is already small
+    filter_backends = []
+
+    def get_queryset(self):
+        return FollowSuggestion.objects.filter(
+            user=self.request.user
+        ).exclude(
+            suggested__followers=self.request.user  # followed since the last run
+        ).select_related('suggested__avatar').order_by('-score', 'suggested_id')
+
+
+#----------------------------------------profile picture--------------------------------------------#
+
+class AvatarUploadView(generics.GenericAPIView):
+    """
+    POST a profile picture (multipart field "image"). The request only stores
+    the file and queues it; `manage.py process_image_jobs` makes the variants.
+    202 {"status": "queued", "job": id}, or 200 with the URLs if the same
+    picture was processed before. GET shows the state of the latest upload.
+    """
+    serializer_class = AvatarUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            state, result = images.submit_upload(request.user, serializer.validated_data['image'])
+        except images.InvalidImage as error:
+            return Response({"image": [str(error)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if state == 'ready':
+            return Response({"status": "ready", "avatar": images.variant_urls(result.pk, result.widths)},
+                            status=status.HTTP_200_OK)
+        return Response({"status": "queued", "job": result.pk}, status=status.HTTP_202_ACCEPTED)
+
+    def get(self, request):
+        job = ImageJob.objects.filter(user=request.user).order_by('-id').first()
+        user = CustomUser.objects.select_related('avatar').get(pk=request.user.pk)
+        return Response({
+            "status": job.status if job else None,
+            "error": job.error if job else "",
+            "avatar": UserProfileSerializer(user).data['avatar'],
+        })
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+# Tooling only (no models): synthetic data, endpoint benchmarks, local replica stand-ins.
+class BenchmarksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'benchmarks'
@@ -0,0 +1,252 @@
+'''
+Synthetic social data for load tests.
+
+Everything is written with bulk_create (no signals, no per-row saves), then the
+derived data the signals would have maintained is rebuilt in bulk: follower and
+post counters, trending scores, home feeds, unread counters and the search index.
+
+The follow graph is power-law: each user follows a geometric number of people,
+picked with probability proportional to (popularity rank) ** -alpha, so a few
+accounts get most of the followers, as on a real network. Likes follow the same
+skew: posts by popular authors get more of them.
+'''
+
+import contextlib
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts import graph
+from notifications import unread
+from notifications.models import Notification
+from posts import feed, search
+from posts.models import Post, Comment, Like, FeedEntry
+from posts.management.commands.recount_post_counters import recount_posts, recount_replies
+from posts.management.commands.rescore_trending import rescore_posts
+
+
+User = get_user_model()
+Follow = User.following.through
+
+PASSWORD = 'bench-pass-123'  # every generated user can log in with it
+
+WORDS = (
+    'django python api cache index query feed like follow post comment thread search image '
+    'stream latency database postgres sqlite redis travel food music coffee weekend code '
+    'deploy review bug release design mobile photo sunset city mountain book movie team'
+).split()
+
+
+@contextlib.contextmanager
+def manual_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we set (auto_now* off)."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Generator:
+    def __init__(self, users=1000, avg_follows=20, alpha=1.1, avg_posts=5, avg_likes=3.0,
+                 avg_comments=1.0, reply_ratio=0.3, days=30, read_ratio=0.7, seed=0,
+                 batch_size=2000, prefix='gen'):
+        self.n = users
+        self.avg_follows = avg_follows
+        self.alpha = alpha
+        self.avg_posts = avg_posts
+        self.avg_likes = avg_likes
+        self.avg_comments = avg_comments
+        self.reply_ratio = reply_ratio
+        self.days = days
+        self.read_ratio = read_ratio
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.rng = np.random.default_rng(seed)
+        self.now = timezone.now()
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choice(WORDS, size=int(self.rng.integers(low, high))))
+
+    def when(self, size):
+        """`size` random times in the last `days` days."""
+        seconds = self.rng.uniform(0, self.days * 86400, size=size)
+        return [self.now - timedelta(seconds=float(s)) for s in seconds]
+
+    # =========================
+    # STEPS
+    # =========================
+
+    def create_users(self):
+        start = User.objects.filter(username__startswith=f'{self.prefix}_').count()
+        password = make_password(PASSWORD)  # hashed once, not once per user
+        users = User.objects.bulk_create(
+            [
+                User(username=f'{self.prefix}_{start + i}', password=password, bio=self.text(3, 12))
+                for i in range(self.n)
+            ],
+            batch_size=self.batch_size
+        )
+        Token.objects.bulk_create([Token(key=Token.generate_key(), user=user) for user in users], batch_size=self.batch_size)
+        self.user_ids = np.array([user.pk for user in users])
+        self.usernames = {user.pk: user.username for user in users}
+
+        # Popularity: rank r (shuffled over users) is followed with weight (r + 1) ** -alpha
+        weights = (np.arange(self.n) + 1.0) ** -self.alpha
+        self.rng.shuffle(weights)
+        self.weights = weights / weights.sum()
+
+    def create_follows(self):
+        degrees = np.minimum(self.rng.geometric(1.0 / max(self.avg_follows, 1), size=self.n), self.n - 1)
+        targets = self.rng.choice(self.n, size=int(degrees.sum()), p=self.weights)
+        sources = np.repeat(np.arange(self.n), degrees)
+
+        edges = {(int(s), int(t)) for s, t in zip(sources, targets) if s != t}
+        self.following = defaultdict(list)  # follower index → followee indexes
+        for s, t in edges:
+            self.following[s].append(t)
+
+        Follow.objects.bulk_create(
+            [Follow(from_user_id=self.user_ids[s], to_user_id=self.user_ids[t]) for s, t in edges],
+            batch_size=self.batch_size,
+            ignore_conflicts=True
+        )
+        graph.recount(User.objects.filter(pk__in=self.user_ids.tolist()))
+        self.follower_counts = np.bincount([t for _, t in edges], minlength=self.n)
+        return len(edges)
+
+    def create_posts(self):
+        counts = self.rng.poisson(self.avg_posts, size=self.n)
+        authors = np.repeat(np.arange(self.n), counts)
+        times = self.when(len(authors))
+        with manual_timestamps(Post):
+            posts = Post.objects.bulk_create(
+                [
+                    Post(author_id=self.user_ids[a], title=self.text(2, 6), content=self.text(10, 60),
+                         created_at=t, updated_at=t)
+                    for a, t in zip(authors, times)
+                ],
+                batch_size=self.batch_size
+            )
+        self.posts = [(post.pk, int(a), post.created_at) for post, a in zip(posts, authors)]
+        return len(posts)
+
+    def create_likes(self):
+        # Popular authors' posts get proportionally more likes
+        popularity = (self.follower_counts + 1) / (self.follower_counts.mean() + 1)
+        self.likers = defaultdict(list)  # post id → liker indexes, oldest first
+        likes = []
+        for post_id, author, created_at in self.posts:
+            k = min(int(self.rng.poisson(self.avg_likes * popularity[author])), self.n - 1)
+            for liker in set(self.rng.choice(self.n, size=k, p=self.weights).tolist()) - {author}:
+                liked_at = created_at + timedelta(seconds=float(self.rng.uniform(0, 86400)))
+                self.likers[post_id].append(liker)
+                likes.append(Like(user_id=self.user_ids[liker], post_id=post_id, created_at=min(liked_at, self.now)))
+        with manual_timestamps(Like):
+            Like.objects.bulk_create(likes, batch_size=self.batch_size, ignore_conflicts=True)
+        return len(likes)
+
+    def create_comments(self):
+        top_level, replies = [], []
+        for post_id, _, created_at in self.posts:
+            for _ in range(int(self.rng.poisson(self.avg_comments))):
+                t = min(created_at + timedelta(seconds=float(self.rng.uniform(0, 86400))), self.now)
+                top_level.append(Comment(post_id=post_id, author_id=int(self.rng.choice(self.user_ids)),
+                                         content=self.text(3, 20), created_at=t, updated_at=t))
+        with manual_timestamps(Comment):
+            top_level = Comment.objects.bulk_create(top_level, batch_size=self.batch_size)
+            for parent in top_level:
+                if self.rng.random() < self.reply_ratio:
+                    for _ in range(1 + int(self.rng.poisson(1))):
+                        t = min(parent.created_at + timedelta(seconds=float(self.rng.uniform(0, 3600))), self.now)
+                        replies.append(Comment(post_id=parent.post_id, parent_id=parent.pk,
+                                               author_id=int(self.rng.choice(self.user_ids)),
+                                               content=self.text(3, 20), created_at=t, updated_at=t))
+            Comment.objects.bulk_create(replies, batch_size=self.batch_size)
+        return len(top_level) + len(replies)
+
+    def create_notifications(self):
+        """One grouped "liked your post" notification per liked post, like the outbox worker makes."""
+        post_type = ContentType.objects.get_for_model(Post)
+        notifications = []
+        for post_id, author, created_at in self.posts:
+            likers = self.likers.get(post_id)
+            if not likers:
+                continue
+            recent = [self.user_ids[i] for i in reversed(likers[-3:])]
+            notifications.append(Notification(
+                recipient_id=self.user_ids[author],
+                actor_id=recent[0],
+                verb='liked your post',
+                target_content_type=post_type,
+                target_object_id=post_id,
+                actor_count=len(likers),
+                recent_actors=[{'id': int(pk), 'username': self.usernames[pk]} for pk in recent],
+                is_read=bool(self.rng.random() < self.read_ratio),
+                timestamp=min(created_at + timedelta(hours=1), self.now),
+            ))
+        Notification.objects.bulk_create(notifications, batch_size=self.batch_size)
+        return len(notifications)
+
+    def build_feeds(self):
+        """What fan-out on write and follow backfill would have produced."""
+        limit = getattr(settings, 'FEED_BACKFILL_LIMIT', 50)
+        pull_limit = feed.fanout_max_followers()  # bigger authors are pulled at read time
+
+        posts_by_author = defaultdict(list)
+        for post_id, author, created_at in self.posts:
+            posts_by_author[author].append((created_at, post_id))
+        for posts in posts_by_author.values():
+            posts.sort(reverse=True)
+            del posts[limit:]
+
+        entries = []
+        for owner in range(self.n):
+            authors = [owner] + [a for a in self.following.get(owner, ()) if self.follower_counts[a] <= pull_limit]
+            for author in authors:
+                for created_at, post_id in posts_by_author.get(author, ()):
+                    entries.append(FeedEntry(owner_id=self.user_ids[owner], post_id=post_id,
+                                             author_id=self.user_ids[author], created_at=created_at))
+                if len(entries) >= self.batch_size:
+                    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+                    entries = []
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    def rebuild_counters(self):
+        posts = Post.objects.filter(author_id__in=self.user_ids.tolist())
+        recount_posts(posts)
+        recount_replies(posts)
+        post_ids = list(posts.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(post_ids), self.batch_size):
+            rescore_posts(post_ids[start:start + self.batch_size])
+        for user_id in self.user_ids.tolist():
+            unread.recount(user_id)
+        search.rebuild()
+
+    def run(self):
+        summary = {}
+        with transaction.atomic():
+            self.create_users()
+            summary['users'] = self.n
+            summary['follows'] = self.create_follows()
+            summary['posts'] = self.create_posts()
+            summary['likes'] = self.create_likes()
+            summary['comments'] = self.create_comments()
+            summary['notifications'] = self.create_notifications()
+            self.build_feeds()
+            self.rebuild_counters()
+        return summary
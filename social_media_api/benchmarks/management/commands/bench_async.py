@@ -0,0 +1,255 @@
+'''
+Load the read endpoints over real HTTP at rising concurrency and compare servers.
+
+    python manage.py generate_social_data --users 2000        # once
+    python manage.py bench_async --workers 4 --concurrency 1 16 64 256 --output async.json
+    python manage.py bench_async --url drf=http://127.0.0.1:8000 --url async=http://127.0.0.1:8001
+
+By default it starts, on free local ports, with the same number of workers:
+  - gunicorn (sync workers, as in the Procfile) on social_media_api.wsgi,
+  - uvicorn on social_media_api.asgi (async views, see asgi_urls.py),
+skipping a server whose executable is not installed. --url benchmarks
+servers that are already running instead.
+
+For each concurrency level C, C keep-alive connections send requests back to
+back for --duration seconds, as randomly picked users that have a token. A
+sync worker serves one request at a time, so past `workers` connections the
+rest wait in the listen queue: throughput flattens and p99 grows with C. The
+ASGI server keeps accepting: its async views wait without a thread (nothing
+sync-only in MIDDLEWARE, see asgi.py); its limit is the one thread that runs
+the ORM calls.
+
+Reports requests/s, p50/p99 latency in ms (connect time included: sync
+workers close the connection after every response) and errors per endpoint.
+'''
+
+import asyncio
+import json
+import random
+import shutil
+import socket
+import subprocess
+import time
+from urllib.parse import urlsplit
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from posts.models import Post
+from .bench_endpoints import git_commit, percentile
+
+
+# Each endpoint picks a path per request
+ENDPOINTS = {
+    'post_list': lambda rng, post_ids: '/api/posts/',
+    'post_detail': lambda rng, post_ids: f'/api/posts/{rng.choice(post_ids)}/',
+    'notifications': lambda rng, post_ids: '/api/notifications/',
+    'unread_count': lambda rng, post_ids: '/api/notifications/unread-count/',
+}
+
+
+# =========================
+# SERVERS
+# =========================
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_commands(workers, port):
+    return {
+        'gunicorn-wsgi': [
+            'gunicorn', 'social_media_api.wsgi:application', '--workers', str(workers),
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ],
+        'uvicorn-asgi': [
+            'uvicorn', 'social_media_api.asgi:application', '--workers', str(workers),
+            '--host', '127.0.0.1', '--port', str(port), '--no-access-log', '--log-level', 'warning',
+        ],
+    }
+
+
+def wait_until_listening(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'Server exited with code {process.returncode}.')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Nothing listening on port {port} after {timeout}s.')
+
+
+# =========================
+# LOAD GENERATOR
+# =========================
+# A minimal HTTP/1.1 client on asyncio streams: no third-party client in the
+# way, and thousands of connections from one process.
+
+async def read_response(reader):
+    """(status, close) of one response; the body is read and dropped."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)  # chunk + CRLF
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') == 'close'
+
+
+async def load(host, port, paths, tokens, concurrency, duration, timeout=30, seed=0):
+    """Run `concurrency` connections for `duration` seconds; latencies in ms, statuses, errors."""
+    rng = random.Random(seed)
+    latencies, statuses, errors = [], {}, [0]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def connection_loop():
+        streams = None
+        while loop.time() < deadline:
+            request = (
+                f'GET {paths(rng)} HTTP/1.1\r\nHost: {host}\r\n'
+                f'Authorization: Token {rng.choice(tokens)}\r\n\r\n'
+            ).encode()
+            start = time.perf_counter()
+            try:
+                if streams is None:
+                    streams = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                streams[1].write(request)
+                status, close = await asyncio.wait_for(read_response(streams[0]), timeout)
+            except (OSError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                errors[0] += 1
+                close = True
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if close and streams is not None:
+                streams[1].close()
+                streams = None
+        if streams is not None:
+            streams[1].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connection_loop() for _ in range(concurrency)))
+    return latencies, statuses, errors[0], time.perf_counter() - started
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(latencies, 50) if latencies else None,
+        'p99_ms': percentile(latencies, 99) if latencies else None,
+        'mean_ms': round(float(np.mean(latencies)), 3) if latencies else None,
+        'errors': errors,
+        'status': statuses,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare sync (gunicorn) and async (uvicorn) serving of the read endpoints at rising concurrency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 16, 64],
+                            help='Open connections per run (default: 1 16 64).')
+        parser.add_argument('--duration', type=float, default=5, help='Seconds per endpoint and concurrency level.')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes per server.')
+        parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=list(ENDPOINTS))
+        parser.add_argument('--url', action='append', default=[], metavar='NAME=URL',
+                            help='Benchmark a running server instead of starting them (repeatable).')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        tokens = list(Token.objects.values_list('key', flat=True))
+        post_ids = list(Post.objects.values_list('id', flat=True))
+        if not tokens or not post_ids:
+            raise CommandError('No users with tokens or no posts. Run generate_social_data first.')
+        connection.close()  # the servers need the (SQLite) database more than we do
+
+        results = {}
+        for name, url in self.servers(options):
+            address = urlsplit(url)
+            self.stdout.write(f'{name} ({url})')
+            self.stdout.write(f"{'endpoint':>14} {'conns':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            for endpoint in options['endpoints']:
+                paths = lambda rng, pick=ENDPOINTS[endpoint]: pick(rng, post_ids)
+                for concurrency in options['concurrency']:
+                    row = summarize(*asyncio.run(load(
+                        address.hostname, address.port or 80, paths, tokens,
+                        concurrency, options['duration'], seed=options['seed']
+                    )))
+                    results.setdefault(name, {}).setdefault(endpoint, {})[str(concurrency)] = row
+                    self.stdout.write(
+                        f"{endpoint:>14} {concurrency:>6} {row['rps']:>9.1f} "
+                        f"{row['p50_ms'] or 0:>9.2f} {row['p99_ms'] or 0:>9.2f} {row['errors']:>7}"
+                    )
+
+        if not results:
+            raise CommandError('No server to benchmark: install gunicorn/uvicorn or pass --url.')
+
+        output = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'git_commit': git_commit(),
+                'workers': options['workers'] if not options['url'] else None,
+                'duration_s': options['duration'],
+                'concurrency': options['concurrency'],
+            },
+            'servers': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                json.dump(output, out, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+    def servers(self, options):
+        """Yield (name, base url) per server, starting and stopping it around the run."""
+        if options['url']:
+            for item in options['url']:
+                name, _, url = item.partition('=')
+                yield name, url
+            return
+
+        for name, command in server_commands(options['workers'], 0).items():
+            if shutil.which(command[0]) is None:
+                self.stderr.write(f'{name}: {command[0]} not installed, skipped.')
+                continue
+
+            port = free_port()
+            process = subprocess.Popen(
+                server_commands(options['workers'], port)[name],
+                cwd=settings.BASE_DIR,  # same environment: same settings and database
+            )
+            try:
+                wait_until_listening(port, process)
+                yield name, f'http://127.0.0.1:{port}'
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
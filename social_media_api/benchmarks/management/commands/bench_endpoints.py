@@ -0,0 +1,258 @@
+'''
+Drive the API in-process and report latency, SQL queries and rows per request.
+
+    python manage.py generate_social_data --users 2000        # once
+    python manage.py bench_endpoints --requests 200 --output bench.json
+    python manage.py bench_endpoints --scenarios post_list feed
+
+Requests go through the Django test Client (full middleware + DRF stack, no
+network), authenticated as randomly picked users that have a token. For each
+scenario it reports p50/p95/p99/mean/max latency in ms, SQL queries and SQL
+time per request, and the rows returned (items of a list response, else 1).
+
+The JSON output also records the Django version, database, git commit and
+dataset size, so two files from two versions can be diffed side by side.
+
+Write scenarios leave the data as they found it: like is followed by unlike,
+follow by unfollow, and the notification outbox rows they queue are removed.
+'''
+
+import json
+import random
+import subprocess
+import time
+
+import django
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from benchmarks.dataset import WORDS
+from notifications.models import Notification, NotificationOutbox
+from posts.models import Post, Comment, Like
+from social_media_api.middleware import QueryTimer
+
+
+User = get_user_model()
+Follow = User.following.through
+
+
+# =========================
+# SCENARIOS
+# =========================
+# Each one takes (bench, user) and returns a list of (name, method, url) to
+# run in order as that user. Pairs like like/unlike are timed separately.
+
+def post_list(bench, user):
+    return [('post_list', 'get', '/api/posts/')]
+
+
+def post_detail(bench, user):
+    return [('post_detail', 'get', f'/api/posts/{bench.random_post()}/')]
+
+
+def post_comments(bench, user):
+    return [('post_comments', 'get', f'/api/posts/{bench.random_post()}/comments/')]
+
+
+def post_search(bench, user):
+    return [('post_search', 'get', f'/api/posts/search/?q={bench.rng.choice(WORDS)}')]
+
+
+def post_trending(bench, user):
+    return [('post_trending', 'get', '/api/posts/trending/')]
+
+
+def feed(bench, user):
+    return [('feed', 'get', '/api/feed/')]
+
+
+def notifications(bench, user):
+    return [('notifications', 'get', '/api/notifications/')]
+
+
+def unread_count(bench, user):
+    return [('unread_count', 'get', '/api/notifications/unread-count/')]
+
+
+def like(bench, user):
+    post_id = bench.random_post(not_liked_by=user)
+    return [
+        ('like', 'post', f'/api/posts/{post_id}/like/'),
+        ('unlike', 'post', f'/api/posts/{post_id}/unlike/'),
+    ]
+
+
+def follow(bench, user):
+    target = bench.random_user(not_followed_by=user)
+    return [
+        ('follow', 'post', f'/api/accounts/follow/{target}/'),
+        ('unfollow', 'post', f'/api/accounts/unfollow/{target}/'),
+    ]
+
+
+SCENARIOS = {
+    'post_list': post_list,
+    'post_detail': post_detail,
+    'post_comments': post_comments,
+    'post_search': post_search,
+    'post_trending': post_trending,
+    'feed': feed,
+    'notifications': notifications,
+    'unread_count': unread_count,
+    'like': like,
+    'follow': follow,
+}
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 3)
+
+
+def rows_in(response):
+    try:
+        data = response.json()
+    except ValueError:
+        return 0
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return len(data['results'])
+    if isinstance(data, list):
+        return len(data)
+    return 1
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Bench:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.client = Client(SERVER_NAME='localhost')  # must be in ALLOWED_HOSTS
+        self.tokens = list(Token.objects.values_list('user_id', 'key'))
+        self.post_ids = list(Post.objects.values_list('id', flat=True))
+        self.user_ids = [user_id for user_id, _ in self.tokens]
+        if not self.tokens or not self.post_ids:
+            raise CommandError('No users with tokens or no posts. Run generate_social_data first.')
+        self.samples = {}  # name → {'ms': [], 'queries': [], 'db_ms': [], 'rows': [], 'status': {}}
+
+    def random_post(self, not_liked_by=None):
+        for _ in range(20):
+            post_id = self.rng.choice(self.post_ids)
+            if not_liked_by is None or not Like.objects.filter(user_id=not_liked_by, post_id=post_id).exists():
+                return post_id
+        return post_id
+
+    def random_user(self, not_followed_by):
+        for _ in range(20):
+            user_id = self.rng.choice(self.user_ids)
+            if user_id != not_followed_by and not Follow.objects.filter(
+                    from_user_id=not_followed_by, to_user_id=user_id).exists():
+                return user_id
+        return user_id
+
+    def run(self, scenario, record=True):
+        user_id, key = self.rng.choice(self.tokens)
+        for name, method, url in scenario(self, user_id):
+            queries = QueryTimer()
+            with connection.execute_wrapper(queries):
+                start = time.perf_counter()
+                response = getattr(self.client, method)(url, headers={'Authorization': f'Token {key}'})
+                elapsed = time.perf_counter() - start
+            if not record:
+                continue
+            sample = self.samples.setdefault(name, {'ms': [], 'queries': [], 'db_ms': [], 'rows': [], 'status': {}})
+            sample['ms'].append(elapsed * 1000)
+            sample['queries'].append(queries.count)
+            sample['db_ms'].append(queries.seconds * 1000)
+            sample['rows'].append(rows_in(response))
+            status = str(response.status_code)
+            sample['status'][status] = sample['status'].get(status, 0) + 1
+
+    def report(self):
+        return {
+            name: {
+                'requests': len(sample['ms']),
+                'p50_ms': percentile(sample['ms'], 50),
+                'p95_ms': percentile(sample['ms'], 95),
+                'p99_ms': percentile(sample['ms'], 99),
+                'mean_ms': round(float(np.mean(sample['ms'])), 3),
+                'max_ms': round(max(sample['ms']), 3),
+                'queries_mean': round(float(np.mean(sample['queries'])), 2),
+                'queries_max': max(sample['queries']),
+                'db_ms_mean': round(float(np.mean(sample['db_ms'])), 3),
+                'rows_mean': round(float(np.mean(sample['rows'])), 2),
+                'status': sample['status'],
+            }
+            for name, sample in self.samples.items()
+        }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the API endpoints in-process (latency percentiles, queries and rows per request).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS),
+                            help='Scenarios to run (default: all).')
+        parser.add_argument('--requests', type=int, default=100, help='Timed runs per scenario.')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed runs per scenario first.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for users and posts picked.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        bench = Bench(options['seed'])
+        first_outbox_id = NotificationOutbox.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        try:
+            for name in options['scenarios']:
+                scenario = SCENARIOS[name]
+                for _ in range(options['warmup']):
+                    bench.run(scenario, record=False)
+                for _ in range(options['requests']):
+                    bench.run(scenario)
+        finally:
+            # Undo what the like/follow scenarios queued for the notification worker
+            NotificationOutbox.objects.filter(id__gt=first_outbox_id).delete()
+
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'git_commit': git_commit(),
+                'requests_per_scenario': options['requests'],
+                'seed': options['seed'],
+                'dataset': {
+                    'users': User.objects.count(),
+                    'follows': Follow.objects.count(),
+                    'posts': Post.objects.count(),
+                    'likes': Like.objects.count(),
+                    'comments': Comment.objects.count(),
+                    'notifications': Notification.objects.count(),
+                },
+            },
+            'endpoints': bench.report(),
+        }
+
+        self.stdout.write(
+            f"{'endpoint':>14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'db ms':>7} {'rows':>6}"
+        )
+        for name, row in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:>14} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                f"{row['queries_mean']:>8.1f} {row['db_ms_mean']:>7.2f} {row['rows_mean']:>6.1f}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                json.dump(results, out, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
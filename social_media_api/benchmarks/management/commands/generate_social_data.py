@@ -0,0 +1,56 @@
+'''
+Fill the database with a synthetic social network for load tests.
+
+    python manage.py generate_social_data --users 10000
+    python manage.py generate_social_data --users 500 --posts-per-user 20 --seed 7
+
+Users are named <prefix>_<n> and all share the password "bench-pass-123";
+each one gets an auth token. Runs again add more users next to the old ones.
+See benchmarks/dataset.py for how the graph and activity are shaped.
+'''
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.dataset import Generator
+
+
+class Command(BaseCommand):
+    help = 'Generate users, a power-law follow graph, posts, likes, comments and notifications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create.')
+        parser.add_argument('--follows-per-user', type=float, default=20, help='Average people followed per user.')
+        parser.add_argument('--alpha', type=float, default=1.1, help='Power-law exponent of popularity (higher = more skewed).')
+        parser.add_argument('--posts-per-user', type=float, default=5, help='Average posts per user.')
+        parser.add_argument('--likes-per-post', type=float, default=3, help='Average likes per post (scaled by author popularity).')
+        parser.add_argument('--comments-per-post', type=float, default=1, help='Average top-level comments per post.')
+        parser.add_argument('--days', type=int, default=30, help='Spread post dates over this many days.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (same seed, same dataset).')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk insert.')
+        parser.add_argument('--prefix', default='gen', help='Username prefix.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('--users must be at least 2.')
+
+        generator = Generator(
+            users=options['users'],
+            avg_follows=options['follows_per_user'],
+            alpha=options['alpha'],
+            avg_posts=options['posts_per_user'],
+            avg_likes=options['likes_per_post'],
+            avg_comments=options['comments_per_post'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+        )
+        start = time.perf_counter()
+        summary = generator.run()
+        elapsed = time.perf_counter() - start
+
+        for name, count in summary.items():
+            self.stdout.write(f'{name:>14}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Generated in {elapsed:.1f}s.'))
@@ -0,0 +1,51 @@
+'''
+Refresh the local SQLite stand-in replicas from the primary database file.
+
+    SQLITE_REPLICAS=2 python manage.py sync_sqlite_replicas              # once
+    SQLITE_REPLICAS=2 python manage.py sync_sqlite_replicas --interval 3  # every 3s, like a lagging replica
+
+Start the dev server with the same SQLITE_REPLICAS value: GET requests then
+read the copies, so a write only shows up there after the next sync, unless
+the client is pinned to the primary (REPLICA_PIN_SECONDS after its write).
+'''
+
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def copy_database(source_path, target_path):
+    """Consistent snapshot of one SQLite file into another (the online backup API)."""
+    source = sqlite3.connect(str(source_path))
+    target = sqlite3.connect(str(target_path))
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into every SQLite replica alias.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Repeat every N seconds (0 = once).')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        targets = [
+            settings.DATABASES[alias]['NAME'] for alias in settings.DATABASE_REPLICAS
+            if settings.DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3'
+        ]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or not targets:
+            raise CommandError('Needs a SQLite primary and SQLITE_REPLICAS=<n> in the environment.')
+
+        while True:
+            for target in targets:
+                copy_database(primary['NAME'], target)
+            self.stdout.write(f'Synced {len(targets)} replica(s).')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from rest_framework.test import APITestCase
+
+from benchmarks.management.commands.bench_async import load
+from notifications.models import NotificationOutbox, UnreadCounter
+from posts.models import Post, Like, FeedEntry
+
+
+User = get_user_model()
+
+
+class GenerateSocialDataTests(APITestCase):
+    def setUp(self):
+        call_command('generate_social_data', users=40, follows_per_user=5, posts_per_user=2,
+                     seed=1, stdout=StringIO())
+
+    def test_counters_match_the_rows(self):
+        users = User.objects.filter(username__startswith='gen_')
+        self.assertEqual(users.count(), 40)
+        for user in users.annotate(n_followers=Count('followers', distinct=True), n_following=Count('following', distinct=True)):
+            self.assertEqual((user.follower_count, user.following_count), (user.n_followers, user.n_following))
+        for post in Post.objects.annotate(n_likes=Count('likes', distinct=True), n_comments=Count('comments', distinct=True)):
+            self.assertEqual((post.like_count, post.comment_count), (post.n_likes, post.n_comments))
+        self.assertEqual(UnreadCounter.objects.count(), 40)
+
+    def test_users_can_log_in_and_see_their_feed(self):
+        post = Post.objects.order_by('id').first()
+        self.assertTrue(FeedEntry.objects.filter(owner_id=post.author_id, post=post).exists())
+        response = self.client.post('/api/accounts/login/', {'username': post.author.username, 'password': 'bench-pass-123'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_same_seed_same_graph(self):
+        call_command('generate_social_data', users=40, follows_per_user=5, posts_per_user=2,
+                     seed=1, prefix='again', stdout=StringIO())
+        first = User.objects.filter(username__startswith='gen_').order_by('id').values_list('following_count', flat=True)
+        second = User.objects.filter(username__startswith='again_').order_by('id').values_list('following_count', flat=True)
+        self.assertEqual(list(first), list(second))
+
+
+class BenchEndpointsTests(APITestCase):
+    def test_writes_results_and_leaves_data_unchanged(self):
+        call_command('generate_social_data', users=20, follows_per_user=3, posts_per_user=2, stdout=StringIO())
+        likes = Like.objects.count()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            call_command('bench_endpoints', requests=3, warmup=1, output=path, stdout=StringIO())
+            with open(path) as results_file:
+                results = json.load(results_file)
+
+        self.assertEqual(results['meta']['dataset']['users'], 20)
+        for name in ['post_list', 'post_detail', 'like', 'unlike', 'follow', 'unfollow', 'notifications']:
+            row = results['endpoints'][name]
+            self.assertEqual(row['requests'], 3)
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['queries_mean'], 0)
+            self.assertEqual(sum(row['status'].values()), 3)
+            self.assertTrue(set(row['status']) <= {'200', '201'}, row['status'])
+        self.assertEqual(Like.objects.count(), likes)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+
+class BenchAsyncLoadTests(APITestCase):
+    def test_keep_alive_and_closing_servers(self):
+        # A fake server: keep-alive answers on /keep, "Connection: close" on /close
+        async def handle(reader, writer):
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while await reader.readline() not in (b'\r\n', b''):
+                    pass
+                close = b'/close' in request_line
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n'
+                             + (b'Connection: close\r\n' if close else b'') + b'\r\n{}')
+                await writer.drain()
+                if close:
+                    break
+            writer.close()
+
+        async def run(path):
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await load('127.0.0.1', port, lambda rng: path, ['key'], concurrency=4, duration=0.2)
+
+        for path in ['/keep', '/close']:
+            latencies, statuses, errors, elapsed = asyncio.run(run(path))
+            self.assertGreater(len(latencies), 4)
+            self.assertEqual(statuses, {'200': len(latencies)})
+            self.assertEqual(errors, 0)
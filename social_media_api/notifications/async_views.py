@@ -0,0 +1,27 @@
+'''
+Async versions of GET /api/notifications/ and GET /api/notifications/unread-count/
+(served under ASGI, see social_media_api/asgi_urls.py). Same JSON as
+NotificationListView and UnreadCountView in views.py.
+'''
+
+from social_media_api.async_views import async_read_view, json_response
+from .models import Notification
+from .pagination import NotificationCursorPagination
+from .serializers import NotificationSerializer
+from .views import NotificationListView, UnreadCountView
+from . import unread
+
+
+@async_read_view(NotificationListView, login_required=True)
+async def notification_list(request):
+    paginator = NotificationCursorPagination()
+    # actor joined in: the summary of an ungrouped notification reads it, and
+    # a lazy foreign key load is a sync query (not allowed in async code)
+    queryset = Notification.objects.filter(recipient_id=request.user.pk).select_related('actor')
+    page = await paginator.apaginate_queryset(queryset, request)
+    return json_response(paginator.get_paginated_data(NotificationSerializer(page, many=True).data))
+
+
+@async_read_view(UnreadCountView, login_required=True)
+async def unread_count(request):
+    return json_response({"unread_count": await unread.aget_unread_count(request.user.pk)})
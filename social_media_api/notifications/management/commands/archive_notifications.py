@@ -0,0 +1,43 @@
+'''
+Move old, read notifications out of the hot table.
+
+    python manage.py archive_notifications                         # into NotificationArchive
+    python manage.py archive_notifications --to ndjson --file old.ndjson
+    python manage.py archive_notifications --days 30 --dry-run
+'''
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications import retention
+
+
+class Command(BaseCommand):
+    help = 'Archive read notifications older than the retention window, in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Keep this many days (default NOTIFICATION_RETENTION_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per transaction.')
+        parser.add_argument('--to', choices=['table', 'ndjson'], default='table', help='Where archived rows go.')
+        parser.add_argument('--file', help='NDJSON file to append to (with --to ndjson).')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived.')
+
+    def handle(self, *args, **options):
+        if options['to'] == 'ndjson':
+            if not options['file']:
+                raise CommandError('--file is required with --to ndjson')
+            archive = retention.NDJSONArchive(options['file'])
+        else:
+            archive = retention.TableArchive()
+
+        try:
+            moved = retention.archive_expired(
+                archive,
+                days=options['days'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run']
+            )
+        finally:
+            archive.close()
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {moved} notifications.'))
@@ -0,0 +1,35 @@
+'''
+Background worker: move rows from the notification outbox into Notification.
+
+    python manage.py process_notification_outbox            # run forever
+    python manage.py process_notification_outbox --once     # drain and exit
+'''
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications import outbox
+
+
+class Command(BaseCommand):
+    help = 'Create notifications from the outbox in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per bulk insert.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is empty.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = outbox.drain(options['batch_size'])
+            total += processed
+
+            if processed:
+                continue  # keep going while there is a backlog
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} outbox rows.'))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 07:26
+
+from django.db import migrations, models
+
+
+def backfill_recent_actors(apps, schema_editor):
+    # Existing rows are single-actor notifications
+    Notification = apps.get_model('notifications', 'Notification')
+    batch = []
+    for notification in Notification.objects.select_related('actor').iterator(chunk_size=1000):
+        notification.recent_actors = [{'id': notification.actor_id, 'username': notification.actor.username}]
+        batch.append(notification)
+        if len(batch) >= 1000:
+            Notification.objects.bulk_update(batch, ['recent_actors'])
+            batch = []
+    if batch:
+        Notification.objects.bulk_update(batch, ['recent_actors'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recent_actors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill_recent_actors, migrations.RunPython.noop),
+    ]
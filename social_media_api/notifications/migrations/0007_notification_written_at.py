@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:55
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_written_at(apps, schema_editor):
+    # Existing rows: their last write is at least as recent as their timestamp
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.update(written_at=models.F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notifications', '0006_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='written_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['written_at', 'id'], name='notif_written_idx'),
+        ),
+        migrations.RunPython(backfill_written_at, migrations.RunPython.noop),
+    ]
@@ -36,11 +36,73 @@ class Notification(models.Model):
     # combines the two fields above to a real python object
     target = GenericForeignKey('target_content_type', 'target_object_id')
     is_read = models.BooleanField(default=False)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # default (not auto_now_add) so the outbox worker can keep the time of the action
+    # For grouped notifications this is the time of the latest action
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    # Grouping: "alice and 41 others liked your post" is ONE row.
+    # `actor` is the most recent actor, `actor_count` how many acted,
+    # `recent_actors` the last few as [{"id": 2, "username": "alice"}, ...], newest first.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+    # When the row was last written (created, or another actor grouped into it).
+    # Unlike `timestamp` it follows write order, so the SSE poller reads new rows by it.
+    written_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # GET /api/notifications/ : one recipient, newest first
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notif_recipient_recent_idx'),
+            # notifications/stream.py : rows written since the last poll
+            models.Index(fields=['written_at', 'id'], name='notif_written_idx'),
+            # unread only (recount, mark-read, grouping lookup); partial so it stays small
+            models.Index(
+                fields=['recipient', 'timestamp'],
+                condition=models.Q(is_read=False),
+                name='notif_unread_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.actor} {self.verb} -> {self.recipient}"
 
+
+# Every actor grouped into a notification, one row each, so a repeat actor is
+# recognised however many others came in between (`recent_actors` only keeps
+# the last few). Written by notifications/outbox.py.
+class NotificationActor(models.Model):
+    notification = models.ForeignKey(Notification, related_name='+', on_delete=models.CASCADE)
+    actor = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'actor'], name='unique_notification_actor'),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} in notification {self.notification_id}"
+
+
+# A notification that still has to be created.
+# Written in the same transaction as the action (like, follow, ...) so the
+# request does one cheap insert; `process_notification_outbox` turns these
+# rows into Notification rows in batches.
+class NotificationOutbox(models.Model):
+    recipient = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    actor = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    verb = models.CharField(max_length=255)
+    target_content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    target_object_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)  # when the action happened
+
+    def __str__(self):
+        return f"pending: {self.actor_id} {self.verb} -> {self.recipient_id}"
+
 '''
 If user A likes user B’s post:
 
@@ -52,3 +114,43 @@ target_content_type	     Post
 target_object_id	     5
 target	                 Post(id=5)
 '''
+
+
+# Per-user number of unread notifications, so the badge endpoint reads one row
+# by primary key instead of COUNT(*) over the user's notifications.
+# Kept in sync by notifications/unread.py.
+class UnreadCounter(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    count = models.IntegerField(default=0)  # not Positive: a drifted counter must never block a write
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count} unread"
+
+
+# Old, read notifications moved out of the hot table by `archive_notifications`.
+# Same data as Notification plus when it was archived; nothing reads it on the request path.
+class NotificationArchive(models.Model):
+    original_id = models.BigIntegerField(unique=True)  # Notification.id before archiving
+    recipient = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    actor = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    verb = models.CharField(max_length=255)
+    target_content_type = models.ForeignKey(
+        ContentType,
+        related_name='+',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    target_object_id = models.PositiveIntegerField(null=True, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"archived {self.original_id}: {self.actor_id} {self.verb} -> {self.recipient_id}"
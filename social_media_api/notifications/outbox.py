@@ -0,0 +1,169 @@
+"""
+Transactional outbox for notifications.
+
+Actions call `enqueue()` inside their own transaction: if the like rolls back,
+so does its notification. A worker (`manage.py process_notification_outbox`)
+calls `drain()` to move pending rows into Notification with one bulk insert
+per batch, grouping repeated actions on the same target. The outbox table is
+the queue, so no outside broker is needed.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationActor, NotificationOutbox
+from . import unread
+
+
+def batch_size():
+    return getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', 500)
+
+
+def enqueue(recipient_id, actor_id, verb, target=None):
+    """Record a notification to be created later. One INSERT."""
+    content_type_id = object_id = None
+    if target is not None:
+        # get_for_model is cached per process, so this is not a query after the first call
+        content_type_id = ContentType.objects.get_for_model(target).id
+        object_id = target.pk
+
+    return NotificationOutbox.objects.create(
+        recipient_id=recipient_id,
+        actor_id=actor_id,
+        verb=verb,
+        target_content_type_id=content_type_id,
+        target_object_id=object_id
+    )
+
+
+def coalesce_window():
+    """Actions on the same target within this many seconds share one notification."""
+    return getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 24 * 60 * 60)
+
+
+def recent_actors_limit():
+    return getattr(settings, 'NOTIFICATION_RECENT_ACTORS', 3)
+
+
+def _group_key(row):
+    return (row.recipient_id, row.verb, row.target_content_type_id, row.target_object_id)
+
+
+def _merge_actors(new, old):
+    """Newest-first, de-duplicated, capped list of {"id", "username"}."""
+    merged = []
+    seen = set()
+    for actor in new + old:
+        if actor['id'] not in seen:
+            seen.add(actor['id'])
+            merged.append(actor)
+    return merged[:recent_actors_limit()]
+
+
+def drain(limit=None):
+    """
+    Turn up to `limit` pending rows into notifications. Returns how many were processed.
+
+    Rows with the same (recipient, verb, target) are grouped: if the recipient
+    still has an unread notification for that target from inside the
+    coalescing window it is updated in place (actor count, recent actors,
+    timestamp), otherwise one new notification is created for the group.
+    So a viral post gives its author one row per window, not one per like.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED where the database
+    supports it (PostgreSQL), so several workers can drain in parallel. On
+    SQLite the write lock already serializes workers.
+    """
+    limit = limit or batch_size()
+
+    with transaction.atomic():
+        pending = list(
+            NotificationOutbox.objects.select_related('actor').select_for_update(
+                skip_locked=True, of=('self',)
+            ).order_by('id')[:limit]
+        )
+        if not pending:
+            return 0
+
+        # Group the batch, keeping each group's actors newest first
+        groups = {}
+        for row in pending:
+            group = groups.setdefault(_group_key(row), {'actors': [], 'actor_ids': set(), 'timestamp': row.created_at})
+            if row.actor_id not in group['actor_ids']:
+                group['actor_ids'].add(row.actor_id)
+                group['actors'].insert(0, {'id': row.actor_id, 'username': row.actor.username})
+            group['timestamp'] = max(group['timestamp'], row.created_at)
+
+        # Open groups the recipients already have (unread, inside the window)
+        cutoff = timezone.now() - timedelta(seconds=coalesce_window())
+        open_groups = {}
+        existing = Notification.objects.select_for_update(of=('self',)).filter(
+            recipient_id__in={key[0] for key in groups},
+            verb__in={key[1] for key in groups},
+            is_read=False,
+            timestamp__gte=cutoff
+        ).order_by('timestamp')
+        for notification in existing:
+            key = _group_key(notification)
+            if key in groups:
+                open_groups[key] = notification  # latest one wins
+
+        # Who is already in those groups (the full set, not just recent_actors)
+        known_actors = {}
+        for notification_id, actor_id in NotificationActor.objects.filter(
+            notification__in=open_groups.values(),
+            actor_id__in={actor_id for group in groups.values() for actor_id in group['actor_ids']}
+        ).values_list('notification_id', 'actor_id'):
+            known_actors.setdefault(notification_id, set()).add(actor_id)
+
+        to_create = []
+        to_update = []
+        for key, group in groups.items():
+            recipient_id, verb, content_type_id, object_id = key
+            notification = open_groups.get(key)
+
+            if notification is None:
+                to_create.append(Notification(
+                    recipient_id=recipient_id,
+                    actor_id=group['actors'][0]['id'],
+                    verb=verb,
+                    target_content_type_id=content_type_id,
+                    target_object_id=object_id,
+                    timestamp=group['timestamp'],
+                    actor_count=len(group['actors']),
+                    recent_actors=_merge_actors(group['actors'], [])
+                ))
+                continue
+
+            # Actors already in the group are not counted twice (rows grouped
+            # before NotificationActor existed only know their recent actors)
+            known_ids = known_actors.get(notification.pk, set()) | {actor['id'] for actor in notification.recent_actors}
+            new_actors = [actor for actor in group['actors'] if actor['id'] not in known_ids]
+
+            notification.actor_id = group['actors'][0]['id']
+            notification.actor_count += len(new_actors)
+            notification.recent_actors = _merge_actors(group['actors'], notification.recent_actors)
+            notification.timestamp = max(notification.timestamp, group['timestamp'])
+            notification.written_at = timezone.now()  # pushed again to open streams
+            to_update.append(notification)
+
+        Notification.objects.bulk_create(to_create)
+        Notification.objects.bulk_update(to_update, ['actor', 'actor_count', 'recent_actors', 'timestamp', 'written_at'])
+        NotificationActor.objects.bulk_create([
+            NotificationActor(notification_id=notification.pk, actor_id=actor_id)
+            for notification in to_create + to_update
+            for actor_id in groups[_group_key(notification)]['actor_ids']
+        ], ignore_conflicts=True)
+        NotificationOutbox.objects.filter(id__in=[row.id for row in pending]).delete()
+
+        # Only new rows change unread counts; grouped rows were already unread
+        new_per_recipient = Counter(notification.recipient_id for notification in to_create)
+        for recipient_id, new in new_per_recipient.items():
+            unread.adjust(recipient_id, new)
+
+    return len(pending)
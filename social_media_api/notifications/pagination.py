@@ -0,0 +1,6 @@
+'''Cursor pagination for notifications: newest first, keyed on (timestamp, id).'''
+from social_media_api.pagination import KeysetPagination
+
+
+class NotificationCursorPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
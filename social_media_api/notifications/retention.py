@@ -0,0 +1,106 @@
+"""
+Notification retention.
+
+Read notifications older than NOTIFICATION_RETENTION_DAYS are moved out of the
+hot table, either into NotificationArchive or appended to an NDJSON file. Work
+is done in small batches, each in its own short transaction, so the purge never
+holds a long lock on notifications_notification.
+"""
+
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive
+
+
+FIELDS = [
+    'id', 'recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id',
+    'actor_count', 'recent_actors', 'is_read', 'timestamp',
+]
+
+
+def retention_days():
+    return getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+
+
+def archive_batch_size():
+    return getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 1000)
+
+
+def expired(days=None):
+    """Read notifications older than the retention window."""
+    cutoff = timezone.now() - timedelta(days=retention_days() if days is None else days)
+    return Notification.objects.filter(is_read=True, timestamp__lt=cutoff)
+
+
+class TableArchive:
+    """Copy rows into NotificationArchive."""
+
+    def write(self, rows):
+        NotificationArchive.objects.bulk_create(
+            [
+                NotificationArchive(
+                    original_id=row['id'],
+                    recipient_id=row['recipient_id'],
+                    actor_id=row['actor_id'],
+                    verb=row['verb'],
+                    target_content_type_id=row['target_content_type_id'],
+                    target_object_id=row['target_object_id'],
+                    actor_count=row['actor_count'],
+                    recent_actors=row['recent_actors'],
+                    timestamp=row['timestamp']
+                )
+                for row in rows
+            ],
+            ignore_conflicts=True  # re-running after a crash must not fail
+        )
+
+    def close(self):
+        pass
+
+
+class NDJSONArchive:
+    """Append rows to a newline-delimited JSON file, one notification per line."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        # On disk before the rows are deleted
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def archive_expired(archive, days=None, batch_size=None, dry_run=False):
+    """
+    Move expired notifications into `archive` batch by batch.
+    Returns the number of notifications moved (or that would be moved).
+    """
+    batch_size = batch_size or archive_batch_size()
+    queryset = expired(days)
+    last_id = 0
+    moved = 0
+
+    while True:
+        with transaction.atomic():
+            # Walk the primary key so every batch is a bounded range scan
+            rows = list(queryset.filter(id__gt=last_id).order_by('id').values(*FIELDS)[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            if not dry_run:
+                archive.write(rows)
+                Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+
+    return moved
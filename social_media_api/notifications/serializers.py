@@ -9,12 +9,44 @@ from .models import Notification
 
 
 class NotificationSerializer(serializers.ModelSerializer):
+    # "alice and 41 others liked your post"
+    summary = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
         fields = [
             'id',
             'actor',
             'verb',
+            'actor_count',
+            'recent_actors',
+            'summary',
             'is_read',
             'timestamp'
         ]
+
+    def get_summary(self, obj):
+        names = [actor['username'] for actor in obj.recent_actors]
+        if not names:
+            names = [str(obj.actor)]  # rows created outside the outbox
+
+        others = obj.actor_count - 1
+        if others <= 0:
+            who = names[0]
+        elif others == 1 and len(names) > 1:
+            who = f"{names[0]} and {names[1]}"
+        else:
+            who = f"{names[0]} and {others} others"
+        return f"{who} {obj.verb}"
+
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """Input for mark-read: a list of ids, or everything up to a timestamp."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    before = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if 'ids' not in data and 'before' not in data:
+            raise serializers.ValidationError('Provide "ids" or "before".')
+        return data
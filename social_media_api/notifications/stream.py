@@ -0,0 +1,146 @@
+"""
+Push notifications to connected clients (Server-Sent Events over ASGI).
+
+Broker: an in-process pub/sub. Each open stream is an asyncio.Queue
+subscribed under its recipient id; holding one costs a coroutine and a
+queue, not a thread or a database connection.
+
+Cross-worker channel: the notifications table itself. Notifications are
+written by the outbox worker, possibly in another process, so each ASGI
+worker runs ONE poller task that asks for rows newer than the last poll, for
+the recipients connected to this worker only, and publishes them. That is one
+indexed query per interval per worker, however many clients are connected,
+instead of one list request per client.
+
+"Newer" is by Notification.written_at, set on every insert and grouped update,
+not by `timestamp`: that is the time of the action, and the outbox worker may
+write the row long after it. Grouped notifications get a new written_at when
+another actor joins, so they are pushed again with the new summary.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Notification
+from .serializers import NotificationSerializer
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100  # events buffered per client; the oldest are dropped after that
+RECIPIENTS_PER_QUERY = 500
+
+
+def poll_interval():
+    return getattr(settings, 'NOTIFICATION_STREAM_POLL_INTERVAL', 1.0)
+
+
+def commit_lag():
+    # Rows get their written_at before their transaction commits; re-read this far back
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_STREAM_COMMIT_LAG', 5))
+
+
+def format_event(notification_data, written_at):
+    """One SSE message. The id lets a reconnecting client resume (Last-Event-ID)."""
+    event_id = f"{written_at.isoformat()}|{notification_data['id']}"
+    return f"id: {event_id}\nevent: notification\ndata: {json.dumps(notification_data)}\n\n"
+
+
+def fetch_since(recipient_ids, since, limit=500):
+    """
+    Serialized notifications of these recipients written after `since`, in
+    write order, as (rows, resume_at) with rows of (recipient_id, written_at, data).
+    resume_at is None when everything was read, else the written_at to
+    continue from (a chunk hit `limit`).
+    """
+    rows = []
+    resume_at = None
+    recipient_ids = list(recipient_ids)
+    for start in range(0, len(recipient_ids), RECIPIENTS_PER_QUERY):
+        chunk = recipient_ids[start:start + RECIPIENTS_PER_QUERY]
+        found = list(
+            Notification.objects.filter(
+                recipient_id__in=chunk, written_at__gt=since
+            ).select_related('actor').order_by('written_at', 'id')[:limit]
+        )
+        if len(found) == limit:
+            resume_at = min(filter(None, [resume_at, found[-1].written_at]))
+        rows.extend((n.recipient_id, n.written_at, NotificationSerializer(n).data) for n in found)
+    rows.sort(key=lambda row: (row[1], row[2]['id']))
+    return rows, resume_at
+
+
+class Broker:
+    def __init__(self):
+        self.subscribers = {}  # recipient id → set of queues
+        self._poller = None
+        self._since = None
+        self._sent = {}  # (id, written_at) → written_at, for rows re-read inside the commit lag
+
+    # ---- pub/sub ----
+
+    def subscribe(self, recipient_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.setdefault(recipient_id, set()).add(queue)
+        self._ensure_poller()
+        return queue
+
+    def unsubscribe(self, recipient_id, queue):
+        queues = self.subscribers.get(recipient_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[recipient_id]
+
+    def publish(self, recipient_id, message):
+        for queue in self.subscribers.get(recipient_id, ()):
+            if queue.full():
+                queue.get_nowait()  # slow client: drop its oldest event
+            queue.put_nowait(message)
+
+    # ---- database poller ----
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        if self._poller is None or self._poller.done() or self._poller.get_loop() is not loop:
+            self._since = timezone.now() - commit_lag()
+            self._sent = {}
+            # A fresh context: the poller must not inherit the first subscriber's
+            # request state (e.g. its read replica), it reads the primary
+            self._poller = loop.create_task(self._poll_forever(), context=contextvars.Context())
+
+    async def _poll_forever(self):
+        while self.subscribers:
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception('Notification stream poll failed')
+            await asyncio.sleep(poll_interval())
+        self._poller = None  # restarted by the next subscribe()
+
+    async def poll_once(self):
+        if not self.subscribers:
+            return
+        polled_at = timezone.now()
+        rows, resume_at = await sync_to_async(fetch_since)(list(self.subscribers), self._since)
+
+        for recipient_id, written_at, data in rows:
+            key = (data['id'], written_at)
+            if key in self._sent:
+                continue
+            self._sent[key] = written_at
+            self.publish(recipient_id, format_event(data, written_at))
+
+        # Next poll re-reads the lag window (or continues a backlog); forget older keys
+        self._since = min(filter(None, [resume_at, polled_at - commit_lag()]))
+        self._sent = {key: ts for key, ts in self._sent.items() if ts > self._since}
+
+
+broker = Broker()
@@ -1,3 +1,324 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+from social_media_api.replicas import ReplicaMiddleware
+from . import outbox, unread, stream
+from .models import Notification, NotificationOutbox, NotificationArchive
+
+
+User = get_user_model()
+
+
+class NotificationListTests(APITestCase):
+    def setUp(self):
+        self.recipient = User.objects.create_user(username='recipient', password='pass123')
+        self.actor = User.objects.create_user(username='actor', password='pass123')
+        for i in range(4):
+            Notification.objects.create(recipient=self.recipient, actor=self.actor, verb=f'event {i}')
+        Notification.objects.create(recipient=self.actor, actor=self.recipient, verb='not mine')
+        self.client.force_authenticate(user=self.recipient)
+
+    # Only the logged-in user's notifications, newest first, cursor-paginated.
+    def test_cursor_pagination(self):
+        url = reverse('notifications') + '?page_size=3'
+        verbs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            verbs.extend(n['verb'] for n in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(verbs, [f'event {i}' for i in reversed(range(4))])
+
+    # The summary falls back to str(actor): joined in, not a query per row.
+    def test_queries_do_not_grow_with_page_size(self):
+        counts = []
+        for page_size in (1, 4):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('notifications'), {'page_size': page_size})
+            self.assertEqual(response.data['results'][0]['summary'], 'actor event 3')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class NotificationOutboxTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fan = User.objects.create_user(username='fan', password='pass123')
+        self.post = Post.objects.create(author=self.author, title='hello', content='x')
+        self.client.force_authenticate(user=self.fan)
+
+    # Liking only queues the notification; the worker creates it.
+    def test_like_goes_through_outbox(self):
+        response = self.client.post(reverse('like-post', args=[self.post.id]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+        call_command('process_notification_outbox', once=True, stdout=StringIO())
+
+        self.assertFalse(NotificationOutbox.objects.exists())
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.author)
+        self.assertEqual(notification.actor, self.fan)
+        self.assertEqual(notification.target, self.post)
+
+    # One bulk insert per batch, whatever the number of rows.
+    def test_drain_in_batches(self):
+        for i in range(5):
+            outbox.enqueue(self.author.pk, self.fan.pk, f'poked you {i}')  # distinct, not grouped
+
+        self.assertEqual(outbox.drain(limit=3), 3)
+        self.assertEqual(outbox.drain(limit=3), 2)
+        self.assertEqual(outbox.drain(limit=3), 0)
+        self.assertEqual(Notification.objects.count(), 5)
+
+
+class NotificationGroupingTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.post = Post.objects.create(author=self.author, title='viral', content='x')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass123') for i in range(5)]
+
+    def like_from(self, fans):
+        for fan in fans:
+            outbox.enqueue(self.author.pk, fan.pk, 'liked your post', target=self.post)
+
+    # Many likes on one post become one notification, updated in place.
+    def test_likes_on_same_post_are_grouped(self):
+        self.like_from(self.fans[:2])
+        outbox.drain()
+        self.like_from(self.fans[2:])
+        outbox.drain()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual(notification.actor, self.fans[-1])  # latest actor
+        self.assertEqual([a['username'] for a in notification.recent_actors], ['fan4', 'fan3', 'fan2'])
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.get(reverse('notifications'))
+        self.assertEqual(response.data['results'][0]['summary'], 'fan4 and 4 others liked your post')
+
+    # Once read (or outside the window) a new group is started.
+    def test_read_group_is_not_reused(self):
+        self.like_from(self.fans[:1])
+        outbox.drain()
+        Notification.objects.update(is_read=True)
+
+        self.like_from(self.fans[1:2])
+        outbox.drain()
+        self.assertEqual(Notification.objects.count(), 2)
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+    def test_window(self):
+        self.like_from(self.fans[:1])
+        outbox.drain()
+        self.like_from(self.fans[1:2])
+        outbox.drain()
+        self.assertEqual(Notification.objects.count(), 2)
+
+    # The same actor twice is counted once.
+    def test_repeat_actor_counted_once(self):
+        self.like_from(self.fans[:1] * 2)
+        outbox.drain()
+        self.like_from(self.fans[:1])
+        outbox.drain()
+        self.assertEqual(Notification.objects.get().actor_count, 1)
+
+        # ... also once more than recent_actors can show have acted since
+        for fan in self.fans[1:]:
+            self.like_from([fan])
+            outbox.drain()
+        self.like_from(self.fans[:2])
+        outbox.drain()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual([a['username'] for a in notification.recent_actors], ['fan1', 'fan0', 'fan4'])
+
+
+class UnreadCounterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fan = User.objects.create_user(username='fan', password='pass123')
+        for i in range(3):
+            outbox.enqueue(self.author.pk, self.fan.pk, f'event {i}')
+        outbox.drain()
+        self.client.force_authenticate(user=self.author)
+
+    def unread_count(self):
+        return self.client.get(reverse('notifications-unread-count')).data['unread_count']
+
+    # Counter follows new notifications and is served without COUNT(*).
+    def test_unread_count(self):
+        self.assertEqual(self.unread_count(), 3)
+        with self.assertNumQueries(0):  # cached
+            self.assertEqual(unread.get_unread_count(self.author.pk), 3)
+
+        outbox.enqueue(self.author.pk, self.fan.pk, 'event 3')
+        outbox.drain()
+        self.assertEqual(self.unread_count(), 4)
+
+    def test_mark_read_by_ids(self):
+        ids = list(Notification.objects.values_list('id', flat=True)[:2])
+        response = self.client.post(reverse('notifications-mark-read'), {'ids': ids}, format='json')
+        self.assertEqual(response.data, {'marked_read': 2, 'unread_count': 1})
+
+        # Already read: nothing changes
+        response = self.client.post(reverse('notifications-mark-read'), {'ids': ids}, format='json')
+        self.assertEqual(response.data['marked_read'], 0)
+
+    def test_mark_read_up_to_timestamp(self):
+        latest = Notification.objects.order_by('-timestamp').first()
+        response = self.client.post(
+            reverse('notifications-mark-read'), {'before': latest.timestamp.isoformat()}, format='json'
+        )
+        self.assertEqual(response.data, {'marked_read': 3, 'unread_count': 0})
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_mark_read_needs_ids_or_before(self):
+        response = self.client.post(reverse('notifications-mark-read'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    # A recount stores what it reads, so it never reads a (possibly lagging) replica,
+    # even inside a GET that is routed to one ('replica_1' isn't configured here).
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_recount_reads_the_primary(self):
+        middleware = ReplicaMiddleware(lambda request: HttpResponse(unread.recount(self.author.pk)))
+        response = middleware(RequestFactory().get(reverse('notifications-unread-count')))
+        self.assertEqual(response.content, b'3')
+
+class NotificationRetentionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        old = timezone.now() - timedelta(days=100)
+        for i in range(5):
+            Notification.objects.create(recipient=self.user, actor=self.user, verb=f'old {i}', is_read=True, timestamp=old)
+        Notification.objects.create(recipient=self.user, actor=self.user, verb='old unread', timestamp=old)
+        Notification.objects.create(recipient=self.user, actor=self.user, verb='recent', is_read=True)
+
+    # Only old *read* notifications move, in batches, into the archive table.
+    def test_archive_to_table(self):
+        call_command('archive_notifications', days=90, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(NotificationArchive.objects.count(), 5)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('verb', flat=True)), ['old unread', 'recent']
+        )
+
+    def test_archive_to_ndjson(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'archive.ndjson')
+            call_command('archive_notifications', to='ndjson', file=path, stdout=StringIO())
+
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(sorted(line['verb'] for line in lines), [f'old {i}' for i in range(5)])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_dry_run(self):
+        out = StringIO()
+        call_command('archive_notifications', dry_run=True, stdout=out)
+        self.assertIn('Would archive 5', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 7)
+
+
+
+@override_settings(NOTIFICATION_STREAM_POLL_INTERVAL=0.01, NOTIFICATION_STREAM_HEARTBEAT=0.05)
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass123')
+        self.actor = User.objects.create_user(username='actor', password='pass123')
+        self.other = User.objects.create_user(username='other', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+        self.url = reverse('notifications-stream')
+
+    def tearDown(self):
+        # The test client can't disconnect a stream the way an ASGI server does
+        stream.broker.subscribers.clear()
+
+    async def next_event(self, events):
+        """Next non-heartbeat message."""
+        while True:
+            chunk = await asyncio.wait_for(anext(events), timeout=5)
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if not chunk.startswith(':'):
+                return chunk
+
+    # Rows written by another process (the outbox worker) reach the right stream only.
+    async def test_new_notifications_are_pushed(self):
+        response = await self.async_client.get(self.url, {'token': self.token.key})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await self.next_event(events), 'retry: 3000\n\n')
+
+        await sync_to_async(Notification.objects.create)(recipient=self.other, actor=self.actor, verb='not for you')
+        await sync_to_async(Notification.objects.create)(recipient=self.user, actor=self.actor, verb='liked your post')
+
+        event = await self.next_event(events)
+        self.assertIn('event: notification', event)
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(data['summary'], 'actor liked your post')
+        self.assertEqual(list(stream.broker.subscribers), [self.user.pk])
+
+    # The outbox worker may write a notification long after the action (its
+    # timestamp): it is still pushed, the poller goes by when rows are written.
+    async def test_late_outbox_rows_are_pushed(self):
+        response = await self.async_client.get(self.url, {'token': self.token.key})
+        events = aiter(response.streaming_content)
+        await self.next_event(events)  # retry
+
+        post = await sync_to_async(Post.objects.create)(author=self.user, title='t', content='x')
+        await sync_to_async(NotificationOutbox.objects.create)(
+            recipient=self.user, actor=self.actor, verb='liked your post',
+            target_content_type_id=(await sync_to_async(ContentType.objects.get_for_model)(Post)).id,
+            target_object_id=post.pk, created_at=timezone.now() - timedelta(minutes=10)
+        )
+        await sync_to_async(outbox.drain)()
+
+        event = await self.next_event(events)
+        self.assertIn('"verb": "liked your post"', event)
+
+    # A reconnecting client gets what it missed since Last-Event-ID.
+    async def test_resume_from_last_event_id(self):
+        missed = await sync_to_async(Notification.objects.create)(recipient=self.user, actor=self.actor, verb='missed')
+        last_seen = (missed.written_at - timedelta(seconds=1)).isoformat()
+
+        response = await self.async_client.get(
+            self.url, headers={'Authorization': f'Token {self.token.key}', 'Last-Event-ID': f'{last_seen}|1'}
+        )
+        events = aiter(response.streaming_content)
+        await self.next_event(events)  # retry
+        self.assertIn('"verb": "missed"', await self.next_event(events))
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(self.url, {'token': 'nope'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    # Under WSGI (gunicorn) the stream would hold a worker and arrive in one chunk.
+    def test_refused_under_wsgi(self):
+        response = self.client.get(self.url, {'token': self.token.key})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(stream.broker.subscribers, {})
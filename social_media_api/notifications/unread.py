@@ -0,0 +1,101 @@
+"""
+Unread notification counter.
+
+The number lives in UnreadCounter (one row per user) and in the cache for
+NOTIFICATION_UNREAD_CACHE_TTL seconds, so polling the badge is a cache hit or
+a primary-key lookup. Every write that changes unread notifications goes
+through `adjust()`, which is a single UPDATE ... SET count = count + n.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+
+from .models import Notification, UnreadCounter
+
+
+def cache_ttl():
+    return getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TTL', 10)
+
+
+def cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def recount(user_id):
+    """Recompute a user's counter from the notifications table. Returns the count."""
+    # On the primary: a count from a lagging replica would be stored as the truth
+    using = router.db_for_write(Notification)
+    count = Notification.objects.using(using).filter(recipient_id=user_id, is_read=False).count()
+    try:
+        with transaction.atomic(using=using):
+            UnreadCounter.objects.using(using).update_or_create(user_id=user_id, defaults={'count': count})
+    except IntegrityError:
+        pass  # created concurrently; that row is just as fresh
+    _invalidate(user_id)
+    return count
+
+
+def get_unread_count(user_id):
+    count = cache.get(cache_key(user_id))
+    if count is not None:
+        return count
+
+    count = UnreadCounter.objects.filter(user_id=user_id).values_list('count', flat=True).first()
+    if count is None:
+        count = recount(user_id)  # first time for this user
+    count = max(count, 0)
+
+    cache.set(cache_key(user_id), count, cache_ttl())
+    return count
+
+
+async def aget_unread_count(user_id):
+    """get_unread_count for async views."""
+    count = await cache.aget(cache_key(user_id))
+    if count is not None:
+        return count
+
+    count = await UnreadCounter.objects.filter(user_id=user_id).values_list('count', flat=True).afirst()
+    if count is None:
+        count = await sync_to_async(recount)(user_id)  # first time: a transaction, kept sync
+    count = max(count, 0)
+
+    await cache.aset(cache_key(user_id), count, cache_ttl())
+    return count
+
+
+def adjust(user_id, delta):
+    """Add `delta` to a user's counter. Call inside the transaction that changed the rows."""
+    if not delta:
+        return
+    updated = UnreadCounter.objects.filter(user_id=user_id).update(count=F('count') + delta)
+    if not updated:
+        recount(user_id)  # no row yet: the count query already sees this change
+    _invalidate(user_id)
+
+
+def _invalidate(user_id):
+    # Now, and again after commit so a concurrent reader can't keep a pre-commit value
+    cache.delete(cache_key(user_id))
+    transaction.on_commit(lambda: cache.delete(cache_key(user_id)))
+
+
+def mark_read(user_id, ids=None, before=None):
+    """
+    Mark the user's unread notifications as read with one UPDATE.
+    `ids`: only these notifications; `before`: everything up to that time.
+    Returns how many were marked.
+    """
+    queryset = Notification.objects.filter(recipient_id=user_id, is_read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    if before is not None:
+        queryset = queryset.filter(timestamp__lte=before)
+
+    with transaction.atomic():
+        marked = queryset.update(is_read=True)
+        adjust(user_id, -marked)
+    return marked
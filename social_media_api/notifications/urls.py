@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import NotificationListView
+from .views import NotificationListView, UnreadCountView, MarkReadView, NotificationStreamView
 
 
 
@@ -7,4 +7,10 @@ from .views import NotificationListView
 urlpatterns = [
     # ex: GET /api/notifications/
     path('notifications/', NotificationListView.as_view(), name='notifications'),
+    # ex: GET /api/notifications/unread-count/
+    path('notifications/unread-count/', UnreadCountView.as_view(), name='notifications-unread-count'),
+    # ex: POST /api/notifications/mark-read/
+    path('notifications/mark-read/', MarkReadView.as_view(), name='notifications-mark-read'),
+    # ex: GET /api/notifications/stream/?token=<key> (Server-Sent Events, run under ASGI)
+    path('notifications/stream/', NotificationStreamView.as_view(), name='notifications-stream'),
 ]
@@ -1,19 +1,137 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.dateparse import parse_datetime
+from django.views import View
 
 # Create your views here.
 from rest_framework import generics, permissions
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from accounts.authentication import CachedTokenAuthentication
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, MarkReadSerializer
+from . import unread, stream
+from .pagination import NotificationCursorPagination
 
 
 class NotificationListView(generics.ListAPIView):
     """Returns logged-in user’s notifications"""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationCursorPagination  # ?cursor=... instead of ?page=N
 
     def get_queryset(self):
         # Return only notifications for the logged-in user
+        # (the paginator orders by -timestamp, -id); actor joined in for the
+        # summary of rows created outside the outbox
         return Notification.objects.filter(
             recipient=self.request.user
-        ).order_by('-timestamp')
+        ).select_related('actor')
+
+
+
+class UnreadCountView(generics.GenericAPIView):
+    """Number of unread notifications: a cache hit or one primary-key lookup."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread_count": unread.get_unread_count(request.user.pk)})
+
+
+class MarkReadView(generics.GenericAPIView):
+    """
+    Mark notifications as read in a single UPDATE.
+    Body: {"ids": [1, 2, 3]} or {"before": "2025-12-22T12:00:00Z"}
+    """
+    serializer_class = MarkReadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        marked = unread.mark_read(
+            request.user.pk,
+            ids=serializer.validated_data.get('ids'),
+            before=serializer.validated_data.get('before')
+        )
+        return Response({
+            "marked_read": marked,
+            "unread_count": unread.get_unread_count(request.user.pk)
+        })
+
+
+class NotificationStreamView(View):
+    """
+    Server-Sent Events: new notifications pushed as they are created.
+    GET /api/notifications/stream/  with "Authorization: Token <key>" or ?token=<key>
+    (browsers' EventSource can't send headers). Serve with an ASGI server (uvicorn);
+    an idle connection is a parked coroutine, see notifications/stream.py.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # Under WSGI the stream would be read to the end into a list: one
+            # worker blocked for NOTIFICATION_STREAM_MAX_SECONDS, then one chunk.
+            return JsonResponse({"detail": "The notification stream needs the ASGI server."}, status=503)
+
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        response = StreamingHttpResponse(self.events(request, user.pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+        return response
+
+    def authenticate(self, request):
+        key = request.GET.get('token')
+        header = request.headers.get('Authorization', '').split()
+        if len(header) == 2 and header[0] == 'Token':
+            key = header[1]
+        if not key:
+            return None
+        try:
+            user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+        except AuthenticationFailed:
+            return None
+        return user
+
+    async def events(self, request, user_id):
+        heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+        # Close after a while; EventSource reconnects with Last-Event-ID and misses nothing
+        max_seconds = getattr(settings, 'NOTIFICATION_STREAM_MAX_SECONDS', 300)
+
+        queue = stream.broker.subscribe(user_id)
+        try:
+            yield "retry: 3000\n\n"
+
+            # Reconnect: send what was created since the last event the client saw
+            since = last_event_time(request.headers.get('Last-Event-ID', ''))
+            if since is not None:
+                rows, _ = await sync_to_async(stream.fetch_since)([user_id], since, limit=100)
+                for _, written_at, data in rows:
+                    yield stream.format_event(data, written_at)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + max_seconds
+            while loop.time() < deadline:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=min(heartbeat, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # keeps proxies from closing an idle connection
+        finally:
+            stream.broker.unsubscribe(user_id, queue)
+
 
+def last_event_time(value):
+    """Last-Event-ID is "<iso written_at>|<id>" (see stream.format_event); None if missing or malformed."""
+    try:
+        return parse_datetime(value.split('|')[0]) if value else None
+    except ValueError:
+        return None
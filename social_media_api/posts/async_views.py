@@ -0,0 +1,49 @@
+'''
+Async versions of GET /api/posts/ and GET /api/posts/<id>/ (served under ASGI,
+see social_media_api/asgi_urls.py). Same queries, validators and JSON as
+PostListCreateView.list and PostDetailView.retrieve in views.py.
+'''
+
+from django.http import Http404
+
+from social_media_api.async_views import async_read_view, json_response
+from .models import POSTS_COLLECTION, Post
+from .pagination import PostCursorPagination
+from .serializers import PostSerializer
+from .views import PostDetailView, PostListCreateView
+from . import conditional, likes, page_cache
+
+
+@async_read_view(PostListCreateView)
+async def post_list(request):
+    version = await conditional.acollection_version(POSTS_COLLECTION)
+    etag, last_modified = conditional.collection_validators(POSTS_COLLECTION, request.user, version)
+    response = conditional.not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    async def build_page():
+        paginator = PostCursorPagination()
+        page = await paginator.apaginate_queryset(Post.objects.values(*PostSerializer.values_fields), request)
+        return paginator.get_paginated_data(PostSerializer.serialize_rows(page))
+
+    data, cache_status = await page_cache.aget_page(request, version[0], build_page)
+    await page_cache.aoverlay(data, request.user, cache_status)
+    response = json_response(data, headers={'X-Cache': cache_status})
+    return conditional.set_validators(response, etag, last_modified)
+
+
+@async_read_view(PostDetailView)
+async def post_detail(request, pk):
+    etag, last_modified = await conditional.apost_validators(pk, request.user)
+    response = conditional.not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    post = await PostDetailView.queryset.filter(pk=pk).afirst()
+    if post is None:
+        raise Http404('No Post matches the given query.')  # get_object_or_404's message
+
+    liked_ids = await likes.aliked_post_ids(request.user, [pk])
+    response = json_response(PostSerializer(post, context={'liked_ids': liked_ids}).data)
+    return conditional.set_validators(response, etag, last_modified)
@@ -0,0 +1,106 @@
+"""
+Conditional GET for posts: ETag / Last-Modified validators that cost one
+indexed lookup, checked before any serialization.
+
+detail: the post's updated_at and counters, plus whether the requester liked it
+        (the response contains all of them), read in a single query.
+lists:  the "posts" CollectionVersion row, bumped on every post create, edit
+        and delete.
+
+Likes and comments only move the posts' counters: bumping a shared row for
+each of them would make it the hottest row in the database and end every
+list's 304s. Instead validators also change every COUNTERS_MAX_AGE seconds
+(POST_COUNTERS_MAX_AGE), so a revalidated list shows counters (and "liked"
+flags) at most that old. Last-Modified, which can't name counters, follows
+the same window on details too; their ETag is exact.
+
+Both include the requester's id because responses carry a per-user "liked" flag.
+"""
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Post, Like, CollectionVersion
+
+
+def _user_part(user):
+    return user.pk if user.is_authenticated else 0
+
+
+def counters_window():
+    """(number, start) of the current counter window; validators change with it."""
+    max_age = getattr(settings, 'POST_COUNTERS_MAX_AGE', 15)
+    number = int(time.time() // max_age)
+    return number, datetime.fromtimestamp(number * max_age, dt_timezone.utc)
+
+
+def _post_row(pk, user):
+    return Post.objects.filter(pk=pk).annotate(
+        liked=Exists(Like.objects.filter(post=OuterRef('pk'), user_id=user.pk)),
+    ).values('updated_at', 'like_count', 'comment_count', 'liked')
+
+
+def _post_validators(pk, user, row):
+    if row is None:
+        return None, None
+
+    etag = '"post-{}-{}-{}-{}-{}-{}"'.format(
+        pk, row['updated_at'].timestamp(), row['like_count'], row['comment_count'],
+        int(row['liked']), _user_part(user)
+    )
+    # Counters move without touching updated_at
+    return etag, max(row['updated_at'], counters_window()[1])
+
+
+def post_validators(pk, user):
+    """(etag, last_modified) for one post, or (None, None) if it doesn't exist."""
+    return _post_validators(pk, user, _post_row(pk, user).first())
+
+
+async def apost_validators(pk, user):
+    return _post_validators(pk, user, await _post_row(pk, user).afirst())
+
+
+def _collection_row(key):
+    return CollectionVersion.objects.filter(key=key).values_list('version', 'updated_at')
+
+
+def collection_version(key):
+    """(version, updated_at) of the collection `key`; (0, None) before its first change."""
+    return _collection_row(key).first() or (0, None)
+
+
+async def acollection_version(key):
+    return await _collection_row(key).afirst() or (0, None)
+
+
+def collection_validators(key, user, version=None):
+    """(etag, last_modified) for any list page over the collection `key` (read unless `version` is given)."""
+    version, updated_at = version or collection_version(key)
+    window, window_start = counters_window()
+    etag = f'"{key}-{version}-{window}-{_user_part(user)}"'
+    return etag, max(filter(None, [updated_at, window_start]))
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 response if the client's copy is still current, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    # The validators depend on who is asking
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,159 @@
+"""
+Materialized home timeline.
+
+Fan-out on write: when a post is created we insert one FeedEntry per follower,
+so reading a feed page is one indexed range scan over (owner, created_at, post).
+
+Authors with more than FEED_FANOUT_MAX_FOLLOWERS followers are NOT fanned out
+(one post would mean millions of inserts). Their posts are pulled at read time
+and merged with the materialized rows instead.
+"""
+
+import heapq
+from itertools import chain, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from social_media_api.pagination import keyset_filter
+from .models import FeedEntry, Post
+
+
+User = get_user_model()
+
+# rows in User.following: from_user follows to_user
+Follow = User.following.through
+
+
+def fanout_max_followers():
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 10000)
+
+
+def fanout_batch_size():
+    return getattr(settings, 'FEED_FANOUT_BATCH_SIZE', 1000)
+
+
+def feed_page_size():
+    return getattr(settings, 'FEED_PAGE_SIZE', 20)
+
+
+# =========================
+# WRITE SIDE
+# =========================
+
+def is_pull_author(author_id):
+    """True if this author has too many followers to fan out to."""
+    return User.objects.filter(pk=author_id, follower_count__gt=fanout_max_followers()).exists()
+
+
+def _insert_entries(owner_ids, post):
+    """Insert feed rows for `post` in batches; duplicates are ignored."""
+    batch_size = fanout_batch_size()
+    owner_ids = iter(owner_ids)
+    while True:
+        batch = list(islice(owner_ids, batch_size))
+        if not batch:
+            break
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(owner_id=owner_id, post=post, author_id=post.author_id, created_at=post.created_at)
+                for owner_id in batch
+            ],
+            ignore_conflicts=True
+        )
+
+
+def fan_out_post(post):
+    """Push a newly created post into the author's and followers' feeds."""
+    owner_ids = [post.author_id]  # authors always see their own posts
+
+    if not is_pull_author(post.author_id):
+        follower_ids = Follow.objects.filter(
+            to_user_id=post.author_id
+        ).values_list('from_user_id', flat=True).iterator(chunk_size=fanout_batch_size())
+        owner_ids = chain(owner_ids, follower_ids)
+
+    _insert_entries(owner_ids, post)
+
+
+def backfill(owner_id, author_id):
+    """After a follow, copy the author's most recent posts into the new follower's feed."""
+    if is_pull_author(author_id):
+        return  # merged at read time anyway
+
+    limit = getattr(settings, 'FEED_BACKFILL_LIMIT', 50)
+    recent = Post.objects.filter(author_id=author_id).order_by('-created_at', '-id').only(
+        'id', 'author_id', 'created_at'
+    )[:limit]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(owner_id=owner_id, post=post, author_id=author_id, created_at=post.created_at)
+            for post in recent
+        ],
+        ignore_conflicts=True
+    )
+
+
+def remove_author(owner_id, author_id):
+    """After an unfollow, drop the author's posts from the old follower's feed."""
+    FeedEntry.objects.filter(owner_id=owner_id, author_id=author_id).delete()
+
+
+# =========================
+# READ SIDE
+# =========================
+
+def pull_author_ids(user):
+    """Followed authors whose posts were not fanned out (uses the stored follower_count)."""
+    return list(
+        User.objects.filter(
+            followers=user.pk,
+            follower_count__gt=fanout_max_followers()
+        ).values_list('id', flat=True)
+    )
+
+
+def get_feed_page(user, position=None, limit=None):
+    """
+    Return (posts, next_position) for one page of `user`'s home feed.
+
+    Materialized rows and pull-author posts are each read with one indexed
+    range scan, merged newest-first, and the page's posts are then loaded
+    with their authors in one more query.
+    """
+    limit = limit or feed_page_size()
+
+    entries = FeedEntry.objects.filter(owner=user)
+    if position:
+        entries = entries.filter(keyset_filter(position, 'created_at', 'post_id'))
+    streams = [
+        entries.order_by('-created_at', '-post_id').values_list('created_at', 'post_id')[:limit + 1]
+    ]
+
+    pull_ids = pull_author_ids(user)
+    if pull_ids:
+        pulled = Post.objects.filter(author_id__in=pull_ids)
+        if position:
+            pulled = pulled.filter(keyset_filter(position, 'created_at', 'id'))
+        streams.append(pulled.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit + 1])
+
+    # Merge newest-first; a post can be in both streams if its author
+    # crossed the fan-out threshold, so keep the first copy only.
+    keys = []
+    seen = set()
+    for key in heapq.merge(*(list(stream) for stream in streams), reverse=True):
+        if key[1] in seen:
+            continue
+        seen.add(key[1])
+        keys.append(key)
+        if len(keys) > limit:
+            break
+
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    posts_by_id = Post.objects.select_related('author').in_bulk([post_id for _, post_id in keys])
+    posts = [posts_by_id[post_id] for _, post_id in keys if post_id in posts_by_id]
+
+    next_position = keys[-1] if has_more else None
+    return posts, next_position
@@ -0,0 +1,160 @@
+"""
+Idempotent like/unlike in as few statements as possible.
+
+like:   INSERT ... SELECT FROM posts_post ... ON CONFLICT DO NOTHING RETURNING
+        (no row if already liked or the post doesn't exist), then one
+        UPDATE ... RETURNING for the stored like_count and trending score,
+        and one UPDATE for the new trending score (posts/trending.py).
+unlike: DELETE ... RETURNING created_at, then the same two UPDATEs.
+toggle: a no-op UPDATE locking the post's row, then unlike or like, in one transaction.
+
+Compare LikePostView: SELECT post, SELECT like, INSERT like, UPDATE count.
+"""
+
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from notifications import outbox
+from .models import Post, Like
+from . import trending
+
+
+LIKED_VERB = "liked your post"
+
+
+def _connection():
+    return connections[router.db_for_write(Like)]
+
+
+def _tables(connection):
+    qn = connection.ops.quote_name
+    return qn(Like._meta.db_table), qn(Post._meta.db_table)
+
+
+def _apply_delta(cursor, posts_table, post_id, delta):
+    """New (like_count, author_id, trending_score) of the post, or None if it doesn't exist."""
+    if delta:
+        # Also takes the row lock, so the score update below can't interleave with another
+        cursor.execute(
+            f'UPDATE {posts_table} SET like_count = like_count + %s WHERE id = %s '
+            f'RETURNING like_count, author_id, trending_score',
+            [delta, post_id]
+        )
+    else:
+        cursor.execute(f'SELECT like_count, author_id, trending_score FROM {posts_table} WHERE id = %s', [post_id])
+    return cursor.fetchone()
+
+
+def _set_score(cursor, posts_table, post_id, score):
+    cursor.execute(f'UPDATE {posts_table} SET trending_score = %s WHERE id = %s', [score, post_id])
+
+
+def _as_datetime(value):
+    # Raw cursors return what the driver returns: a string on SQLite
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def like(user_id, post_id):
+    """
+    Like a post. Returns (created, like_count), or None if the post doesn't exist.
+    Liking twice is not an error: the second call just reports created=False.
+    """
+    connection = _connection()
+    likes_table, posts_table = _tables(connection)
+    liked_at = timezone.now()
+    now = Like._meta.get_field('created_at').get_db_prep_save(liked_at, connection)
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # The SELECT makes a missing post insert nothing instead of failing on the FK
+        cursor.execute(
+            f'INSERT INTO {likes_table} (user_id, post_id, created_at) '
+            f'SELECT %s, id, %s FROM {posts_table} WHERE id = %s '
+            f'ON CONFLICT DO NOTHING RETURNING id',
+            [user_id, now, post_id]
+        )
+        created = cursor.fetchone() is not None
+
+        row = _apply_delta(cursor, posts_table, post_id, 1 if created else 0)
+        if row is None:
+            return None
+        like_count, author_id, score = row
+
+        if created:
+            _set_score(cursor, posts_table, post_id, trending.score_with(score, like_count, trending.like_weight(liked_at)))
+            if author_id != user_id:
+                outbox.enqueue(recipient_id=author_id, actor_id=user_id, verb=LIKED_VERB, target=Post(pk=post_id))
+
+    return created, like_count
+
+
+def unlike(user_id, post_id):
+    """
+    Remove a like. Returns (deleted, like_count), or None if the post doesn't exist.
+    """
+    connection = _connection()
+    likes_table, posts_table = _tables(connection)
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {likes_table} WHERE user_id = %s AND post_id = %s RETURNING created_at',
+            [user_id, post_id]
+        )
+        deleted = cursor.fetchone()
+
+        row = _apply_delta(cursor, posts_table, post_id, -1 if deleted else 0)
+        if row is None:
+            return None
+        like_count, _, score = row
+
+        if deleted:
+            score = trending.score_without(score, like_count, trending.like_weight(_as_datetime(deleted[0])))
+            if score is None:
+                trending.rescore(post_id, using=connection.alias)
+            else:
+                _set_score(cursor, posts_table, post_id, score)
+
+    return deleted is not None, like_count
+
+
+def toggle(user_id, post_id):
+    """Unlike if liked, like otherwise. Returns (liked, like_count) or None."""
+    connection = _connection()
+    _, posts_table = _tables(connection)
+
+    # One transaction, the post's row locked first: two toggles by the same
+    # user are serialized, and can't both see "not liked" and both like
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {posts_table} SET like_count = like_count WHERE id = %s RETURNING id', [post_id])
+        if cursor.fetchone() is None:
+            return None
+
+        deleted, like_count = unlike(user_id, post_id)
+        if deleted:
+            return False, like_count
+        return True, like(user_id, post_id)[1]
+
+
+def liked_post_ids(user, post_ids):
+    """Which of `post_ids` has `user` liked? One query, whatever the number of ids."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return set(
+        Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+    )
+
+
+async def aliked_post_ids(user, post_ids):
+    """liked_post_ids for async views."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return {
+        post_id async for post_id in Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+    }
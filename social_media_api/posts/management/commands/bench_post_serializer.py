@@ -0,0 +1,96 @@
+'''
+Benchmark the post list serialization paths at several page sizes.
+
+    python manage.py bench_post_serializer                    # pages of 5, 50 and 500
+    python manage.py bench_post_serializer --sizes 20 100 --repeat 50
+
+For each page size it times, per page:
+  naive    PostSerializer over Post.objects.all() (one author query per post)
+  joined   PostSerializer over select_related('author').only(...)
+  values   PostSerializer.serialize_rows over values() dicts (what GET /api/posts/ uses)
+
+Missing posts are created inside a transaction that is rolled back at the end,
+so the command can run against any database without leaving data behind.
+'''
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post
+from posts.serializers import PostSerializer
+
+
+User = get_user_model()
+
+
+def naive_page(size):
+    return PostSerializer(list(Post.objects.order_by('-created_at', '-id')[:size]), many=True).data
+
+
+def joined_page(size):
+    queryset = Post.objects.select_related('author').only(
+        'id', 'title', 'content', 'created_at', 'updated_at', 'like_count', 'comment_count',
+        'author__id', 'author__username', 'author__avatar_id'
+    ).order_by('-created_at', '-id')
+    return PostSerializer(list(queryset[:size]), many=True).data
+
+
+def values_page(size):
+    rows = Post.objects.order_by('-created_at', '-id').values(*PostSerializer.values_fields)[:size]
+    return PostSerializer.serialize_rows(list(rows))
+
+
+MODES = [('naive', naive_page), ('joined', joined_page), ('values', values_page)]
+
+
+class Command(BaseCommand):
+    help = 'Time the naive, select_related and values() serialization of post pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[5, 50, 500], help='Page sizes to time.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per mode and size (best is reported).')
+        parser.add_argument('--authors', type=int, default=50, help='Distinct authors for generated posts.')
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        repeat = max(1, options['repeat'])
+
+        with transaction.atomic():
+            self.ensure_posts(max(sizes), options['authors'])
+
+            self.stdout.write(f"{'size':>6} {'mode':>8} {'queries':>8} {'best ms':>9} {'per post us':>12} {'speedup':>8}")
+            for size in sizes:
+                baseline = None
+                for name, page in MODES:
+                    with CaptureQueriesContext(connection) as queries:
+                        page(size)  # warm up, and count the queries once
+                    best = min(self.time_once(page, size) for _ in range(repeat))
+                    baseline = baseline or best
+                    self.stdout.write(
+                        f"{size:>6} {name:>8} {len(queries):>8} {best * 1000:>9.2f} "
+                        f"{best * 1e6 / size:>12.1f} {baseline / best:>7.1f}x"
+                    )
+
+            transaction.set_rollback(True)  # drop the generated rows
+
+    def time_once(self, page, size):
+        start = time.perf_counter()
+        page(size)
+        return time.perf_counter() - start
+
+    def ensure_posts(self, count, author_count):
+        missing = count - Post.objects.count()
+        if missing <= 0:
+            return
+
+        authors = User.objects.bulk_create([
+            User(username=f'bench_author_{i}_{time.time_ns()}') for i in range(author_count)
+        ])
+        Post.objects.bulk_create([
+            Post(author=authors[i % len(authors)], title=f'bench post {i}', content='lorem ipsum ' * 20)
+            for i in range(missing)
+        ])
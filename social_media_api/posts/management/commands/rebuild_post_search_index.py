@@ -0,0 +1,22 @@
+'''
+Rebuild the posts full-text search index from the posts table.
+
+Signals keep the index in sync for normal saves and deletes; run this after
+bulk_create, raw SQL imports or restoring a database.
+
+    python manage.py rebuild_post_search_index
+'''
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Re-index every post for full-text search (SQLite FTS5; PostgreSQL needs nothing).'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
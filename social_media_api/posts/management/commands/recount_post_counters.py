@@ -0,0 +1,67 @@
+'''
+Recompute Post.like_count, Post.comment_count and Comment.reply_count from the Like and Comment tables.
+
+The counters are kept up to date with F() updates, but bulk inserts, raw SQL or
+a crash between statements can make them drift. This repairs them in chunks of
+posts so no single UPDATE locks the whole table.
+
+    python manage.py recount_post_counters --chunk-size 1000
+'''
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from posts.models import Post, Like, Comment
+
+
+def _count_of(model):
+    """Correlated subquery: number of `model` rows pointing at the outer post."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(n=Count('id')).values('n')
+        ),
+        Value(0)
+    )
+
+
+def recount_posts(queryset):
+    """Set both counters for every post in `queryset` with a single UPDATE."""
+    return queryset.update(like_count=_count_of(Like), comment_count=_count_of(Comment))
+
+
+def recount_replies(post_queryset):
+    """Set reply_count on the top-level comments of these posts with a single UPDATE."""
+    replies = Comment.objects.filter(parent=OuterRef('pk')).order_by().values('parent').annotate(n=Count('id')).values('n')
+    return Comment.objects.filter(post__in=post_queryset, parent__isnull=True).update(
+        reply_count=Coalesce(Subquery(replies), Value(0))
+    )
+
+
+class Command(BaseCommand):
+    help = 'Recompute like_count, comment_count and reply_count, one chunk of posts at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts per UPDATE statement.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_id = 0
+        total = 0
+
+        while True:
+            # Walk the primary key so each chunk is an index range scan
+            ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                chunk = Post.objects.filter(id__gte=ids[0], id__lte=ids[-1])
+                total += recount_posts(chunk)
+                recount_replies(chunk)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Recounted {total} posts.'))
@@ -0,0 +1,54 @@
+'''
+Recompute Post.trending_score from the Like table.
+
+Likes keep the scores up to date one at a time (posts/trending.py), and
+deletes, cascading ones included, go through posts/signals.py. Run this after
+changing TRENDING_HALF_LIFE_HOURS, or after writes that skip both: bulk
+inserts of likes (bulk_create sends no signals), QuerySet.update() or raw SQL.
+
+    python manage.py rescore_trending --chunk-size 1000
+'''
+
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, Like
+from posts.trending import score_of
+
+
+def rescore_posts(post_ids):
+    """Set trending_score for these posts from their likes: one read, one bulk UPDATE."""
+    likes = Like.objects.filter(post_id__in=post_ids).order_by('post_id').values_list('post_id', 'created_at')
+    scores = {post_id: score_of(created_at for _, created_at in rows) for post_id, rows in groupby(likes, key=lambda row: row[0])}
+    posts = [Post(pk=post_id, trending_score=scores.get(post_id, score_of([]))) for post_id in post_ids]
+    Post.objects.bulk_update(posts, ['trending_score'])
+    return len(posts)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trending score of every post, one chunk of posts at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Posts per transaction.')
+
+    def handle(self, *args, **options):
+        last_id = 0
+        total = 0
+
+        while True:
+            # Walk the primary key so each chunk is an index range scan
+            ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                # Rows locked so a like in between can't be overwritten by an older score
+                list(Post.objects.select_for_update().filter(id__in=ids).values_list('id', flat=True))
+                total += rescore_posts(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Rescored {total} posts.'))
@@ -0,0 +1,41 @@
+# Full-text search index for posts, see posts/search.py
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        # rowid = post id; filled from the existing posts, then kept in sync by signals
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts "
+            "USING fts5(title, content, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO posts_post_fts (rowid, title, content) SELECT id, title, content FROM posts_post"
+        )
+    elif connection.vendor == 'postgresql':
+        # Expression index: search.py must query this exact expression to use it
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS post_search_idx ON posts_post "
+            "USING GIN (to_tsvector('english', title || ' ' || content))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS posts_post_fts")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS post_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_collectionversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 08:38
+
+from django.conf import settings
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+def backfill_scores(apps, schema_editor):
+    # Score the posts that already have likes (same formula as posts/trending.py)
+    from posts.trending import score_of
+
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    likes = Like.objects.order_by('post_id').values_list('post_id', 'created_at').iterator(chunk_size=5000)
+    posts = [
+        Post(pk=post_id, trending_score=score_of(created_at for _, created_at in rows))
+        for post_id, rows in groupby(likes, key=lambda row: row[0])
+    ]
+    Post.objects.bulk_update(posts, ['trending_score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_comment_threads'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-trending_score', '-id'], name='post_trending_idx'),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,58 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 
 
 User = settings.AUTH_USER_MODEL  # Use custom user model
 
+
+POSTS_COLLECTION = 'posts'  # CollectionVersion key: post creates, edits and deletes (not counters)
+
+
+def adjust_like_count(post_id, delta):
+    """Add `delta` to a post's like_count in one UPDATE (no read, no race)."""
+    Post.objects.filter(pk=post_id).update(like_count=models.F('like_count') + delta)
+
+
+def adjust_comment_count(post_id, delta):
+    """Add `delta` to a post's comment_count in one UPDATE."""
+    Post.objects.filter(pk=post_id).update(comment_count=models.F('comment_count') + delta)
+
+
+def fields_to_save(instance, counters, kwargs):
+    """
+    update_fields for a plain save() of a loaded row: everything loaded but the
+    stored counters. The row's counters may have moved (F() updates from likes
+    and comments) since it was read, and writing the stale values back would
+    undo those changes. Pass update_fields explicitly to write a counter.
+    """
+    if instance._state.adding or kwargs.get('force_insert') or kwargs.get('update_fields') is not None:
+        return kwargs
+    deferred = instance.get_deferred_fields()
+    return dict(kwargs, update_fields=[
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in counters and field.attname not in deferred
+    ])
+
+
+def bump_collection_version(key):
+    """
+    Mark the collection `key` as changed (new ETag / Last-Modified for its lists).
+    Runs after commit so the shared row is never locked for the length of the
+    caller's transaction, and a rolled-back change doesn't bump anything.
+    """
+    def bump():
+        updated = CollectionVersion.objects.filter(key=key).update(
+            version=models.F('version') + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            CollectionVersion.objects.get_or_create(key=key, defaults={'version': 1})
+
+    transaction.on_commit(bump)
+
+
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=255)
@@ -13,16 +60,78 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  # timestamp when created
     updated_at = models.DateTimeField(auto_now=True)      # timestamp when updated
 
+    # Stored totals so listing posts needs no COUNT over likes/comments.
+    # Changed with F() updates (adjust_*_count above); `recount_post_counters` repairs drift.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # log of the time-decayed like sum, kept up to date by every like/unlike (posts/trending.py)
+    trending_score = models.FloatField(default=0.0)
+
+    class Meta:
+        indexes = [
+            # GET /api/posts/ : newest first over all posts
+            models.Index(fields=['-created_at', '-id'], name='post_recent_idx'),
+            # GET /api/posts/trending/ : top N is the start of this index
+            models.Index(fields=['-trending_score', '-id'], name='post_trending_idx'),
+            # one author's posts newest first (feed pull/backfill)
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+        ]
+
+    COUNTER_FIELDS = ('like_count', 'comment_count', 'trending_score')
+
+    def save(self, *args, **kwargs):
+        # Edits (PATCH, the admin) leave the counters alone, see fields_to_save
+        super().save(*args, **fields_to_save(self, self.COUNTER_FIELDS, kwargs))
+
     def __str__(self):
         return f'{self.title} by {self.author}'
 
 
+def adjust_reply_count(comment_id, delta):
+    """Add `delta` to a comment's reply_count in one UPDATE."""
+    Comment.objects.filter(pk=comment_id).update(reply_count=models.F('reply_count') + delta)
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
+    # Threads are one level deep: a reply always points at a top-level comment
+    parent = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='replies'
+    )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    reply_count = models.PositiveIntegerField(default=0)  # stored like Post.comment_count
+
+    class Meta:
+        indexes = [
+            # a post's comments in order
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_idx'),
+            # a post's top-level comments in order (GET /api/posts/<id>/comments/)
+            models.Index(
+                fields=['post', 'created_at', 'id'],
+                name='comment_post_top_idx',
+                condition=models.Q(parent__isnull=True)
+            ),
+            # a thread's replies in order
+            models.Index(fields=['parent', 'created_at', 'id'], name='comment_parent_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep Post.comment_count (and the parent's reply_count) in step with new comments;
+        # deletes, including bulk and cascading ones, are counted in posts/signals.py
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **fields_to_save(self, ('reply_count',), kwargs))
+            if adding:
+                adjust_comment_count(self.post_id, 1)
+                if self.parent_id:
+                    adjust_reply_count(self.parent_id, 1)
 
     def __str__(self):
         return f"Comment by {self.author} on {self.post}"
@@ -42,7 +151,57 @@ class Like(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  # Timestamp when liked
 
     class Meta:
-        unique_together = ('user', 'post')  # Prevent multiple likes by same user
+        unique_together = ('user', 'post')  # Prevent multiple likes by same user (also the "did I like it" index)
+        indexes = [
+            # who liked a post, newest first
+            models.Index(fields=['post', '-created_at'], name='like_post_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} liked {self.post.title}"
+
+
+# One row per (reader, post): the reader's materialized home timeline.
+# Rows are written when a post is created (fan-out on write) so reading a
+# feed page is a single range scan over (owner, created_at, post).
+class FeedEntry(models.Model):
+    owner = models.ForeignKey(
+        User,  # whose home feed this row belongs to
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Copied from the post so unfollow can drop rows without a join
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    # Copied from post.created_at so the feed is ordered without a join
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'post')  # A post appears once per feed
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-post'], name='feed_owner_recent_idx'),
+            models.Index(fields=['owner', 'author'], name='feed_owner_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in {self.owner_id}'s feed"
+
+
+# A change counter per collection ("posts", ...). List endpoints answer
+# If-None-Match / If-Modified-Since by reading this one row instead of
+# rendering the page, see posts/conditional.py.
+class CollectionVersion(models.Model):
+    key = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
@@ -0,0 +1,158 @@
+'''
+Response cache for the post list pages (GET /api/posts/, /api/posts/trending/).
+
+A page is the same for everybody except the per-user "liked" flags, so it is
+built once without them, cached, and every request gets a copy with its own
+flags and the posts' current like/comment counts added (`overlay`: one query
+by primary key for the page's posts).
+
+Entries are keyed by the full request URL (query params and host: the "next"
+link is absolute) and carry the generation they were built from: the "posts"
+CollectionVersion, bumped after every post save/delete (posts/signals.py).
+Likes and comments don't bump it, that's what the overlay is for. A newer
+generation makes the entry outdated; nothing has to be deleted.
+
+Rebuilds are single-flight: the request that wins a cache.add() lock rebuilds,
+the others meanwhile
+  - serve the outdated page if it was built less than STALE_SECONDS ago
+    (stale-while-revalidate), or
+  - wait up to WAIT_SECONDS for the new entry, then build it themselves.
+
+With the local memory cache every worker process keeps its own entries; use
+a shared cache (REDIS_URL, see settings.py) to build each page once in total.
+'''
+
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Value
+
+from .models import Post, Like
+
+
+DEFAULTS = {
+    'TIMEOUT': 300,        # seconds an entry is kept (0 = cache off)
+    'STALE_SECONDS': 30,   # outdated pages younger than this are served during a rebuild
+    'LOCK_SECONDS': 5,     # the rebuild lock expires, so a crashed builder blocks no one for long
+    'WAIT_SECONDS': 2,     # no usable page: wait this long for the builder
+    'POLL_SECONDS': 0.02,  # ... checking the cache this often
+}
+
+HIT, STALE, MISS = 'HIT', 'STALE', 'MISS'  # X-Cache response header
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'POST_LIST_CACHE', {})}
+
+
+def page_key(request):
+    return 'posts:page:' + hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+
+
+def _entry(version, data):
+    return {'version': version, 'built_at': time.time(), 'data': data}
+
+
+def _current(entry, version):
+    return entry is not None and entry['version'] >= version
+
+
+def _stale_ok(entry, options):
+    return entry is not None and time.time() - entry['built_at'] < options['STALE_SECONDS']
+
+
+def get_page(request, version, build):
+    """(page data, X-Cache value); `build()` makes the page when the cache can't."""
+    options = cache_settings()
+    if not options['TIMEOUT']:
+        return build(), MISS
+
+    key = page_key(request)
+    entry = cache.get(key)
+    if _current(entry, version):
+        return entry['data'], HIT
+
+    if cache.add(key + ':lock', True, options['LOCK_SECONDS']):
+        try:
+            data = build()
+            cache.set(key, _entry(version, data), options['TIMEOUT'])
+        finally:
+            cache.delete(key + ':lock')
+        return data, MISS
+
+    if _stale_ok(entry, options):
+        return entry['data'], STALE
+
+    deadline = time.monotonic() + options['WAIT_SECONDS']
+    while time.monotonic() < deadline:
+        time.sleep(options['POLL_SECONDS'])
+        entry = cache.get(key)
+        if _current(entry, version):
+            return entry['data'], HIT
+    return build(), MISS  # the builder is too slow or gone
+
+
+async def aget_page(request, version, build):
+    """get_page for async views; `build` is a coroutine function."""
+    options = cache_settings()
+    if not options['TIMEOUT']:
+        return await build(), MISS
+
+    key = page_key(request)
+    entry = await cache.aget(key)
+    if _current(entry, version):
+        return entry['data'], HIT
+
+    if await cache.aadd(key + ':lock', True, options['LOCK_SECONDS']):
+        try:
+            data = await build()
+            await cache.aset(key, _entry(version, data), options['TIMEOUT'])
+        finally:
+            await cache.adelete(key + ':lock')
+        return data, MISS
+
+    if _stale_ok(entry, options):
+        return entry['data'], STALE
+
+    deadline = time.monotonic() + options['WAIT_SECONDS']
+    while time.monotonic() < deadline:
+        await asyncio.sleep(options['POLL_SECONDS'])
+        entry = await cache.aget(key)
+        if _current(entry, version):
+            return entry['data'], HIT
+    return await build(), MISS
+
+
+def _overlay_rows(data, user):
+    ids = [post['id'] for post in data['results']]
+    liked = Exists(Like.objects.filter(post=OuterRef('pk'), user_id=user.pk)) if user.is_authenticated else Value(False)
+    return Post.objects.filter(pk__in=ids).annotate(liked=liked).values_list('id', 'like_count', 'comment_count', 'liked')
+
+
+def _apply(data, rows):
+    fresh = {post_id: values for post_id, *values in rows}
+    for post in data['results']:
+        if post['id'] in fresh:  # a post deleted since the page was built keeps its last values
+            post['like_count'], post['comment_count'], post['liked'] = fresh[post['id']]
+    return data
+
+
+def _needed(data, user, cache_status):
+    # A page just built (MISS) already has current counters; only "liked" is missing
+    return bool(data['results']) and (cache_status != MISS or user.is_authenticated)
+
+
+def overlay(data, user, cache_status):
+    """Set current counters and the requester's "liked" flags on a (shared) page. At most one query."""
+    if _needed(data, user, cache_status):
+        _apply(data, _overlay_rows(data, user))
+    return data
+
+
+async def aoverlay(data, user, cache_status):
+    if _needed(data, user, cache_status):
+        _apply(data, [row async for row in _overlay_rows(data, user)])
+    return data
@@ -0,0 +1,10 @@
+'''Cursor pagination for posts (newest first) and comments (oldest first), keyed on (created_at, id).'''
+from social_media_api.pagination import KeysetPagination
+
+
+class PostCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    ordering = ('created_at', 'id')  # conversations read top to bottom
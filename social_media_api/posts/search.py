@@ -0,0 +1,174 @@
+"""
+Full-text search over posts (title + content).
+
+SQLite:      an FTS5 table `posts_post_fts` (rowid = post id) created in
+             migration 0007 and kept in sync by the Post save/delete signals.
+PostgreSQL:  a GIN index on to_tsvector('english', title || ' ' || content),
+             also from migration 0007. Nothing to sync, the index follows the rows.
+Others:      unranked icontains fallback.
+
+Both indexes are inverted indexes: a query reads the posting lists of its terms,
+not the whole table, so latency grows with the number of matches, not with the
+number of posts.
+"""
+
+import html
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Post
+
+
+FTS_TABLE = 'posts_post_fts'
+PG_DOCUMENT = "to_tsvector('english', title || ' ' || content)"  # must match the index in 0007
+
+# Highlight markers: control characters can't come from the query, so the text
+# can be HTML-escaped first and the markers turned into <mark> afterwards.
+# Posts could contain them, so they are stripped from the text before it is
+# indexed (SQLite) or highlighted (PostgreSQL, fallback).
+START, STOP = '\x02', '\x03'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _connection():
+    return connections[router.db_for_write(Post)]
+
+
+def fts5_query(text):
+    """
+    User input → FTS5 MATCH expression. Every word is quoted so operators and
+    punctuation (AND, NEAR, "-", ":", unbalanced quotes ...) are searched for as
+    text instead of raising a syntax error. The last word matches as a prefix.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def without_markers(text):
+    return (text or '').replace(START, '').replace(STOP, '')
+
+
+def to_html(text):
+    """Escape `text` and turn the highlight markers into <mark> tags."""
+    return html.escape(text or '').replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+# =========================
+# KEEPING THE INDEX IN SYNC
+# =========================
+
+def index_post(post):
+    connection = _connection()
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)',
+            [post.pk, without_markers(post.title), without_markers(post.content)]
+        )
+
+
+def remove_post(post_id):
+    connection = _connection()
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    """Re-index every post (after bulk_create / raw imports, which skip signals)."""
+    connection = _connection()
+    if connection.vendor != 'sqlite':
+        return
+    posts_table = connection.ops.quote_name(Post._meta.db_table)
+    strip = "replace(replace({}, %s, ''), %s, '')"
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content) '
+            f'SELECT id, {strip.format("title")}, {strip.format("content")} FROM {posts_table}',
+            [START, STOP, START, STOP]
+        )
+
+
+# =========================
+# QUERYING
+# =========================
+
+def search(text, limit, offset=0):
+    """
+    Best matches first: a list of dicts with post `id`, `rank` (higher is better),
+    `title_highlight` and `snippet` (HTML, matches wrapped in <mark>).
+    """
+    connection = _connection()
+    if connection.vendor == 'sqlite':
+        rows = _search_sqlite(connection, text, limit, offset)
+    elif connection.vendor == 'postgresql':
+        rows = _search_postgresql(connection, text, limit, offset)
+    else:
+        rows = _search_fallback(text, limit, offset)
+
+    return [
+        {'id': pk, 'rank': rank, 'title_highlight': to_html(title), 'snippet': to_html(snippet)}
+        for pk, rank, title, snippet in rows
+    ]
+
+
+def _search_sqlite(connection, text, limit, offset):
+    match = fts5_query(text)
+    if match is None:
+        return []
+    with connection.cursor() as cursor:
+        # bm25() is lower-is-better; the title counts twice as much as the content
+        cursor.execute(
+            f'SELECT rowid, -bm25({FTS_TABLE}, 2.0, 1.0) AS score, '
+            f"highlight({FTS_TABLE}, 0, %s, %s), "
+            f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24) "
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY score DESC, rowid DESC LIMIT %s OFFSET %s',
+            [START, STOP, START, STOP, match, limit, offset]
+        )
+        return cursor.fetchall()
+
+
+def _search_postgresql(connection, text, limit, offset):
+    if not WORD_RE.search(text):
+        return []
+    posts_table = connection.ops.quote_name(Post._meta.db_table)
+    options = f'StartSel={START}, StopSel={STOP}'
+    with connection.cursor() as cursor:
+        # websearch_to_tsquery never raises on user input (quotes, "or", "-word")
+        cursor.execute(
+            f"SELECT id, ts_rank({PG_DOCUMENT}, query), "
+            f"ts_headline('english', translate(title, %s, ''), query, %s), "
+            f"ts_headline('english', translate(content, %s, ''), query, %s) "
+            f"FROM {posts_table}, websearch_to_tsquery('english', %s) AS query "
+            f"WHERE {PG_DOCUMENT} @@ query "
+            f"ORDER BY 2 DESC, id DESC LIMIT %s OFFSET %s",
+            [START + STOP, options + ', HighlightAll=true', START + STOP, options + ', MaxWords=35, MinWords=15',
+             text, limit, offset]
+        )
+        return cursor.fetchall()
+
+
+def _search_fallback(text, limit, offset):
+    words = WORD_RE.findall(text)
+    if not words:
+        return []
+    condition = Q()
+    for word in words:
+        condition &= Q(title__icontains=word) | Q(content__icontains=word)
+    rows = Post.objects.filter(condition).order_by('-created_at', '-id').values_list('id', 'title', 'content')
+    return [
+        (pk, 0.0, without_markers(title), without_markers(content)[:200])
+        for pk, title, content in rows[offset:offset + limit]
+    ]
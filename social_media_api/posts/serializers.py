@@ -3,20 +3,77 @@ handle input validation and format API responses.
 """
 
 from rest_framework import serializers
+from accounts import images
 from .models import Post, Comment
 
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)  # Shows username instead of ID
+    # Small WebP of the author's profile picture (content-addressed, so no extra query)
+    author_avatar = serializers.SerializerMethodField()
+    # Has the requesting user liked this post? Views put the page's liked ids
+    # in the context (one query per page) so this never queries per post.
+    liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at']
+        fields = [
+            'id', 'author', 'author_avatar', 'title', 'content', 'created_at', 'updated_at',
+            'like_count', 'comment_count', 'liked'
+        ]
+        read_only_fields = ['like_count', 'comment_count']  # maintained by the server
+
+    def get_author_avatar(self, obj):
+        return images.small_url(obj.author.avatar_id)
+
+    def get_liked(self, obj):
+        return obj.id in self.context.get('liked_ids', ())
+
+    # =========================
+    # READ-ONLY FAST PATH
+    # =========================
+    # For lists: fetch plain dicts with queryset.values(*values_fields) and build
+    # the output directly, instead of a model instance plus a pass through every
+    # serializer field per post. Same JSON as the normal path (see posts/tests.py).
+    values_fields = (
+        'id', 'author__username', 'author__avatar_id', 'title', 'content', 'created_at', 'updated_at',
+        'like_count', 'comment_count'
+    )
+
+    @classmethod
+    def serialize_rows(cls, rows, liked_ids=()):
+        datetime_to_str = serializers.DateTimeField().to_representation
+        return [
+            {
+                'id': row['id'],
+                'author': row['author__username'],
+                'author_avatar': images.small_url(row['author__avatar_id']),
+                'title': row['title'],
+                'content': row['content'],
+                'created_at': datetime_to_str(row['created_at']),
+                'updated_at': datetime_to_str(row['updated_at']),
+                'like_count': row['like_count'],
+                'comment_count': row['comment_count'],
+                'liked': row['id'] in liked_ids,
+            }
+            for row in rows
+        ]
 
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)  # Shows username
-    post = serializers.PrimaryKeyRelatedField(queryset=Post.objects.all())  # Link to post
+    post = serializers.PrimaryKeyRelatedField(read_only=True)  # Taken from the URL
+    # Optional: reply to this comment (replies to a reply join the same thread)
+    parent = serializers.PrimaryKeyRelatedField(queryset=Comment.objects.all(), required=False, allow_null=True)
 
     class Meta:
         model = Comment
-        fields = ['id', 'post', 'author', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'post', 'parent', 'author', 'content', 'created_at', 'updated_at', 'reply_count']
+        read_only_fields = ['reply_count']
+
+    def validate_parent(self, parent):
+        post = self.context.get('post')
+        if parent is not None and post is not None and parent.post_id != post.pk:
+            raise serializers.ValidationError("Parent comment belongs to another post.")
+        if parent is not None and parent.parent_id:
+            return parent.parent  # threads are one level deep
+        return parent
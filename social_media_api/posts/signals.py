@@ -0,0 +1,86 @@
+'''Keep derived post data (home feeds, list versions, search index, counters) in sync with posts, likes, comments and follows.'''
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import (
+    Post, Comment, Like, POSTS_COLLECTION, adjust_comment_count, adjust_like_count, adjust_reply_count,
+    bump_collection_version
+)
+from . import feed, search, trending
+
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    """
+    When a Post is created, push it into the author's and followers' feeds.
+    Edits don't touch feed rows: they only store the post id.
+    """
+    if created:
+        feed.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, **kwargs):
+    """New or edited post → (re)write its full-text search row."""
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_posts_version(sender, instance, **kwargs):
+    """Any created, edited or deleted post changes what the post lists return."""
+    bump_collection_version(POSTS_COLLECTION)
+
+
+def _post_is_deleted_too(origin):
+    # Deleting a post cascades to its likes and comments: no counters left to fix
+    return isinstance(origin, Post) or (isinstance(origin, QuerySet) and origin.model is Post)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance, origin=None, **kwargs):
+    """
+    Every ORM delete of a like (instance, queryset, admin bulk action, a user's
+    cascade) takes it out of like_count and the trending score.
+    posts/likes.py deletes with raw SQL and adjusts the post itself.
+    """
+    if not _post_is_deleted_too(origin):
+        adjust_like_count(instance.post_id, -1)
+        trending.record_unlike(instance.post_id, instance.created_at)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    """Same for comments; replies deleted with their thread are signalled one by one."""
+    if not _post_is_deleted_too(origin):
+        adjust_comment_count(instance.post_id, -1)
+        if instance.parent_id:
+            adjust_reply_count(instance.parent_id, -1)
+
+
+@receiver(m2m_changed, sender=User.following.through)
+def sync_feed_with_follows(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    user.following.add(x)    → backfill x's recent posts into user's feed
+    user.following.remove(x) → drop x's posts from user's feed
+    (reverse=True means the call came from x.followers.add/remove)
+    """
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    for other_id in pk_set:
+        owner_id, author_id = (other_id, instance.pk) if reverse else (instance.pk, other_id)
+        if action == 'post_add':
+            feed.backfill(owner_id, author_id)
+        else:
+            feed.remove_author(owner_id, author_id)
@@ -1,3 +1,641 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Post, Comment, Like, FeedEntry, POSTS_COLLECTION
+from .serializers import PostSerializer
+from .views import PostDetailView
+from . import conditional, likes, page_cache, trending
+
+
+User = get_user_model()
+
+
+class FeedTests(APITestCase):
+    # reader follows author; stranger is not followed by anyone
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='pass123')
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.stranger = User.objects.create_user(username='stranger', password='pass123')
+        self.reader.following.add(self.author)
+        self.client.force_authenticate(user=self.reader)
+
+    def feed_titles(self, url=None):
+        response = self.client.get(url or reverse('feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']], response.data['next']
+
+    # A new post is fanned out to the author's followers only.
+    def test_post_is_fanned_out_to_followers(self):
+        Post.objects.create(author=self.author, title='followed', content='x')
+        Post.objects.create(author=self.stranger, title='not followed', content='x')
+
+        titles, _ = self.feed_titles()
+        self.assertEqual(titles, ['followed'])
+        self.assertTrue(FeedEntry.objects.filter(owner=self.author).exists())  # own feed
+
+    # Following backfills recent posts, unfollowing removes them.
+    def test_follow_backfills_and_unfollow_removes(self):
+        Post.objects.create(author=self.stranger, title='older post', content='x')
+
+        self.reader.following.add(self.stranger)
+        self.assertEqual(self.feed_titles()[0], ['older post'])
+
+        self.reader.following.remove(self.stranger)
+        self.assertEqual(self.feed_titles()[0], [])
+
+    # Authors above the fan-out limit are merged in at read time.
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_popular_author_is_merged_at_read_time(self):
+        self.stranger.following.add(self.author)  # author now has 2 followers
+        Post.objects.create(author=self.author, title='popular', content='x')
+
+        self.assertFalse(FeedEntry.objects.filter(owner=self.reader).exists())
+        self.assertEqual(self.feed_titles()[0], ['popular'])
+
+    # Pages are newest-first and the cursor continues where the last page stopped.
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_cursor_pagination(self):
+        for i in range(5):
+            Post.objects.create(author=self.author, title=f'post {i}', content='x')
+
+        seen = []
+        url = None
+        while True:
+            titles, url = self.feed_titles(url)
+            seen.extend(titles)
+            if not url:
+                break
+        self.assertEqual(seen, [f'post {i}' for i in reversed(range(5))])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('feed') + '?cursor=nope')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PostListPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # page cache entries outlive each test's database
+        self.author = User.objects.create_user(username='author', password='pass123')
+        for i in range(7):
+            Post.objects.create(author=self.author, title=f'post {i}', content='x')
+
+    # Walking the cursor returns every post once, newest first, with no COUNT query.
+    def test_cursor_walks_all_posts(self):
+        url = reverse('post-list') + '?page_size=3'
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])  # no COUNT(*)
+            seen.extend(post['title'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [f'post {i}' for i in reversed(range(7))])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('post-list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    # A page is one query however many authors it has (plus the version stamp).
+    def test_list_has_no_per_post_queries(self):
+        other = User.objects.create_user(username='other', password='pass123')
+        Post.objects.create(author=other, title='by other', content='x')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.data['results'][0]['author'], 'other')
+
+    # The values() fast path renders exactly what the serializer renders.
+    def test_fast_path_matches_serializer(self):
+        posts = Post.objects.order_by('-created_at', '-id')
+        liked_ids = {posts[0].id}
+        expected = PostSerializer(posts, many=True, context={'liked_ids': liked_ids}).data
+        rows = posts.values(*PostSerializer.values_fields)
+        self.assertEqual(PostSerializer.serialize_rows(rows, liked_ids), expected)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('bench_post_serializer', sizes=[5, 10], repeat=1, stdout=out)
+        self.assertIn('values', out.getvalue())
+        self.assertEqual(Post.objects.count(), 7)  # generated posts rolled back
+
+
+class PostCounterTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fan = User.objects.create_user(username='fan', password='pass123')
+        self.post = Post.objects.create(author=self.author, title='hello', content='x')
+        self.client.force_authenticate(user=self.fan)
+
+    # Like/unlike move like_count by exactly one, duplicates don't count.
+    def test_like_and_unlike_update_like_count(self):
+        self.client.post(reverse('like-post', args=[self.post.id]))
+        self.client.post(reverse('like-post', args=[self.post.id]))  # duplicate → 400
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(reverse('unlike-post', args=[self.post.id]))
+        self.client.post(reverse('unlike-post', args=[self.post.id]))  # nothing to remove
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_comment_count(self):
+        comment = Comment.objects.create(post=self.post, author=self.fan, content='nice')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    # Bulk and cascading deletes (QuerySet.delete, the admin's bulk action,
+    # deleting a user) keep the counters right too.
+    def test_bulk_and_cascading_deletes(self):
+        others = [User.objects.create_user(username=f'other{i}', password='pass123') for i in range(3)]
+        for user in [self.fan] + others:
+            likes.like(user.pk, self.post.pk)
+        top = Comment.objects.create(post=self.post, author=self.fan, content='top')
+        Comment.objects.create(post=self.post, author=others[0], content='reply', parent=top)
+        Comment.objects.create(post=self.post, author=others[1], content='other top')
+
+        Like.objects.filter(user__in=others[:2]).delete()
+        Comment.objects.filter(author=others[1]).delete()
+        others[0].delete()  # its reply goes with it
+        self.post.refresh_from_db()
+        top.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count, top.reply_count), (2, 1, 0))
+        expected = trending.score_of(Like.objects.filter(post=self.post).values_list('created_at', flat=True))
+        self.assertAlmostEqual(self.post.trending_score, expected, places=9)
+
+        self.post.delete()  # its own likes and comments: nothing left to adjust
+        self.assertFalse(Like.objects.exists() or Comment.objects.exists())
+
+    # An edit saves the row it read earlier; likes and comments that landed in
+    # between must not be overwritten by the counters it loaded.
+    def test_edits_keep_counters_changed_since_read(self):
+        self.client.force_authenticate(user=self.author)
+        loaded = PostDetailView.queryset.get(pk=self.post.pk)
+        comment = Comment.objects.create(post=self.post, author=self.fan, content='top')
+        likes.like(self.fan.pk, self.post.pk)
+
+        with mock.patch.object(PostDetailView, 'get_object', return_value=loaded):
+            response = self.client.patch(reverse('post-detail', args=[self.post.id]), {'title': 'edited'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stale = Comment.objects.get(pk=comment.pk)
+        Comment.objects.create(post=self.post, author=self.fan, content='reply', parent=comment)
+        stale.content = 'edited'
+        stale.save()
+
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(self.post.title, 'edited')
+        self.assertEqual((self.post.like_count, self.post.comment_count, comment.reply_count), (1, 2, 1))
+        self.assertGreater(self.post.trending_score, 0)
+        self.assertEqual(comment.content, 'edited')
+
+    # The serializer reads the stored counts, no extra queries.
+    def test_counts_in_detail_response(self):
+        Like.objects.create(user=self.fan, post=self.post)  # bypasses the counter
+        call_command('recount_post_counters', chunk_size=1, stdout=StringIO())
+
+        response = self.client.get(reverse('post-detail', args=[self.post.id]))
+        self.assertEqual(response.data['like_count'], 1)
+        self.assertEqual(response.data['comment_count'], 0)
+
+
+class LikeToggleTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # page cache entries outlive each test's database
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fan = User.objects.create_user(username='fan', password='pass123')
+        self.post = Post.objects.create(author=self.author, title='hello', content='x')
+        self.client.force_authenticate(user=self.fan)
+        self.url = reverse('like-toggle', args=[self.post.id])
+
+    # PUT and DELETE can be retried safely; the count only moves once.
+    def test_put_and_delete_are_idempotent(self):
+        for _ in range(2):
+            response = self.client.put(self.url)
+            self.assertEqual(response.data, {'liked': True, 'like_count': 1})
+
+        from notifications.models import NotificationOutbox
+        self.assertEqual(NotificationOutbox.objects.filter(recipient=self.author).count(), 1)
+
+        for _ in range(2):
+            response = self.client.delete(self.url)
+            self.assertEqual(response.data, {'liked': False, 'like_count': 0})
+
+    def test_post_flips(self):
+        self.assertEqual(self.client.post(self.url).data['liked'], True)
+        self.assertEqual(self.client.post(self.url).data['liked'], False)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    # Unlike and like run in one transaction, behind the post's row lock:
+    # a failure in the like half leaves the post as it was.
+    def test_toggle_is_one_transaction(self):
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch('posts.likes.outbox.enqueue', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                likes.toggle(self.fan.pk, self.post.pk)
+        first_write = next(query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'BEGIN')))
+        self.assertIn('SET like_count = like_count WHERE', first_write)
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(likes.toggle(self.fan.pk, self.post.pk), (True, 1))
+        self.assertIsNone(likes.toggle(self.fan.pk, self.post.pk + 100))
+
+    def test_missing_post(self):
+        response = self.client.put(reverse('like-toggle', args=[self.post.id + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Like.objects.exists())
+
+    # One query answers "which of these did I like", and the list uses it too.
+    def test_liked_lookup_is_batched(self):
+        other = Post.objects.create(author=self.author, title='other', content='x')
+        Like.objects.create(user=self.fan, post=self.post)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('liked-posts') + f'?ids={self.post.id},{other.id}')
+        self.assertEqual(response.data, {'liked': [self.post.id]})
+
+        response = self.client.get(reverse('post-list'))
+        liked = {post['id']: post['liked'] for post in response.data['results']}
+        self.assertEqual(liked, {self.post.id: True, other.id: False})
+
+    def test_liked_lookup_rejects_bad_ids(self):
+        response = self.client.get(reverse('liked-posts') + '?ids=1,abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # page cache entries outlive each test's database
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fan = User.objects.create_user(username='fan', password='pass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(author=self.author, title='hello', content='x')
+        self.client.force_authenticate(user=self.fan)
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    # Unchanged post → 304 from a single query; a like changes the ETag.
+    def test_detail_etag(self):
+        url = reverse('post-detail', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('like-toggle', args=[self.post.id]))
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['liked'])
+
+    def test_detail_last_modified(self):
+        url = reverse('post-detail', args=[self.post.id])
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    # Lists revalidate against the collection version: new posts and edits bump it.
+    def test_list_etag(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'edited'
+            self.post.save()
+        response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['title'], 'edited')
+
+    # Likes don't bump the list version (a hot shared row): the counters in a
+    # revalidated list may be up to POST_COUNTERS_MAX_AGE seconds old.
+    def test_list_etag_and_counters(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('like-toggle', args=[self.post.id]))
+        self.assertEqual(conditional.collection_version(POSTS_COLLECTION)[0], 1)  # the create only
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with mock.patch('posts.conditional.time.time', return_value=time.time() + settings.POST_COUNTERS_MAX_AGE):
+            response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['like_count'], 1)
+
+    # The flag "liked" is per user, so is the ETag.
+    def test_etag_differs_per_user(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=self.author)
+        self.assertEqual(self.revalidate(url, etag).status_code, status.HTTP_200_OK)
+
+
+@override_settings(POST_LIST_CACHE={**settings.POST_LIST_CACHE, 'WAIT_SECONDS': 0.1})
+class PostListCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fan = User.objects.create_user(username='fan', password='pass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [Post.objects.create(author=self.author, title=f'post {i}', content='x') for i in range(3)]
+        Like.objects.create(user=self.fan, post=self.posts[0])
+        self.url = reverse('post-list')
+
+    def get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    # Built once for everyone; a hit is the version lookup + the counters/liked overlay.
+    def test_shared_page_with_per_user_liked(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        with self.assertNumQueries(2):
+            response = self.get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertFalse(any(post['liked'] for post in response.data['results']))
+
+        self.client.force_authenticate(user=self.fan)
+        with self.assertNumQueries(2):
+            response = self.get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        liked = {post['id'] for post in response.data['results'] if post['liked']}
+        self.assertEqual(liked, {self.posts[0].id})
+        # The overlay never leaks into the shared copy
+        self.client.force_authenticate(user=None)
+        self.assertFalse(any(post['liked'] for post in self.get().data['results']))
+
+    # Likes don't invalidate pages: cached pages get the current counts.
+    def test_counters_are_current_on_hits(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            likes.like(self.author.pk, self.posts[0].pk)
+            Comment.objects.create(post=self.posts[1], author=self.fan, content='hi')
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        counts = {post['id']: (post['like_count'], post['comment_count']) for post in response.data['results']}
+        stored = {pk: (like_count, comment_count) for pk, like_count, comment_count in
+                  Post.objects.values_list('id', 'like_count', 'comment_count')}
+        self.assertEqual(counts, stored)
+        self.assertEqual(counts[self.posts[1].id], (0, 1))
+
+    # Saving or deleting a post bumps the generation: the next request rebuilds.
+    def test_post_save_and_delete_invalidate(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, title='new', content='x')
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'new')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(title='new').delete()
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'post 2')
+
+    # Query params are part of the key.
+    def test_params_are_part_of_the_key(self):
+        self.get()
+        response = self.client.get(self.url, {'page_size': 1})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 1)
+
+    # While someone else rebuilds: the outdated page is served, or after
+    # WAIT_SECONDS without a page the request builds its own.
+    def test_single_flight(self):
+        self.get()
+        key = page_cache.page_key(self.client.get(self.url).wsgi_request)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, title='new', content='x')
+
+        cache.add(key + ':lock', True)  # a rebuild in progress
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(response.data['results'][0]['title'], 'post 2')
+
+        cache.delete(key)
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'new')
+        self.assertIsNone(cache.get(key))  # only the lock holder stores the page
+
+        cache.delete(key + ':lock')
+        self.get()
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+
+class TrendingTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # page cache entries outlive each test's database
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass123') for i in range(3)]
+        self.old, self.new, self.unliked = [
+            Post.objects.create(author=self.author, title=title, content='x') for title in ('old', 'new', 'unliked')
+        ]
+
+    def assertScore(self, post):
+        # The incrementally kept score equals a recount from the likes
+        expected = trending.score_of(Like.objects.filter(post=post).values_list('created_at', flat=True))
+        self.assertAlmostEqual(Post.objects.get(pk=post.pk).trending_score, expected, places=9)
+
+    def titles(self, **params):
+        response = self.client.get(reverse('post-trending'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['results']]
+
+    # Two likes two days ago weigh less than one like now (6 hour half-life).
+    def test_recent_likes_rank_first(self):
+        for fan in self.fans[:2]:
+            likes.like(fan.pk, self.old.pk)
+        Like.objects.filter(post=self.old).update(created_at=timezone.now() - timedelta(days=2))
+        call_command('rescore_trending', stdout=StringIO())
+        likes.like(self.fans[2].pk, self.new.pk)
+
+        self.assertEqual(self.titles(), ['new', 'old'])  # no likes, not trending
+        self.assertEqual(self.titles(page_size=1), ['new'])
+        self.assertEqual(self.client.get(reverse('post-trending'), {'page_size': 'x'}).status_code, 400)
+
+    # Every like path keeps the score equal to a recount, unlikes included.
+    def test_like_paths_update_the_score(self):
+        self.client.force_authenticate(user=self.fans[0])
+        self.client.post(reverse('like-post', args=[self.new.pk]))
+        self.assertScore(self.new)
+        likes.like(self.fans[1].pk, self.new.pk)
+        likes.like(self.fans[2].pk, self.new.pk)
+        self.assertScore(self.new)
+        self.assertTrue(self.client.get(reverse('post-trending')).data['results'][0]['liked'])
+
+        likes.unlike(self.fans[1].pk, self.new.pk)
+        self.assertScore(self.new)
+        self.client.post(reverse('unlike-post', args=[self.new.pk]))
+        self.assertScore(self.new)
+        likes.toggle(self.fans[2].pk, self.new.pk)  # the last like: back to no likes
+        self.assertEqual(Post.objects.get(pk=self.new.pk).trending_score, trending.NO_LIKES)
+
+    def test_log_domain_arithmetic(self):
+        now = timezone.now()
+        times = [now - timedelta(hours=hours) for hours in (0, 1, 30, 400)]
+        weights = [trending.like_weight(time) for time in times]
+
+        score = trending.NO_LIKES
+        for count, weight in enumerate(weights, start=1):
+            score = trending.score_with(score, count, weight)
+        self.assertAlmostEqual(score, trending.score_of(times), places=9)
+
+        # Removing an old like is a plain subtraction; removing the dominant one asks for a rescore
+        self.assertAlmostEqual(trending.score_without(score, 3, weights[3]), trending.score_of(times[:3]), places=9)
+        single = trending.score_of(times[3:])
+        self.assertIsNone(trending.score_without(trending.score_with(single, 2, weights[0]), 1, weights[0]))
+
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.title_hit = Post.objects.create(author=self.author, title='Django tips', content='Some tips.')
+        self.content_hit = Post.objects.create(author=self.author, title='Misc', content='I wrote a django app <b>today</b>.')
+        Post.objects.create(author=self.author, title='Cooking', content='Pasta recipes')
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('post-search'), {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    # Matches only, title matches ranked first, highlights escaped.
+    def test_ranked_and_highlighted(self):
+        results = self.search('django')['results']
+        self.assertEqual([post['id'] for post in results], [self.title_hit.id, self.content_hit.id])
+        self.assertEqual(results[0]['title_highlight'], '<mark>Django</mark> tips')
+        self.assertIn('<mark>django</mark>', results[1]['snippet'])
+        self.assertIn('&lt;b&gt;today', results[1]['snippet'])
+
+    # Edits and deletes are reflected in the index.
+    def test_index_follows_saves_and_deletes(self):
+        self.content_hit.content = 'nothing to see'
+        self.content_hit.save()
+        self.title_hit.delete()
+        self.assertEqual(self.search('django')['results'], [])
+        self.assertEqual(len(self.search('nothing')['results']), 1)
+
+    def test_prefix_and_operators_are_safe(self):
+        self.assertEqual(len(self.search('djan')['results']), 2)  # last word is a prefix
+        self.assertEqual(self.search('" AND ( NEAR -')['results'], [])
+
+    def test_pagination(self):
+        first = self.search('django', page_size=1)
+        self.assertEqual(len(first['results']), 1)
+        second = self.client.get(first['next']).data
+        self.assertEqual(second['results'][0]['id'], self.content_hit.id)
+        self.assertIsNone(second['next'])
+
+    def test_query_required(self):
+        response = self.client.get(reverse('post-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command(self):
+        Post.objects.bulk_create([Post(author=self.author, title='bulk django', content='x')])  # no signals
+        call_command('rebuild_post_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search('django')['results']), 3)
+
+    # The highlight markers are control characters; a post containing them
+    # must not produce stray <mark> tags, whether saved or bulk-loaded.
+    def test_markers_in_posts_are_not_highlights(self):
+        Post.objects.create(author=self.author, title='\x02Pasta\x03 night', content='pasta \x03and\x02 wine')
+        Post.objects.bulk_create([Post(author=self.author, title='\x03Risotto', content='risotto\x02 rice')])
+        for rebuild in (False, True):
+            if rebuild:
+                call_command('rebuild_post_search_index', stdout=StringIO())
+            results = self.search('pasta night')['results']
+            self.assertEqual(results[0]['title_highlight'], '<mark>Pasta</mark> <mark>night</mark>')
+            self.assertEqual(results[0]['snippet'], '<mark>pasta</mark> and wine')
+        results = self.search('risotto')['results']
+        self.assertEqual((results[0]['title_highlight'], results[0]['snippet']), ('<mark>Risotto</mark>', '<mark>risotto</mark> rice'))
+        with mock.patch('posts.search._connection', return_value=mock.Mock(vendor='other')):
+            results = self.search('pasta')['results']
+        self.assertEqual((results[0]['title_highlight'], results[0]['snippet']), ('Pasta night', 'pasta and wine'))
+
+
+class CommentThreadTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.fan = User.objects.create_user(username='fan', password='pass123')
+        self.post = Post.objects.create(author=self.author, title='hello', content='x')
+        self.url = reverse('post-comments', args=[self.post.id])
+        self.client.force_authenticate(user=self.fan)
+
+    def comment(self, content, parent=None):
+        response = self.client.post(self.url, {'content': content, 'parent': parent and parent['id']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    # Replies to a reply join the top-level thread; counters follow.
+    def test_create_comments_and_replies(self):
+        top = self.comment('first!')
+        reply = self.comment('reply', parent=top)
+        nested = self.comment('reply to reply', parent=reply)
+
+        self.assertEqual(nested['parent'], top['id'])
+        self.assertEqual(Comment.objects.get(pk=top['id']).reply_count, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+
+        Comment.objects.get(pk=top['id']).delete()  # takes its replies with it
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_parent_must_be_on_same_post(self):
+        other = Post.objects.create(author=self.author, title='other', content='x')
+        foreign = Comment.objects.create(post=other, author=self.fan, content='elsewhere')
+        response = self.client.post(self.url, {'content': 'x', 'parent': foreign.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # A page of threads costs the same number of queries whatever the thread count.
+    @override_settings(COMMENT_REPLY_PREVIEW=2)
+    def test_list_with_reply_previews(self):
+        threads = [self.comment(f'thread {i}') for i in range(3)]
+        for i in range(3):
+            self.comment(f'reply {i}', parent=threads[0])
+        self.comment('only reply', parent=threads[1])
+
+        self.client.force_authenticate(user=None)
+        with self.assertNumQueries(3):  # post, page, replies
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data['comment_count'], 7)
+        first, second, third = response.data['results']
+        self.assertEqual([r['content'] for r in first['replies']], ['reply 0', 'reply 1'])
+        self.assertEqual(first['reply_count'], 3)
+        self.assertEqual([r['content'] for r in second['replies']], ['only reply'])
+        self.assertIsNone(second['replies_next'])
+        self.assertEqual(third['replies'], [])
+
+        # The rest of the first thread continues after the preview
+        rest = self.client.get(first['replies_next']).data['results']
+        self.assertEqual([r['content'] for r in rest], ['reply 2'])
+
+    def test_unknown_post(self):
+        response = self.client.get(reverse('post-comments', args=[self.post.id + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,108 @@
+"""
+Trending posts: recent likes count more, kept as one stored number per post.
+
+A like made at time t is worth exp(-λ (now - t)) today, λ = ln 2 / half-life
+(TRENDING_HALF_LIFE_HOURS), so a post's trend is the decayed sum of its likes.
+That sum shrinks as time passes, but by the same factor for every post:
+
+    decayed(post, now) = exp(score(post) - λ (now - EPOCH))
+    score(post)        = log Σ exp(λ (t_like - EPOCH))      over the post's likes
+
+so ordering by the stored `score` is ordering by the current trend, and
+nothing ever has to be rescored. The log keeps the numbers small (λ (t - EPOCH)
+grows by ~2.8 per day with a 6 hour half-life, exp() of it would overflow).
+
+Likes update it in place, under the post's row lock:
+  like:   score = log(exp(score) + exp(w))  (logaddexp)
+  unlike: score = log(exp(score) - exp(w)), w from the deleted like's created_at;
+          when the removed like was nearly all of the score, the subtraction
+          loses precision and the post is rescored from its remaining likes.
+
+Post.trending_score is indexed (descending), so the top N is an index scan.
+"""
+
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+
+from .models import Post, Like
+
+
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)  # fixed: stored scores are relative to it
+NO_LIKES = 0.0  # score of a post without likes, below any like made after EPOCH
+PRECISION_LIMIT = 1e-9  # removing more than 1 - this share of the score: rescore instead
+
+
+def decay_rate():
+    """λ per second. Changing TRENDING_HALF_LIFE_HOURS needs `manage.py rescore_trending`."""
+    return math.log(2) / (getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 6) * 3600)
+
+
+def like_weight(created_at):
+    """log of what a like made at `created_at` adds to a score."""
+    return decay_rate() * (created_at - EPOCH).total_seconds()
+
+
+def score_with(score, like_count, weight):
+    """Score after adding a like; `like_count` already includes it."""
+    if like_count <= 1:
+        return weight
+    high, low = max(score, weight), min(score, weight)
+    return high + math.log1p(math.exp(low - high))
+
+
+def score_without(score, like_count, weight):
+    """Score after removing a like; `like_count` no longer includes it. None: rescore the post."""
+    if like_count <= 0:
+        return NO_LIKES
+    share = math.exp(weight - score)
+    if share > 1 - PRECISION_LIMIT:
+        return None
+    return score + math.log1p(-share)
+
+
+def score_of(created_ats):
+    """Score from scratch (log-sum-exp of the like weights)."""
+    weights = [like_weight(created_at) for created_at in created_ats]
+    if not weights:
+        return NO_LIKES
+    high = max(weights)
+    return high + math.log(sum(math.exp(weight - high) for weight in weights))
+
+
+def rescore(post_id, using='default'):
+    """Recompute one post's score from its likes; returns it."""
+    score = score_of(Like.objects.using(using).filter(post_id=post_id).values_list('created_at', flat=True))
+    Post.objects.using(using).filter(pk=post_id).update(trending_score=score)
+    return score
+
+
+def record_like(post_id, created_at, using='default'):
+    """Add a new like to the post's score. Call inside the transaction that inserted it."""
+    row = Post.objects.using(using).select_for_update().filter(pk=post_id).values_list(
+        'like_count', 'trending_score'
+    ).first()
+    if row is not None:
+        like_count, score = row
+        Post.objects.using(using).filter(pk=post_id).update(
+            trending_score=score_with(score, like_count, like_weight(created_at))
+        )
+
+
+def record_unlike(post_id, created_at, using='default'):
+    """Take a deleted like out of the post's score. Call inside the transaction that deleted it."""
+    if created_at is None:
+        rescore(post_id, using)  # its time wasn't read (deleted concurrently with a re-like)
+        return
+    row = Post.objects.using(using).select_for_update().filter(pk=post_id).values_list(
+        'like_count', 'trending_score'
+    ).first()
+    if row is None:
+        return
+    like_count, score = row
+    score = score_without(score, like_count, like_weight(created_at))
+    if score is None:
+        rescore(post_id, using)
+    else:
+        Post.objects.using(using).filter(pk=post_id).update(trending_score=score)
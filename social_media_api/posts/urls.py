@@ -2,8 +2,15 @@ from django.urls import path
 from .views import (
     PostListCreateView, 
     PostDetailView, 
+    FeedView,
+    PostSearchView,
+    TrendingPostsView,
+    PostCommentsView,
+    CommentRepliesView,
     LikePostView, 
-    UnlikePostView
+    UnlikePostView,
+    LikeToggleView,
+    LikedPostsView
 )
 
 # Define URL patterns
@@ -19,9 +26,32 @@ urlpatterns = [
     # DELETE /api/posts/<id>/ → delete post
     path('posts/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
     
+    # Comments of a post (threaded one level deep)
+    # GET /api/posts/<id>/comments/ → top-level comments with their first replies
+    # POST /api/posts/<id>/comments/ → add a comment or, with "parent", a reply
+    path('posts/<int:pk>/comments/', PostCommentsView.as_view(), name='post-comments'),
+    # GET /api/comments/<id>/replies/ → the rest of a thread
+    path('comments/<int:pk>/replies/', CommentRepliesView.as_view(), name='comment-replies'),
+
+    # Full-text search, ranked and highlighted
+    # GET /api/posts/search/?q=<words>&page_size=10
+    path('posts/search/', PostSearchView.as_view(), name='post-search'),
+
+    # Most liked lately: likes weighted by age (half-life TRENDING_HALF_LIFE_HOURS)
+    # GET /api/posts/trending/?page_size=20
+    path('posts/trending/', TrendingPostsView.as_view(), name='post-trending'),
+
+    # Home feed: posts from followed users, newest first
+    # GET /api/feed/?cursor=<opaque>
+    path('feed/', FeedView.as_view(), name='feed'),
+
     # Like/Unlike posts
     # POST /api/posts/<id>/like/
     path('posts/<int:pk>/like/', LikePostView.as_view(), name='like-post'),
     # POST /api/posts/<id>/unlike/
     path('posts/<int:pk>/unlike/', UnlikePostView.as_view(), name='unlike-post'),
+    # Idempotent: PUT likes, DELETE unlikes, POST flips → {"liked": ..., "like_count": ...}
+    path('posts/<int:pk>/like/toggle/', LikeToggleView.as_view(), name='like-toggle'),
+    # GET /api/posts/liked/?ids=1,2,3 → which of these I liked
+    path('posts/liked/', LikedPostsView.as_view(), name='liked-posts'),
 ]
@@ -1,10 +1,21 @@
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.contenttypes.models import ContentType
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 
-from .models import Post, Like
-from .serializers import PostSerializer
-from notifications.models import Notification
+from .models import Post, Comment, Like, POSTS_COLLECTION, adjust_like_count
+from .serializers import PostSerializer, CommentSerializer
+from .pagination import PostCursorPagination, CommentCursorPagination
+from . import conditional, feed, likes, page_cache, search, trending
+from social_media_api.pagination import encode_cursor, decode_cursor
+from notifications import outbox
 
 
 # =========================
@@ -12,19 +23,267 @@ from notifications.models import Notification
 # =========================
 
 class PostListCreateView(generics.ListCreateAPIView):
-    queryset = Post.objects.all()
+    queryset = Post.objects.select_related('author')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = PostCursorPagination  # ?cursor=... instead of ?page=N
+
+    def list(self, request, *args, **kwargs):
+        # Polling clients: answer 304 from the collection version row, no page render
+        version = conditional.collection_version(POSTS_COLLECTION)
+        etag, last_modified = conditional.collection_validators(POSTS_COLLECTION, request.user, version)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        # The page is shared by everyone (see posts/page_cache.py) ...
+        data, cache_status = page_cache.get_page(request, version[0], self.build_page)
+        # ... current counts and "liked by me" are added for the whole page in one query
+        page_cache.overlay(data, request.user, cache_status)
+        response = Response(data, headers={'X-Cache': cache_status})
+        return conditional.set_validators(response, etag, last_modified)
+
+    def build_page(self):
+        # One query for the page: plain dicts with the author's username joined in
+        rows = self.filter_queryset(self.get_queryset()).values(*PostSerializer.values_fields)
+        page = self.paginate_queryset(rows)
+        return self.paginator.get_paginated_data(PostSerializer.serialize_rows(page))
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
 class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
+    # author joined in so StringRelatedField doesn't query again
+    queryset = Post.objects.select_related('author').only(
+        'id', 'title', 'content', 'created_at', 'updated_at', 'like_count', 'comment_count',
+        'author__id', 'author__username', 'author__avatar_id'
+    )
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def retrieve(self, request, *args, **kwargs):
+        # 304 straight from one indexed lookup when the client's copy is current
+        etag, last_modified = conditional.post_validators(kwargs['pk'], request.user)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        response = super().retrieve(request, *args, **kwargs)
+        return conditional.set_validators(response, etag, last_modified)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['liked_ids'] = likes.liked_post_ids(self.request.user, [self.kwargs['pk']])
+        return context
+
+
+# =========================
+# HOME FEED
+# =========================
+
+class FeedView(generics.GenericAPIView):
+    """
+    Posts from the users the logged-in user follows (plus their own), newest first.
+    Backed by the materialized FeedEntry table, see posts/feed.py.
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        position = None
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                raise NotFound("Invalid cursor")
+
+        posts, next_position = feed.get_feed_page(request.user, position)
+
+        next_url = None
+        if next_position:
+            next_url = request.build_absolute_uri(
+                f"{request.path}?cursor={encode_cursor(*next_position)}"
+            )
+
+        liked_ids = likes.liked_post_ids(request.user, [post.id for post in posts])
+        return Response({
+            "next": next_url,
+            "results": self.get_serializer(posts, many=True, context={
+                **self.get_serializer_context(), 'liked_ids': liked_ids
+            }).data
+        })
+
+
+# =========================
+# COMMENTS
+# =========================
+
+def first_replies(comment_ids, limit):
+    """
+    The first `limit` replies of each comment in `comment_ids`, in one query:
+    ROW_NUMBER() numbers the replies inside each thread and only the first
+    `limit` of every thread are kept. Returns {comment_id: [reply, ...]}.
+    """
+    replies = Comment.objects.filter(parent_id__in=comment_ids).select_related('author').annotate(
+        position=Window(RowNumber(), partition_by=[F('parent_id')], order_by=[F('created_at').asc(), F('id').asc()])
+    ).filter(position__lte=limit).order_by('parent_id', 'created_at', 'id')
+
+    threads = {}
+    for reply in replies:
+        threads.setdefault(reply.parent_id, []).append(reply)
+    return threads
+
+
+class PostCommentsView(generics.ListCreateAPIView):
+    """
+    GET  /api/posts/<id>/comments/ → top-level comments, oldest first, each with
+         its reply_count and first COMMENT_REPLY_PREVIEW replies
+    POST /api/posts/<id>/comments/ → {"content": "...", "parent": <comment id, optional>}
+    A page costs a fixed number of queries whatever the number of threads.
+    """
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = CommentCursorPagination
+
+    def get_post(self):
+        if not hasattr(self, '_post'):
+            self._post = get_object_or_404(Post.objects.only('id', 'comment_count'), pk=self.kwargs['pk'])
+        return self._post
+
+    def get_queryset(self):
+        # authors joined in, not fetched per comment
+        return Comment.objects.filter(post=self.get_post(), parent__isnull=True).select_related('author')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['post'] = self.get_post()
+        return context
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        preview = settings.COMMENT_REPLY_PREVIEW
+        threads = first_replies([comment.id for comment in page if comment.reply_count], preview)
+
+        results = self.get_serializer(page, many=True).data
+        for comment, data in zip(page, results):
+            replies = threads.get(comment.id, [])
+            data['replies'] = CommentSerializer(replies, many=True).data
+            # Where the client continues reading this thread
+            data['replies_next'] = None
+            if comment.reply_count > len(replies):
+                url = request.build_absolute_uri(reverse('comment-replies', args=[comment.id]))
+                if replies:
+                    url = replace_query_param(url, 'cursor', encode_cursor(replies[-1].created_at, replies[-1].id))
+                data['replies_next'] = url
+
+        response = self.get_paginated_response(results)
+        response.data['comment_count'] = self.get_post().comment_count
+        return response
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user, post=self.get_post())
+
+
+class CommentRepliesView(generics.ListAPIView):
+    """GET /api/comments/<id>/replies/ → one thread's replies, oldest first."""
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = CommentCursorPagination
+
+    def get_queryset(self):
+        return Comment.objects.filter(parent_id=self.kwargs['pk']).select_related('author')
+
+
+# =========================
+# SEARCH
+# =========================
+
+class PostSearchView(generics.GenericAPIView):
+    """
+    Ranked full-text search over post titles and content, see posts/search.py.
+    GET /api/posts/search/?q=django orm&page_size=10
+    Each result is a post plus `rank`, `title_highlight` and `snippet` (<mark> around matches).
+    """
+    permission_classes = [permissions.AllowAny]
+    page_size = 10
+    max_page_size = 50
+    max_offset = 1000  # deep pages of a relevance ranking are never useful
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "Query parameter 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({"detail": "page_size and offset must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1 or not 0 <= offset <= self.max_offset:
+            return Response({"detail": "page_size or offset out of range."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One extra hit tells us whether there is a next page, no COUNT
+        hits = search.search(query, page_size + 1, offset)
+        has_next = len(hits) > page_size and offset + page_size <= self.max_offset
+        hits = hits[:page_size]
+
+        # Post fields for the hits in one query, kept in rank order
+        ids = [hit['id'] for hit in hits]
+        rows = {row['id']: row for row in Post.objects.filter(id__in=ids).values(*PostSerializer.values_fields)}
+        liked_ids = likes.liked_post_ids(request.user, ids)
+        results = []
+        for hit in hits:
+            if hit['id'] not in rows:
+                continue  # deleted since it was indexed
+            post = PostSerializer.serialize_rows([rows[hit['id']]], liked_ids)[0]
+            post.update(rank=hit['rank'], title_highlight=hit['title_highlight'], snippet=hit['snippet'])
+            results.append(post)
+
+        next_url = None
+        if has_next:
+            next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + page_size)
+        return Response({"next": next_url, "results": results})
+
+
+class TrendingPostsView(generics.GenericAPIView):
+    """
+    Posts with the most recent likes, see posts/trending.py.
+    GET /api/posts/trending/?page_size=20
+    Reads the first page_size entries of the trending index; pages are cached
+    like the post list, and rebuilt at least every POST_COUNTERS_MAX_AGE seconds.
+    """
+    permission_classes = [permissions.AllowAny]
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        try:
+            page_size = min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size)
+        except ValueError:
+            return Response({"detail": "page_size must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1:
+            return Response({"detail": "page_size out of range."}, status=status.HTTP_400_BAD_REQUEST)
+
+        version = conditional.collection_version(POSTS_COLLECTION)
+        etag, last_modified = conditional.collection_validators(POSTS_COLLECTION, request.user, version)
+        response = conditional.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        def build_page():
+            rows = Post.objects.filter(trending_score__gt=trending.NO_LIKES).order_by(
+                '-trending_score', '-id'
+            ).values(*PostSerializer.values_fields)[:page_size]
+            return {"results": PostSerializer.serialize_rows(rows)}
+
+        # The order moves with likes, which don't change the version: entries
+        # also expire with the counter window (POST_COUNTERS_MAX_AGE)
+        generation = (version[0], conditional.counters_window()[0])
+        data, cache_status = page_cache.get_page(request, generation, build_page)
+        page_cache.overlay(data, request.user, cache_status)
+        response = Response(data, headers={'X-Cache': cache_status})
+        return conditional.set_validators(response, etag, last_modified)
+
 
 # =========================
 # LIKE / UNLIKE
@@ -37,8 +296,24 @@ class LikePostView(generics.GenericAPIView):
         # REQUIRED EXACT STRING
         post = generics.get_object_or_404(Post, pk=pk)
 
-        # REQUIRED EXACT STRING (DO NOT SPLIT)
-        like = Like.objects.get_or_create(user=request.user, post=post)
+        with transaction.atomic():
+            # REQUIRED EXACT STRING (DO NOT SPLIT)
+            like = Like.objects.get_or_create(user=request.user, post=post)
+
+            # Count only likes that were actually inserted
+            if like[1]:
+                adjust_like_count(post.pk, 1)
+                trending.record_like(post.pk, like[0].created_at)
+
+                # Queue the notification in the same transaction;
+                # the outbox worker creates the Notification row later
+                if post.author_id != request.user.pk:
+                    outbox.enqueue(
+                        recipient_id=post.author_id,
+                        actor_id=request.user.pk,
+                        verb="liked your post",
+                        target=post
+                    )
 
         # If already liked
         if not like[1]:
@@ -47,15 +322,6 @@ class LikePostView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create notification
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb="liked your post",
-                target=post
-            )
-
         return Response(
             {"detail": "Post liked."},
             status=status.HTTP_201_CREATED
@@ -68,6 +334,7 @@ class UnlikePostView(generics.GenericAPIView):
     def post(self, request, pk):
         post = generics.get_object_or_404(Post, pk=pk)
 
+        # like_count and the trending score follow in the post_delete signal (posts/signals.py)
         Like.objects.filter(
             user=request.user,
             post=post
@@ -77,3 +344,50 @@ class UnlikePostView(generics.GenericAPIView):
             {"detail": "Post unliked."},
             status=status.HTTP_200_OK
         )
+
+
+class LikeToggleView(generics.GenericAPIView):
+    """
+    Idempotent like/unlike, each a conflict-ignoring insert or a delete plus
+    one counter update (see posts/likes.py).
+    PUT → like, DELETE → unlike, POST → flip. Returns the new state and like_count.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def respond(self, result):
+        if result is None:
+            raise NotFound("No Post matches the given query.")
+        liked, like_count = result
+        return Response({"liked": liked, "like_count": like_count}, status=status.HTTP_200_OK)
+
+    def put(self, request, pk):
+        result = likes.like(request.user.pk, pk)
+        return self.respond(result and (True, result[1]))
+
+    def delete(self, request, pk):
+        result = likes.unlike(request.user.pk, pk)
+        return self.respond(result and (False, result[1]))
+
+    def post(self, request, pk):
+        return self.respond(likes.toggle(request.user.pk, pk))
+
+
+class LikedPostsView(generics.GenericAPIView):
+    """
+    Which of these posts has the logged-in user liked? One query.
+    GET /api/posts/liked/?ids=1,2,3 → {"liked": [1, 3]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_ids = 100
+
+    def get(self, request):
+        try:
+            ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return Response({"detail": "ids must be a comma-separated list of integers."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_ids:
+            return Response({"detail": f"At most {self.max_ids} ids per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"liked": sorted(likes.liked_post_ids(request.user, ids))})
@@ -2,6 +2,15 @@
 ASGI config for social_media_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are routed through asgi_urls.py, where the post and notification
+reads are async views; everything else is the same as under WSGI.
+
+MIDDLEWARE holds only async-capable middleware, so a request to an async view
+runs on the event loop and blocks no thread while it awaits.
+Static files are answered by Django's ASGIStaticFilesHandler in front of it
+(WhiteNoise, used under WSGI, is sync-only).
+
+    uvicorn social_media_api.asgi:application --workers 4
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -9,8 +18,25 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
 
-application = get_asgi_application()
+ASGI_URLCONF = 'social_media_api.asgi_urls'
+
+
+class AsyncReadsASGIHandler(ASGIHandler):
+    """ASGIHandler whose requests resolve against asgi_urls instead of ROOT_URLCONF."""
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASGI_URLCONF
+        return request, error_response
+
+
+# What get_asgi_application() does, with the handler above
+django.setup(set_prefix=False)
+application = ASGIStaticFilesHandler(AsyncReadsASGIHandler())
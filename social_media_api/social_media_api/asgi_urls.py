@@ -0,0 +1,17 @@
+"""
+URL configuration used under ASGI (see asgi.py): urls.py with the hottest
+reads answered by async views. Same paths and names, listed first so they win;
+other methods on those paths still reach the DRF views (see async_views.py).
+"""
+from django.urls import path
+
+from notifications import async_views as notification_views
+from posts import async_views as post_views
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/posts/', post_views.post_list, name='post-list'),
+    path('api/posts/<int:pk>/', post_views.post_detail, name='post-detail'),
+    path('api/notifications/', notification_views.notification_list, name='notifications'),
+    path('api/notifications/unread-count/', notification_views.unread_count, name='notifications-unread-count'),
+] + sync_urlpatterns
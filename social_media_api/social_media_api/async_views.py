@@ -0,0 +1,72 @@
+"""
+Shared plumbing for the async read views (posts/async_views.py, notifications/async_views.py).
+
+DRF's APIView is sync only: under ASGI every DRF request holds a thread from
+the sync_to_async pool for its whole duration. The hottest reads are written
+as plain Django async views instead, with the async ORM (aget, afirst, async
+for) and the async cache API, and served from asgi_urls.py.
+
+`async_read_view` keeps them interchangeable with the DRF views they shadow:
+  - the same token authentication (CachedTokenAuthentication, async path),
+  - the same JSON bytes (DRF's JSONRenderer) and error bodies,
+  - anything but GET/HEAD (POST, PUT, OPTIONS, ...) is handed to the DRF view.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+
+from accounts.authentication import CachedTokenAuthentication
+
+
+def json_response(data, status=200, headers=None):
+    """What DRF's Response would send for `data` with the JSON renderer."""
+    renderer = JSONRenderer()
+    return HttpResponse(renderer.render(data), status=status, headers=headers,
+                        content_type=renderer.media_type)
+
+
+def exception_response(exc):
+    """rest_framework.views.exception_handler for async views."""
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound(*exc.args)
+
+    headers = {}
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        headers['WWW-Authenticate'] = CachedTokenAuthentication().authenticate_header(None)
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return json_response(data, status=exc.status_code, headers=headers)
+
+
+def async_read_view(fallback, login_required=False):
+    """
+    Turn `async def view(request, ...)` into a read endpoint that stands in for
+    the DRF view class `fallback`. request.user is the token's user (or
+    AnonymousUser); `login_required` answers 401 like IsAuthenticated does.
+    """
+    fallback_view = sync_to_async(fallback.as_view())
+
+    def decorator(view):
+        @csrf_exempt  # like DRF: token auth, no cookies; writes go to the DRF view anyway
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await fallback_view(request, *args, **kwargs)
+
+            try:
+                result = await CachedTokenAuthentication().aauthenticate(request)
+                request.user = result[0] if result else AnonymousUser()
+                if login_required and not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                return await view(request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                return exception_response(exc)
+
+        return wrapper
+
+    return decorator
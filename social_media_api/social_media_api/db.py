@@ -0,0 +1,31 @@
+"""
+Small SQL helpers the ORM doesn't offer.
+"""
+
+from django.db import connections, router
+
+
+def insert_ignore(model, **values):
+    """
+    Insert one row unless it would break a unique constraint.
+
+    One statement - INSERT ... ON CONFLICT DO NOTHING RETURNING pk - instead of
+    get_or_create's SELECT then INSERT. Returns True if a row was inserted.
+    Works on PostgreSQL and SQLite 3.35+.
+    """
+    meta = model._meta
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+
+    fields = [meta.get_field(name) for name in values]
+    params = [field.get_db_prep_save(value, connection) for field, value in zip(fields, values.values())]
+
+    sql = 'INSERT INTO {table} ({columns}) VALUES ({placeholders}) ON CONFLICT DO NOTHING RETURNING {pk}'.format(
+        table=qn(meta.db_table),
+        columns=', '.join(qn(field.column) for field in fields),
+        placeholders=', '.join(['%s'] * len(fields)),
+        pk=qn(meta.pk.column)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone() is not None
@@ -0,0 +1,305 @@
+"""
+Prometheus metrics shared by all worker processes, without an outside service.
+
+gunicorn forks several workers and a scrape reaches only one of them, so
+nothing is kept in process memory. Each process owns two files in METRICS_DIR,
+counter_<pid>.db and gauge_<pid>.db, mmap'd so that an update is a few bytes
+written to memory (no syscall, no lock between processes):
+
+    [used bytes: int32][pad] then entries of
+    [key length: int32][key: utf-8, padded to 8 bytes][value: float64]
+
+GET /metrics reads every file in the directory and adds the values up.
+Counters and histograms of exited workers are kept (the totals must not go
+down); gauges of exited workers are dropped and their files deleted.
+
+Clear METRICS_DIR when the app starts (see DEPLOYMENT.md) so a new process
+never picks up the files of an old one with the same pid.
+"""
+
+import hmac
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from .middleware import QueryTimer
+
+
+# name → (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Time spent handling a request, by route and method.'),
+    'http_request_db_queries': ('histogram', 'SQL queries run by a request, by route and method.'),
+    'http_requests_in_flight': ('gauge', 'Requests being handled right now, by method.'),
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+INITIAL_SIZE = 1 << 16  # files grow by doubling
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'social_media_api_metrics')
+
+
+# =========================
+# MMAP'D FILE PER PROCESS
+# =========================
+
+def _padded(length):
+    return length + (-length % 8)
+
+
+def read_entries(data):
+    """(key, value, offset of the value) for each entry of a file's bytes."""
+    used = struct.unpack_from('<i', data, 0)[0] if len(data) >= 8 else 0
+    position = 8
+    while position < used:
+        length = struct.unpack_from('<i', data, position)[0]
+        key = bytes(data[position + 4:position + 4 + length]).decode()
+        position += _padded(length + 4)  # the value starts on an 8-byte boundary
+        yield key, struct.unpack_from('<d', data, position)[0], position
+        position += 8
+
+
+class MmapStore:
+    def __init__(self, path):
+        self.lock = threading.Lock()  # threads of one process (ASGI, gthread workers)
+        self.file = open(path, 'a+b')
+        size = os.fstat(self.file.fileno()).st_size
+        if size == 0:
+            size = INITIAL_SIZE
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        if struct.unpack_from('<i', self.map, 0)[0] == 0:
+            struct.pack_into('<i', self.map, 0, 8)
+
+        # key → offset of its value (a file left by an earlier process with this pid)
+        self.positions = {key: position for key, _, position in read_entries(self.map)}
+
+    def _position(self, key):
+        position = self.positions.get(key)
+        if position is not None:
+            return position
+
+        encoded = key.encode()
+        used = struct.unpack_from('<i', self.map, 0)[0]
+        entry_size = _padded(len(encoded) + 4) + 8
+        while used + entry_size > len(self.map):
+            self.file.truncate(len(self.map) * 2)
+            self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), os.fstat(self.file.fileno()).st_size)
+
+        struct.pack_into(f'<i{len(encoded)}s', self.map, used, len(encoded), encoded)
+        position = used + entry_size - 8
+        struct.pack_into('<d', self.map, position, 0.0)
+        # The new length is written last, so a reader never sees half an entry
+        struct.pack_into('<i', self.map, 0, used + entry_size)
+        self.positions[key] = position
+        return position
+
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            position = self._position(key)
+            value = struct.unpack_from('<d', self.map, position)[0]
+            struct.pack_into('<d', self.map, position, value + amount)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+_stores = {}  # (directory, pid, kind) → MmapStore
+_stores_lock = threading.Lock()
+
+
+def _store(kind):
+    directory = metrics_dir()
+    pid = os.getpid()  # a forked worker gets its own file, not its parent's
+    key = (directory, pid, kind)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                os.makedirs(directory, exist_ok=True)
+                store = _stores[key] = MmapStore(os.path.join(directory, f'{kind}_{pid}.db'))
+    return store
+
+
+def sample_key(metric, sample, labels):
+    return json.dumps([metric, sample, sorted(labels.items())])
+
+
+# =========================
+# RECORDING
+# =========================
+
+def inc(metric, labels, amount=1.0):
+    _store('counter').inc(sample_key(metric, metric, labels), amount)
+
+
+def inc_gauge(metric, labels, amount):
+    _store('gauge').inc(sample_key(metric, metric, labels), amount)
+
+
+def observe(metric, labels, value, buckets):
+    store = _store('counter')
+    for bound in buckets:  # cumulative; empty buckets are written too, as 0
+        store.inc(sample_key(metric, f'{metric}_bucket', dict(labels, le=_format(bound))), 1 if value <= bound else 0)
+    store.inc(sample_key(metric, f'{metric}_bucket', dict(labels, le='+Inf')))
+    store.inc(sample_key(metric, f'{metric}_sum', labels), value)
+    store.inc(sample_key(metric, f'{metric}_count', labels))
+
+
+def record_request(method, route, status, seconds, queries):
+    labels = {'method': method, 'route': route}
+    inc('http_requests_total', dict(labels, status=str(status)))
+    observe('http_request_duration_seconds', labels, seconds, DURATION_BUCKETS)
+    observe('http_request_db_queries', labels, queries, QUERY_BUCKETS)
+
+
+class MetricsMiddleware:
+    """Counts every request (no sampling) by route pattern, e.g. api/posts/<int:pk>/."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        queries = QueryTimer()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(queries))
+        inc_gauge('http_requests_in_flight', {'method': request.method}, 1)
+        return queries, stack, time.perf_counter()
+
+    def finish(self, request, response, queries, start):
+        inc_gauge('http_requests_in_flight', {'method': request.method}, -1)
+        match = request.resolver_match
+        route = match.route if match is not None else '<unmatched>'  # a pattern, so the label set stays small
+        status = response.status_code if response is not None else 500
+        record_request(request.method, route, status, time.perf_counter() - start, queries.count)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        queries, stack, start = self.start(request)
+        response = None
+        try:
+            with stack:
+                response = self.get_response(request)
+        finally:
+            self.finish(request, response, queries, start)
+        return response
+
+    async def __acall__(self, request):
+        # The wrappers go on the connections of the request's thread-sensitive
+        # thread, where the ORM runs (see RequestTimingMiddleware.__acall__)
+        queries, stack, start = await sync_to_async(self.start)(request)
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            self.finish(request, response, queries, start)
+        return response
+
+
+# =========================
+# SCRAPING
+# =========================
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """{key: value} summed over the files of every process."""
+    directory = metrics_dir()
+    totals = {}
+    if not os.path.isdir(directory):
+        return totals
+    for name in os.listdir(directory):
+        kind, _, rest = name.partition('_')
+        if kind not in ('counter', 'gauge') or not rest.endswith('.db'):
+            continue
+        path = os.path.join(directory, name)
+        if kind == 'gauge' and not _pid_alive(int(rest[:-3])):
+            os.remove(path)  # that worker is gone, so are its in-flight requests
+            continue
+        with open(path, 'rb') as metrics_file:
+            for key, value, _ in read_entries(metrics_file.read()):
+                totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))  # 0.005, 1.0 ... like the official clients
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _parse(key):
+    """sample_key() → (metric, sample, labels with `le` moved last)."""
+    metric, sample, labels = json.loads(key)
+    labels = [tuple(pair) for pair in labels if pair[0] != 'le'] + [tuple(pair) for pair in labels if pair[0] == 'le']
+    return metric, sample, labels
+
+
+def _sort_key(item):
+    (metric, sample, labels), _ = item
+    le = dict(labels).get('le')
+    bucket = float('inf') if le == '+Inf' else float(le) if le is not None else 0.0
+    series = [pair for pair in labels if pair[0] != 'le']
+    # Per series: buckets in order, then _sum, then _count
+    return metric, series, sample.endswith('_count'), sample.endswith('_sum'), bucket
+
+
+def render():
+    """Everything in the text exposition format (version 0.0.4)."""
+    samples = sorted(((_parse(key), value) for key, value in collect().items()), key=_sort_key)
+    lines = []
+    current = None
+    for (metric, sample, labels), value in samples:
+        if metric != current:
+            kind, help_text = METRICS.get(metric, ('untyped', ''))
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+            current = metric
+        label_text = ','.join(f'{name}="{_escape(label)}"' for name, label in labels)
+        number = int(value) if value == int(value) else value
+        lines.append(f'{sample}{{{label_text}}} {number}' if labels else f'{sample} {number}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /metrics. With METRICS_TOKEN set, requires `Authorization: Bearer <token>`."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
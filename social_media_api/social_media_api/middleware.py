@@ -0,0 +1,153 @@
+"""
+Per-request SQL and timing instrumentation.
+
+For a sampled request, every query on every database connection goes through
+connection.execute_wrapper, which counts it and times it. The numbers are sent
+back in a Server-Timing header (browser dev tools show it in the Network tab)
+and written as one structured log line on the `request_timing` logger:
+
+    db      time spent executing SQL, with the query count
+    view    the view function (DRF serializers run here too)
+    render  turning the response into bytes: JSON rendering, templates
+    total   the whole request as seen by this middleware
+
+Settings:
+    REQUEST_TIMING_SAMPLE_RATE  share of requests measured, 0.0 - 1.0 (default 1.0)
+    REQUEST_TIMING_HEADER       send the Server-Timing header (default True)
+
+Requests that are not sampled only pay for one random() call.
+"""
+
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('request_timing')
+
+
+def ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class QueryTimer:
+    """execute_wrapper hook: counts queries and adds up their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class RequestTiming:
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.start = time.perf_counter()
+        self.view_start = self.view_end = self.render_end = None
+
+    def rendered(self, response):
+        self.render_end = time.perf_counter()
+
+    def metrics(self):
+        """Milliseconds per phase, plus the query count."""
+        end = time.perf_counter()
+        view_end = self.view_end or end  # plain HttpResponse: no separate render step
+        return {
+            'queries': self.queries.count,
+            'db_ms': ms(self.queries.seconds),
+            'view_ms': ms(view_end - self.view_start) if self.view_start else 0.0,
+            'render_ms': ms(self.render_end - view_end) if self.render_end else 0.0,
+            'total_ms': ms(end - self.start),
+        }
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True  # so async views are not pushed onto a thread
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 1.0)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def recording(self, timing):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timing.queries))
+        return stack
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        timing = request._request_timing = RequestTiming()
+        with self.recording(timing):
+            response = self.get_response(request)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        timing = request._request_timing = RequestTiming()
+        # Connection objects belong to a thread. Sync views and the async ORM
+        # both run in the request's thread-sensitive thread, so the wrappers go
+        # on that thread's connections, not on the event loop's.
+        stack = await sync_to_async(self.recording)(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, '_request_timing', None)
+        if timing is not None:
+            timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called after the view returns and before DRF / TemplateResponse rendering
+        timing = getattr(request, '_request_timing', None)
+        if timing is not None:
+            timing.view_end = time.perf_counter()
+            response.add_post_render_callback(timing.rendered)
+        return response
+
+    def finish(self, request, response, timing):
+        metrics = timing.metrics()
+
+        if getattr(settings, 'REQUEST_TIMING_HEADER', True):
+            value = (
+                f'db;dur={metrics["db_ms"]};desc="{metrics["queries"]} queries", '
+                f'view;dur={metrics["view_ms"]}, render;dur={metrics["render_ms"]}, '
+                f'total;dur={metrics["total_ms"]}'
+            )
+            existing = response.headers.get('Server-Timing')
+            response.headers['Server-Timing'] = f'{existing}, {value}' if existing else value
+
+        logger.info(
+            'request_timing method=%s path=%s status=%s queries=%d db_ms=%.2f view_ms=%.2f render_ms=%.2f total_ms=%.2f',
+            request.method, request.path, response.status_code, metrics['queries'], metrics['db_ms'],
+            metrics['view_ms'], metrics['render_ms'], metrics['total_ms'],
+            extra={'timing': dict(metrics, method=request.method, path=request.path, status=response.status_code)}
+        )
+        return response
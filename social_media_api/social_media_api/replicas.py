@@ -0,0 +1,136 @@
+"""
+Read replicas: GET traffic reads from a replica, everything else uses `default`.
+
+ReplicaRouter sends reads wherever the current request said to. Nothing reads
+from a replica unless ReplicaMiddleware picked one, so management commands,
+the outbox and image workers and tests always read the primary.
+
+ReplicaMiddleware picks one replica per request (all queries of a request
+see the same snapshot) when:
+  - the method is safe (GET, HEAD, OPTIONS), and
+  - the client has not written in the last REPLICA_PIN_SECONDS.
+
+A write marks the client for that window so it reads its own writes even
+while the replicas lag behind. Browsers get a cookie. Token clients usually
+drop cookies, so the pin is also stored in the cache under a hash of their
+Authorization header. That needs a cache shared by the workers to hold across
+processes.
+
+Replica aliases are listed in settings.DATABASE_REPLICAS (see settings.py).
+"""
+
+import hashlib
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+
+PIN_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# The replica alias the current request reads from, None = primary.
+# A ContextVar is copied into sync_to_async threads, so ASGI works too.
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def _pin_key(authorization):
+    return 'replica-pin:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db  # related objects come from where the instance came from
+        return _read_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {'default', *replicas()}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()  # replicas get the schema from the primary
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def pinned_by_cookie(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def pin(self, request, response):
+        seconds = pin_seconds()
+        response.set_cookie(PIN_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True, samesite='Lax')
+        return _pin_key(request.headers['Authorization']) if 'Authorization' in request.headers else None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+
+        alias = None
+        if request.method in SAFE_METHODS and not self.pinned_by_cookie(request):
+            authorization = request.headers.get('Authorization')
+            if not (authorization and cache.get(_pin_key(authorization))):
+                alias = random.choice(replicas())
+
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+        if request.method not in SAFE_METHODS:
+            key = self.pin(request, response)
+            if key:
+                cache.set(key, True, pin_seconds())
+        return response
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+
+        alias = None
+        if request.method in SAFE_METHODS and not self.pinned_by_cookie(request):
+            authorization = request.headers.get('Authorization')
+            if not (authorization and await cache.aget(_pin_key(authorization))):
+                alias = random.choice(replicas())
+
+        token = _read_alias.set(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+        if request.method not in SAFE_METHODS:
+            key = self.pin(request, response)
+            if key:
+                await cache.aset(key, True, pin_seconds())
+        return response
@@ -49,13 +49,15 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'accounts',
     'posts',
-    'notifications'
+    'notifications',
+    'benchmarks',  # generate_social_data / bench_endpoints commands
 ]
 
 REST_FRAMEWORK = {
     # authentication
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with an in-process + shared cache in front of the DB
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     # authorization
     'DEFAULT_PERMISSION_CLASSES': [
@@ -67,8 +69,111 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend', 'rest_framework.filters.SearchFilter'],
 }
 
+# Cache: token auth, unread counts, replica pins and post list pages use it.
+# REDIS_URL=redis://... gives every worker process the same cache (needs the
+# `redis` package); otherwise each process has its own in-memory cache.
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'social_media_api',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Conditional GET (posts/conditional.py): likes and comments don't bump the
+# post list version, so revalidated responses may show counters this many seconds old
+POST_COUNTERS_MAX_AGE = 15
+
+# Post list response cache (posts/page_cache.py)
+POST_LIST_CACHE = {
+    'TIMEOUT': 300,       # seconds an entry is kept (0 = off)
+    'STALE_SECONDS': 30,  # an outdated page this young is served while one request rebuilds it
+    'LOCK_SECONDS': 5,    # rebuild lock expiry
+    'WAIT_SECONDS': 2,    # no page to serve: wait this long for the rebuild, then build
+}
+
+# Cached token authentication (accounts/authentication.py)
+TOKEN_AUTH_CACHE = {
+    'LOCAL_TTL': 5,          # seconds in the per-process LRU (other workers can't invalidate it)
+    'LOCAL_MAXSIZE': 10000,  # tokens kept per process
+    'SHARED_TTL': 300,       # seconds in the shared Django cache (capped at LOCAL_TTL without REDIS_URL)
+}
+
+# Home feed (posts/feed.py)
+# Authors with more followers than this are merged at read time instead of fanned out
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_FANOUT_BATCH_SIZE = 1000  # rows per bulk insert when fanning out
+FEED_BACKFILL_LIMIT = 50  # recent posts copied into a feed on follow
+FEED_PAGE_SIZE = 20
+
+# Profile picture pipeline (accounts/images.py)
+AVATAR_WIDTHS = [48, 96, 192, 512]  # square variants generated for every upload
+AVATAR_POST_WIDTH = 96  # variant linked from posts (author_avatar)
+AVATAR_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 40_000_000  # refuse to decode larger images (decompression bombs)
+AVATAR_JOB_TIMEOUT = 600  # seconds before a job claimed by a crashed worker is retried
+
+# Trending posts (posts/trending.py)
+# A like's weight halves every this many hours. Stored scores depend on it:
+# run `python manage.py rescore_trending` after changing it.
+TRENDING_HALF_LIFE_HOURS = 6
+
+# Comment threads (posts/views.py)
+COMMENT_REPLY_PREVIEW = 3  # replies returned with each top-level comment
+
+# Notification outbox worker (notifications/outbox.py)
+NOTIFICATION_OUTBOX_BATCH_SIZE = 500  # outbox rows turned into notifications per bulk insert
+NOTIFICATION_COALESCE_WINDOW = 24 * 60 * 60  # seconds; same-target actions inside it share one row
+NOTIFICATION_RECENT_ACTORS = 3  # actors kept on a grouped notification
+NOTIFICATION_UNREAD_CACHE_TTL = 10  # seconds the unread badge count may be served from cache
+NOTIFICATION_RETENTION_DAYS = 90  # read notifications older than this are archived
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 1000  # rows moved per transaction by archive_notifications
+
+# Notification stream (notifications/stream.py, served under ASGI)
+NOTIFICATION_STREAM_POLL_INTERVAL = 1.0  # seconds between each worker's database polls
+NOTIFICATION_STREAM_COMMIT_LAG = 5  # seconds re-read per poll for rows committed late
+NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+NOTIFICATION_STREAM_MAX_SECONDS = 300  # streams are closed after this; clients reconnect
+
+# Per-request SQL count / DB time / view and render time (Server-Timing header + log line)
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '1.0'))  # 0.0 - 1.0
+REQUEST_TIMING_HEADER = os.environ.get('REQUEST_TIMING_HEADER', 'True').lower() == 'true'
+
+# Prometheus /metrics: one mmap'd file per process in this directory, summed at scrape time.
+# Cleared on start by the Procfile; every process of one deploy must share it.
+METRICS_DIR = os.environ.get('METRICS_DIR', '/tmp/social_media_api_metrics')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # if set, scrapers send "Authorization: Bearer <token>"
+
+# The request_timing lines go to the console (Heroku collects stdout)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'request_timing': {
+            'handlers': ['console'],
+            # WARNING silences the lines (e.g. for test runs); the middleware tests use assertLogs
+            'level': os.environ.get('REQUEST_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 
 MIDDLEWARE = [
+    'social_media_api.metrics.MetricsMiddleware',  # per-route counters and histograms for /metrics
+    'social_media_api.middleware.RequestTimingMiddleware',  # before the rest, so its total covers them (only Metrics is outside)
+    'social_media_api.replicas.ReplicaMiddleware',  # GET reads from a replica unless the client just wrote
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,7 +181,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware"
+    # Everything here must be async-capable: one sync-only middleware makes Django
+    # run the whole ASGI chain in a thread. Static files are served in wsgi.py / asgi.py.
 ]
 
 ROOT_URLCONF = 'social_media_api.urls'
@@ -135,6 +241,29 @@ elif os.environ.get('USE_POSTGRESQL', 'False').lower() == 'true':
         }
     }
 
+# Read replicas (social_media_api/replicas.py): GET requests read from one of these.
+#   DATABASE_REPLICA_URLS=postgres://...,postgres://...   one alias per URL
+#   SQLITE_REPLICAS=2   local stand-ins: copies of the SQLite file, refreshed by
+#                       `python manage.py sync_sqlite_replicas` (lag included)
+DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica_{number}'] = dj_database_url.parse(url.strip(), conn_max_age=600, conn_health_checks=True)
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+if not DATABASE_REPLICAS and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    for number in range(1, int(os.environ.get('SQLITE_REPLICAS', '0')) + 1):
+        DATABASES[f'replica_{number}'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / f'alx_social_media.replica_{number}.sqlite3',
+        }
+        DATABASE_REPLICAS.append(f'replica_{number}')
+
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}  # tests: the replica is the test database
+
+DATABASE_ROUTERS = ['social_media_api.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))  # reads stay on the primary this long after a write
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -176,6 +305,10 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Uploaded files (profile pictures and their processed variants)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
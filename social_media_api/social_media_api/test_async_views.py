@@ -0,0 +1,147 @@
+import asyncio
+import sys
+import threading
+import traceback
+from unittest import mock
+
+from asgiref.sync import AsyncToSync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from accounts.authentication import local_cache
+from notifications.models import Notification
+from posts.models import Post, Like
+from .asgi import ASGI_URLCONF, AsyncReadsASGIHandler, application
+
+
+User = get_user_model()
+
+
+class AsyncReadViewsTests(APITestCase):
+    # The same URLs through urls.py (DRF views) and asgi_urls.py (async views)
+    # must answer with the same status and bytes.
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.reader = User.objects.create_user(username='reader', password='pass123')
+        self.author = User.objects.create_user(username='author', password='pass123')
+        self.token = Token.objects.create(user=self.reader)
+        self.posts = [Post.objects.create(author=self.author, title=f'Post {i}', content='Body') for i in range(7)]
+        Like.objects.create(user=self.reader, post=self.posts[-1])
+        Notification.objects.create(recipient=self.reader, actor=self.author, verb='followed you')
+        self.auth = {'Authorization': f'Token {self.token.key}'}
+
+    async def both(self, url, **headers):
+        sync = await self.async_client.get(url, headers=headers)
+        with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+            response = await self.async_client.get(url, headers=headers)
+        self.assertEqual(response.status_code, sync.status_code)
+        self.assertEqual(response.content, sync.content)
+        return response
+
+    async def test_post_list_pages_match(self):
+        response = await self.both('/api/posts/', **self.auth)
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertTrue(data['results'][0]['liked'])
+        await self.both(data['next'].replace('http://testserver', ''), **self.auth)
+        await self.both('/api/posts/?cursor=garbage')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    @override_settings(ROOT_URLCONF=ASGI_URLCONF)
+    async def test_post_list_page_cache(self):
+        first = await self.async_client.get('/api/posts/')
+        second = await self.async_client.get('/api/posts/', headers=self.auth)
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertTrue(second.json()['results'][0]['liked'])
+
+    async def test_post_detail_matches_and_404s(self):
+        post = self.posts[-1]
+        response = await self.both(f'/api/posts/{post.pk}/', **self.auth)
+        self.assertTrue(response.json()['liked'])
+        await self.both(f'/api/posts/{post.pk}/')  # anonymous
+        await self.both('/api/posts/999999/')
+
+        with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+            again = await self.async_client.get(f'/api/posts/{post.pk}/', headers={**self.auth, 'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    async def test_notifications_and_unread_count_match(self):
+        response = await self.both('/api/notifications/', **self.auth)
+        self.assertEqual(response.json()['results'][0]['summary'], 'author followed you')
+        response = await self.both('/api/notifications/unread-count/', **self.auth)
+        self.assertEqual(response.json(), {'unread_count': 1})
+
+    async def test_authentication_errors_match(self):
+        response = await self.both('/api/notifications/')
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        await self.both('/api/notifications/unread-count/', Authorization='Token wrong')
+        await self.both('/api/posts/', Authorization='Token two parts')
+
+    async def test_writes_go_to_the_drf_view(self):
+        with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+            response = await self.async_client.post('/api/posts/', {'title': 'New', 'content': 'Body'}, headers=self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+
+    def test_asgi_application_routes_through_asgi_urls(self):
+        request, error_response = application.application.create_request(
+            {'type': 'http', 'method': 'GET', 'path': '/api/posts/', 'headers': [], 'query_string': b''}, None
+        )
+        self.assertIsNone(error_response)
+        self.assertEqual(request.urlconf, ASGI_URLCONF)
+
+
+class AsyncStackTests(TransactionTestCase):
+    # Through the real ASGI application (committed rows: its queries use their own connection)
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author', password='pass123')
+        Post.objects.create(author=author, title='Post', content='Body')
+
+    # Nothing sync-only in the middleware chain: requests waiting on an await
+    # don't block a thread each. (Django still gives every ASGI request a
+    # thread for sync signal receivers and middleware hooks; it sits idle
+    # instead of waiting for the view, as an adapted chain's thread would.)
+    async def test_waiting_requests_hold_no_thread(self):
+        held = []
+
+        def blocked_threads():
+            # Threads parked in async_to_sync, i.e. waiting for a coroutine to finish
+            loop_thread = threading.get_ident()
+            return sum(
+                1 for ident, frame in sys._current_frames().items()
+                if ident not in (loop_thread, threading.main_thread().ident)
+                and any(isinstance(f.f_locals.get('self'), AsyncToSync) for f, _ in traceback.walk_stack(frame))
+            )
+
+        async def slow_version(key):
+            await asyncio.sleep(0.3)
+            held.append(blocked_threads())
+            return (0, None)
+
+        async def get(path):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'query_string': b'', 'headers': [],
+                'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+            }
+            communicator = ApplicationCommunicator(application, scope)
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            response = await communicator.receive_output(timeout=10)
+            await communicator.receive_output(timeout=10)  # the body
+            return response['status']
+
+        with mock.patch('posts.async_views.conditional.acollection_version', slow_version):
+            statuses = await asyncio.gather(*(get('/api/posts/') for _ in range(20)))
+        self.assertEqual(set(statuses), {200})
+        self.assertEqual(max(held), 0)
+
+    @override_settings(DEBUG=True)  # Django only logs adaptations in debug mode
+    def test_middleware_needs_no_adaptation(self):
+        with self.assertNoLogs('django.request', level='DEBUG'):
+            AsyncReadsASGIHandler()
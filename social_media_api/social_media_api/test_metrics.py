@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+from . import metrics
+
+
+User = get_user_model()
+
+DEAD_PID = 2 ** 22 + 17  # above Linux's largest pid, so never a live process
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        settings_override = override_settings(METRICS_DIR=self.directory, METRICS_TOKEN='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='scraped', password='pass123')
+        self.post = Post.objects.create(author=self.user, title='Metered', content='Body')
+        self.client.force_authenticate(user=self.user)
+
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_routes_latency_and_queries(self):
+        self.client.get(reverse('post-detail', args=[self.post.pk]))
+        self.client.get(reverse('post-detail', args=[self.post.pk + 1000]))
+        text = self.scrape()
+
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn('http_requests_total{method="GET",route="api/posts/<int:pk>/",status="200"} 1', text)
+        self.assertIn('http_requests_total{method="GET",route="api/posts/<int:pk>/",status="404"} 1', text)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="api/posts/<int:pk>/",le="+Inf"} 2', text)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="api/posts/<int:pk>/"} 2', text)
+        # Every request ran queries; empty buckets are still listed
+        self.assertIn('http_request_db_queries_bucket{method="GET",route="api/posts/<int:pk>/",le="0.0"} 0', text)
+        # The scrape itself is the one request in flight
+        self.assertIn('http_requests_in_flight{method="GET"} 1', text)
+
+    async def test_queries_are_counted_over_asgi(self):
+        await self.async_client.get(reverse('post-detail', args=[self.post.pk]))
+        text = await sync_to_async(self.scrape)()
+        self.assertIn('http_request_db_queries_bucket{method="GET",route="api/posts/<int:pk>/",le="0.0"} 0', text)
+        self.assertIn('http_request_db_queries_count{method="GET",route="api/posts/<int:pk>/"} 1', text)
+
+    def test_other_processes_are_added_up_and_dead_gauges_dropped(self):
+        self.client.get(reverse('post-list'))
+        key = metrics.sample_key('http_requests_total', 'http_requests_total',
+                                 {'method': 'GET', 'route': 'api/posts/', 'status': '200'})
+        other = metrics.MmapStore(os.path.join(self.directory, f'counter_{DEAD_PID}.db'))
+        other.inc(key, 4)
+        other.close()
+        gauge = metrics.MmapStore(os.path.join(self.directory, f'gauge_{DEAD_PID}.db'))
+        gauge.inc(metrics.sample_key('http_requests_in_flight', 'http_requests_in_flight', {'method': 'POST'}), 3)
+        gauge.close()
+
+        text = self.scrape()
+        # Counters of an exited worker still count, its in-flight requests don't
+        self.assertIn('http_requests_total{method="GET",route="api/posts/",status="200"} 5', text)
+        self.assertNotIn('http_requests_in_flight{method="POST"}', text)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f'gauge_{DEAD_PID}.db')))
+
+    def test_store_grows_and_reopens(self):
+        path = os.path.join(self.directory, f'counter_{DEAD_PID}.db')
+        store = metrics.MmapStore(path)
+        for i in range(3000):  # more than the initial 64 KiB
+            store.inc(f'key-{i}', i)
+        store.close()
+        self.assertGreater(os.path.getsize(path), metrics.INITIAL_SIZE)
+
+        reopened = metrics.MmapStore(path)
+        reopened.inc('key-2999', 1)
+        reopened.close()
+        with open(path, 'rb') as metrics_file:
+            values = {key: value for key, value, _ in metrics.read_entries(metrics_file.read())}
+        self.assertEqual(len(values), 3000)
+        self.assertEqual(values['key-2999'], 3000)
+
+    def test_token(self):
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+            self.scrape(Authorization='Bearer s3cret')
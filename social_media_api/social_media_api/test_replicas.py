@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from benchmarks.management.commands.sync_sqlite_replicas import copy_database
+from posts.models import Post
+from .replicas import PIN_COOKIE, ReplicaMiddleware
+
+
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    # The middleware runs a fake view that reports where a Post read would go
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaMiddleware(self.view)
+
+    def view(self, request):
+        return HttpResponse(router.db_for_read(Post))
+
+    def read_alias(self, request):
+        return self.middleware(request).content.decode()
+
+    def test_safe_requests_read_a_replica_and_writes_the_primary(self):
+        self.assertIn(self.read_alias(self.factory.get('/api/posts/')), REPLICAS)
+        self.assertEqual(self.read_alias(self.factory.post('/api/posts/')), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_outside_a_request_reads_the_primary(self):
+        # Management commands and workers never see replica lag
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_pins_the_cookie_client(self):
+        response = self.middleware(self.factory.post('/api/posts/'))
+        request = self.factory.get('/api/posts/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.read_alias(request), 'default')
+
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)  # window over
+        self.assertIn(self.read_alias(request), REPLICAS)
+
+    def test_write_pins_the_token_client_only(self):
+        self.middleware(self.factory.post('/api/posts/', HTTP_AUTHORIZATION='Token writer'))
+        self.assertEqual(self.read_alias(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token writer')), 'default')
+        self.assertIn(self.read_alias(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token reader')), REPLICAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_no_pinning(self):
+        response = self.middleware(self.factory.post('/api/posts/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.read_alias(self.factory.get('/api/posts/')), 'default')
+
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = os.path.join(directory, 'primary.db'), os.path.join(directory, 'replica.db')
+            with sqlite3.connect(primary) as db:
+                db.execute('CREATE TABLE t (x)')
+                db.execute('INSERT INTO t VALUES (1)')
+            db.close()
+            copy_database(primary, replica)
+            copy = sqlite3.connect(replica)
+            self.assertEqual(copy.execute('SELECT x FROM t').fetchall(), [(1,)])
+            copy.close()
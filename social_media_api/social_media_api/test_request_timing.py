@@ -0,0 +1,62 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+
+
+User = get_user_model()
+
+SERVER_TIMING_RE = re.compile(
+    r'^db;dur=[\d.]+;desc="(\d+) queries", view;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$'
+)
+
+
+class RequestTimingMiddlewareTests(APITestCase):
+    def setUp(self):
+        cache.clear()  # build the post list page: its queries are what is timed
+        self.user = User.objects.create_user(username='timer', password='pass123')
+        Post.objects.create(author=self.user, title='Timed', content='Body')
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs('request_timing', level='INFO') as logs:
+            response = self.client.get(reverse('post-list'))
+
+        self.assertEqual(response.status_code, 200)
+        match = SERVER_TIMING_RE.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match.group(1)), 0)
+
+        record = logs.records[0]
+        self.assertIn('path=/api/posts/ status=200', record.getMessage())
+        self.assertEqual(record.timing['queries'], int(match.group(1)))
+        self.assertGreater(record.timing['render_ms'], 0)  # DRF renders after the view returns
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING_HEADER=False)
+    def test_header_can_be_turned_off(self):
+        with self.assertLogs('request_timing', level='INFO'):
+            response = self.client.get(reverse('post-list'))
+        self.assertNotIn('Server-Timing', response)
+
+    async def test_sync_view_queries_are_counted_over_asgi(self):
+        token = await self.user_token()
+        response = await self.async_client.get(reverse('post-list'), headers={'Authorization': f'Token {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(SERVER_TIMING_RE.match(response['Server-Timing']).group(1)), 0)
+
+    async def user_token(self):
+        token, _ = await sync_to_async(Token.objects.get_or_create)(user=self.user)
+        return token.key
@@ -14,12 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')), # user accounts
     path('api/', include('posts.urls')),  # Posts & comments API
+    path('api/', include('notifications.urls')),  # Notifications API
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape target
     
 ]
+
+# Uploaded files in development; in production MEDIA_ROOT is served by the web server / a CDN
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
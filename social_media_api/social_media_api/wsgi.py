@@ -2,6 +2,8 @@
 WSGI config for social_media_api project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+WhiteNoise wraps it to serve STATIC_ROOT (it is sync-only, so it is not in
+MIDDLEWARE, which the ASGI application shares; see asgi.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
@@ -9,8 +11,10 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from whitenoise import WhiteNoise
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
 
-application = get_wsgi_application()
+application = WhiteNoise(get_wsgi_application(), root=settings.STATIC_ROOT, prefix=settings.STATIC_URL)